@@ -0,0 +1,200 @@
+"""
+按路由类别的准入控制（自适应并发限制 + 快速拒绝）
+
+流量突增时请求会堆在数据库连接池前等待，直到客户端超时，所有接口一起变慢。
+这里在进入路由之前按类别限制同时处理的请求数：
+  - read：详情、列表、作者统计与排行榜等普通读取
+  - search：关键词搜索、标题联想、相似推荐
+  - write：创建、修改、删除、点赞收藏等写操作
+  - auth：登录、注册、重置密码（bcrypt 占用 CPU）
+每个类别的并发上限相互独立，搜索洪峰只会让搜索请求被拒绝，不会占满 get_prompt 所需的并发与数据库连接。
+
+并发上限按观测到的延迟自适应调整（AIMD）：
+  - 同时维护短期与长期两个延迟移动平均；同一类别内各接口耗时不同，比较的是整体水平而不是单个请求
+  - 短期平均不超过长期平均 × ADMISSION_LATENCY_TOLERANCE 且并发接近上限时，上限每轮（约 limit 个请求）加 1
+  - 短期平均超出或返回 5xx 时上限乘以 BACKOFF，每个短期延迟周期最多降一次
+达到上限的请求进入有界等待队列，队列已满或等待超过 ADMISSION_QUEUE_TIMEOUT_MS 时
+立即返回 503 并带 Retry-After，而不是排队到客户端超时。
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Dict, Optional
+from urllib.parse import parse_qs
+from fastapi.responses import JSONResponse
+from app.config import settings
+
+BACKOFF = 0.9
+# 长期 / 短期延迟移动平均的权重
+LONG_ALPHA = 0.01
+SHORT_ALPHA = 0.1
+AUTH_PATHS = {"/auth/login", "/auth/register", "/auth/reset-password"}
+SEARCH_PATHS = {"/prompts/suggest"}
+# 长连接（SSE）不占用并发名额，连接数由 SSE_MAX_CONNECTIONS 单独限制
+EXEMPT_PATHS = {"/prompts/stream"}
+
+# 类别 -> (初始上限, 最小上限, 最大上限, 等待队列长度)
+# search 的最大上限应明显小于数据库连接池大小（默认 5 + 10 溢出），搜索占满时仍给其他类别留出连接
+ROUTE_CLASSES = {
+    "read": (32, 4, 128, 256),
+    "search": (4, 1, 8, 16),
+    "write": (8, 2, 16, 64),
+    "auth": (4, 1, 8, 16),
+}
+
+
+class AdaptiveLimiter:
+    def __init__(self, name: str, initial: int, min_limit: int, max_limit: int, max_queue: int):
+        self.name = name
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.inflight = 0
+        self.long_ms: Optional[float] = None
+        self.short_ms: Optional[float] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+
+    async def acquire(self, timeout: float) -> bool:
+        if self.inflight < int(self.limit) and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            # 被唤醒时 release 已经为该请求占好了并发名额
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                self._waiters.remove(waiter)
+                self.shed_timeout += 1
+                return False
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+        return True
+
+    def release(self, latency_ms: Optional[float] = None, failed: bool = False):
+        self.inflight -= 1
+        if latency_ms is not None:
+            self._update(latency_ms, failed)
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    def _update(self, latency_ms: float, failed: bool):
+        if self.long_ms is None:
+            self.long_ms = self.short_ms = latency_ms
+        else:
+            self.long_ms += (latency_ms - self.long_ms) * LONG_ALPHA
+            self.short_ms += (latency_ms - self.short_ms) * SHORT_ALPHA
+
+        now = time.monotonic()
+        if failed or self.short_ms > self.long_ms * settings.ADMISSION_LATENCY_TOLERANCE:
+            # 一次拥塞会让同一批在途请求都变慢，每个延迟周期只降一次
+            if now - self._last_decrease >= self.short_ms / 1000:
+                self.limit = max(self.min_limit, self.limit * BACKOFF)
+                self._last_decrease = now
+        elif self.inflight + 1 >= self.limit / 2:
+            # 只有并发确实用到上限附近时才加，空闲时上限不会无限增长
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "inflight": self.inflight,
+            "waiting": len(self._waiters),
+            "long_ms": round(self.long_ms or 0, 3),
+            "short_ms": round(self.short_ms or 0, 3),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+        }
+
+
+limiters: Dict[str, AdaptiveLimiter] = {
+    name: AdaptiveLimiter(name, *config) for name, config in ROUTE_CLASSES.items()
+}
+
+
+def route_class(method: str, path: str, query_string: bytes) -> Optional[str]:
+    """返回请求所属的类别；文档、管理接口等不参与限流时返回 None"""
+    if path.startswith("/api/"):
+        path = path[4:]
+    if not path.startswith(("/prompts", "/auth/", "/users/")) or path in EXEMPT_PATHS:
+        return None
+    if method == "POST" and path in AUTH_PATHS:
+        return "auth"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    if path in SEARCH_PATHS or path.endswith("/similar"):
+        return "search"
+    if path.rstrip("/") == "/prompts" and b"keyword=" in query_string:
+        if parse_qs(query_string.decode()).get("keyword", [""])[0].strip():
+            return "search"
+    return "read"
+
+
+def stats() -> dict:
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+class AdmissionMiddleware:
+    """纯 ASGI 中间件；需注册在 CORS 之内，使 503 响应也带跨域头，浏览器才能读到 Retry-After"""
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["method"], scope["path"], scope.get("query_string", b"")) \
+            if scope["type"] == "http" else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        if not await limiter.acquire(settings.ADMISSION_QUEUE_TIMEOUT_MS / 1000):
+            response = JSONResponse(
+                {"code": 503, "data": None, "msg": "服务繁忙，请稍后重试"},
+                status_code=503,
+                headers={"Retry-After": str(settings.ADMISSION_RETRY_AFTER)},
+            )
+            await response(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        except asyncio.CancelledError:
+            # 客户端断开，这次的耗时不代表处理能力
+            limiter.release()
+            raise
+        except BaseException:
+            limiter.release((time.perf_counter() - start) * 1000, failed=True)
+            raise
+        limiter.release((time.perf_counter() - start) * 1000, failed=status >= 500)
@@ -1,14 +1,18 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.config import settings
-from app.database import get_db
+from app.database import async_session_maker
 from app.models import User
+from app.cache import cache
+from app.revocation import revocations
+
+USER_CACHE_TTL = 300
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
@@ -21,17 +25,58 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+        expire = now + timedelta(days=settings.ACCESS_TOKEN_EXPIRE_DAYS)
+    # JWT 规定 sub 为字符串；jti / iat 用于吊销，iat 保留小数以区分同一秒内签发的 token
+    to_encode["sub"] = str(to_encode["sub"])
+    to_encode.update({
+        "exp": expire,
+        "iat": (now - datetime(1970, 1, 1)).total_seconds(),
+        "jti": uuid.uuid4().hex,
+    })
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def decode_token(token: str) -> dict:
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+async def load_user(user_id: int) -> Optional[User]:
+    """按 id 读取用户（经过两级缓存），返回的是不在会话中的对象，不含密码哈希"""
+    async def loader():
+        async with async_session_maker() as db:
+            result = await db.execute(select(User).where(User.id == user_id))
+            user = result.scalar_one_or_none()
+        if user is None:
+            return None
+        return {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "state": user.state,
+            "created_at": user.created_at,
+            "updated_at": user.updated_at,
+        }
+    
+    data = await cache.get_or_load("user", user_id, loader, ttl=USER_CACHE_TTL)
+    if data is None:
+        return None
+    return User(
+        id=data["id"],
+        username=data["username"],
+        email=data["email"],
+        state=data["state"],
+        created_at=_parse_datetime(data["created_at"]),
+        updated_at=_parse_datetime(data["updated_at"]),
+    )
+
 async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    credentials: HTTPAuthorizationCredentials = Depends(security)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -39,7 +84,7 @@ async def get_current_user(
     )
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
@@ -47,26 +92,28 @@ async def get_current_user(
     except (JWTError, ValueError, TypeError):
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
+    if await revocations.is_revoked(payload):
+        raise credentials_exception
+    
+    user = await load_user(user_id)
     if user is None:
         raise credentials_exception
     return user
 
 async def get_optional_user(
-    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False)),
-    db: AsyncSession = Depends(get_db)
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(HTTPBearer(auto_error=False))
 ) -> Optional[User]:
     if not credentials:
         return None
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         user_id = payload.get("sub")
         if user_id is None:
             return None
         user_id = int(user_id)
-        result = await db.execute(select(User).where(User.id == user_id))
-        return result.scalar_one_or_none()
+        if await revocations.is_revoked(payload):
+            return None
+        return await load_user(user_id)
     except (JWTError, ValueError, TypeError):
         return None
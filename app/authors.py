@@ -0,0 +1,129 @@
+"""
+作者统计与作者排行榜
+
+author_stats 每个作者一行：正常状态提示词的数量，以及这些提示词获得的浏览、点赞、收藏总数。
+与提示词上的计数在同一事务中增减——发布 / 删除在路由中，点赞 / 收藏在 app/interactions.py 中，
+浏览在 handle_views 中（与浏览记录去重在同一事务，事件重放不会重复计数）。
+读取作者统计只按主键取一行，不再对作者的全部提示词求和。
+
+排行榜是 Redis 有序集合 authors:leaderboard，成员为 user_id，分数为 suggest.popularity_score(浏览, 点赞, 收藏)。
+汇总变化提交后用数据库返回的最新值 ZADD（写绝对值而非增量：重复执行无副作用，某次写入失败时下一次变化会纠正），
+没有正常提示词的作者从集合中移除。按页读取为 ZREVRANGE（O(log N + 页大小)），再按主键取出这一页作者的汇总。
+Redis 数据丢失时执行 build_indexes.py 重建。
+"""
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import delete
+from sqlalchemy import insert as plain_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import insert
+from app.models import AuthorStats
+from app.redis_client import get_redis
+from app.schemas import AuthorStatsResponse, LeaderboardItem
+from app import queries, suggest
+
+LEADERBOARD_KEY = "authors:leaderboard"
+STATS_FIELDS = ["user_id", "prompt_count", "view_count", "like_count", "favorite_count"]
+
+
+def score(row) -> int:
+    return suggest.popularity_score(row.view_count, row.like_count, row.favorite_count)
+
+
+async def add_prompt(db: AsyncSession, user_id: int):
+    """发布提示词时调用，随调用方的事务一起提交；作者的第一条提示词同时建立汇总行"""
+    result = await db.execute(
+        insert(AuthorStats)
+        .values(user_id=user_id, prompt_count=1, view_count=0, like_count=0, favorite_count=0)
+        .on_conflict_do_update(index_elements=["user_id"], set_={"prompt_count": AuthorStats.prompt_count + 1})
+        .returning(*queries.AUTHOR_STATS_COLUMNS)
+    )
+    return result.one()
+
+
+async def adjust(db: AsyncSession, user_id: int, **deltas):
+    """按列增减作者汇总，随调用方的事务一起提交，返回增减后的汇总（没有汇总行时返回 None）"""
+    result = await db.execute(queries.adjust_author_stats(user_id, deltas))
+    return result.one_or_none()
+
+
+async def remove_prompt(db: AsyncSession, deleted):
+    """deleted 为 queries.soft_delete_prompt 返回的行，扣除该提示词及其计数"""
+    return await adjust(
+        db, deleted.user_id, prompt_count=-1, view_count=-deleted.view_count,
+        like_count=-deleted.like_count, favorite_count=-deleted.favorite_count
+    )
+
+
+async def update_leaderboard(rows: Iterable):
+    """事务提交后调用，rows 为上面几个函数返回的最新汇总（可以包含 None）"""
+    rows = [row for row in rows if row is not None]
+    if not rows:
+        return
+    redis = await get_redis()
+    pipe = redis.pipeline(transaction=False)
+    for row in rows:
+        if row.prompt_count > 0:
+            pipe.zadd(LEADERBOARD_KEY, {row.user_id: score(row)})
+        else:
+            pipe.zrem(LEADERBOARD_KEY, row.user_id)
+    await pipe.execute()
+
+
+def stats_response(row) -> AuthorStatsResponse:
+    return AuthorStatsResponse(
+        user_id=row.id,
+        username=row.username,
+        prompt_count=row.prompt_count or 0,
+        view_count=row.view_count or 0,
+        like_count=row.like_count or 0,
+        favorite_count=row.favorite_count or 0,
+    )
+
+
+async def leaderboard(db: AsyncSession, offset: int, limit: int) -> Tuple[List[LeaderboardItem], int]:
+    """排行榜的一页与上榜作者总数"""
+    redis = await get_redis()
+    entries = await redis.zrevrange(LEADERBOARD_KEY, offset, offset + limit - 1)
+    total = await redis.zcard(LEADERBOARD_KEY)
+    user_ids = [int(member) for member in entries]
+    if not user_ids:
+        return [], total
+    result = await db.execute(queries.authors_stats_by_ids(user_ids))
+    rows = {row.id: row for row in result.all()}
+    items = []
+    for rank, user_id in enumerate(user_ids, start=offset + 1):
+        row = rows.get(user_id)
+        if row is None:
+            # 用户已不存在，等待重建时清理
+            continue
+        items.append(LeaderboardItem(**stats_response(row).model_dump(), rank=rank, score=score(row)))
+    return items, total
+
+
+async def recount(conn):
+    """按提示词表重新计算全部作者汇总（迁移时使用，会锁住 author_stats）"""
+    await conn.execute(delete(AuthorStats))
+    await conn.execute(plain_insert(AuthorStats).from_select(STATS_FIELDS, queries.author_totals()))
+
+
+async def rebuild_leaderboard(db: AsyncSession, batch_size: int = 1000) -> int:
+    """按 author_stats 重建排行榜，返回上榜作者数"""
+    redis = await get_redis()
+    await redis.delete(LEADERBOARD_KEY)
+    last_id = 0
+    total = 0
+    while True:
+        result = await db.execute(queries.author_stats_batch(last_id, batch_size))
+        rows = result.all()
+        if not rows:
+            return total
+        await redis.zadd(LEADERBOARD_KEY, {row.user_id: score(row) for row in rows})
+        last_id = rows[-1].user_id
+        total += len(rows)
+
+
+async def get_stats(db: AsyncSession, user_id: int) -> Optional[AuthorStatsResponse]:
+    """单个作者的汇总，用户不存在时返回 None"""
+    result = await db.execute(queries.author_stats(user_id))
+    row = result.one_or_none()
+    return stats_response(row) if row is not None else None
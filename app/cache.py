@@ -0,0 +1,368 @@
+"""
+两级缓存：每个 worker 进程内的 L1（LRU + TTL）在前，Redis L2 在后
+
+数据变更时调用 cache.invalidate()：删除 L2 并通过 Redis pub/sub 广播，
+所有 worker（包括其他节点）收到后清除各自的 L1。
+缓存值统一为 JSON 兼容的数据（dict / list / 基本类型），不要修改取出的对象。
+
+get_or_load 防止热点 key 击穿数据库：
+  - 单飞：同一 worker 内同一个 key 的并发未命中只执行一次 loader，其余请求等待同一结果
+  - 过期后仍可在 CACHE_STALE_TTL 秒内返回旧值，同时在后台刷新（stale-while-revalidate）
+  - 加载 / 刷新前在 Redis 中加锁，多个 worker 之间同一时刻只有一个在查数据库，
+    没抢到锁的 worker 短暂等待其他 worker 写入 L2
+  - 加载期间 key 被失效：已在等待的请求拿到这次的结果但不写入缓存，之后的请求重新加载（写后读到新值）
+"""
+import asyncio
+import contextlib
+import inspect
+import json
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.database import async_session_maker
+from app.redis_client import get_redis, release_lock
+from app.schemas import ResponseModel
+
+CHANNEL = "cache:invalidate"
+# 未抢到锁时轮询 L2 的间隔
+LOCK_POLL_SECONDS = 0.05
+# 后台刷新让给了其他 worker（没有加载）；等待它的请求需要自己加载
+_SKIPPED = object()
+
+
+class LRUCache:
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.evictions = 0
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _Flight:
+    """一次进行中的加载；加载期间 key 被失效时结果不写入缓存"""
+    def __init__(self):
+        self.future = asyncio.get_running_loop().create_future()
+        # 后台刷新失败时没有请求等待结果，避免 “exception was never retrieved” 警告
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.invalidated = False
+
+
+class TwoTierCache:
+    def __init__(self, l1_max_items: int, l1_ttl: float, l2_ttl: int, stale_ttl: int = 0, lock_ms: int = 3000):
+        self.l1 = LRUCache(l1_max_items, l1_ttl)
+        self.l2_ttl = l2_ttl
+        self.stale_ttl = stale_ttl
+        self.lock_ms = lock_ms
+        self.origin = uuid.uuid4().hex
+        self.counters = {
+            "l1_hits": 0, "l2_hits": 0, "misses": 0, "invalidations": 0,
+            "stale_hits": 0, "coalesced": 0, "loads": 0, "lock_waits": 0,
+        }
+        self._flights: Dict[str, _Flight] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(namespace: str, key: Any) -> str:
+        return f"cache:{namespace}:{key}"
+
+    def _set_local(self, cache_key: str, entry: Tuple[Any, float]):
+        # L1 中的条目不能比 L2 中的活得更久（包括可返回旧值的时间）
+        remaining = entry[1] + self.stale_ttl - time.time()
+        if remaining > 0:
+            self.l1.set(cache_key, entry, min(self.l1.ttl, remaining))
+
+    async def _read_remote(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        redis = await get_redis()
+        raw = await redis.get(cache_key)
+        if raw is None:
+            return None
+        data = json.loads(raw)
+        if not isinstance(data, dict) or "fresh_until" not in data:
+            # 旧格式的缓存值，当作已过期处理
+            return data, 0.0
+        entry = (data["value"], data["fresh_until"])
+        self._set_local(cache_key, entry)
+        return entry
+
+    async def _get_entry(self, cache_key: str) -> Optional[Tuple[Any, float]]:
+        """返回 (值, 新鲜截止时间)，包括已过期但仍在 stale_ttl 内的值"""
+        entry = self.l1.get(cache_key)
+        if entry is not None:
+            self.counters["l1_hits"] += 1
+            return entry
+        entry = await self._read_remote(cache_key)
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self.counters["l2_hits"] += 1
+        return entry
+
+    async def get(self, namespace: str, key: Any):
+        """只返回未过期的值"""
+        entry = await self._get_entry(self._key(namespace, key))
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    async def set(self, namespace: str, key: Any, value, ttl: Optional[int] = None):
+        cache_key = self._key(namespace, key)
+        value = jsonable_encoder(value)
+        ttl = ttl or self.l2_ttl
+        fresh_until = time.time() + ttl
+        self._set_local(cache_key, (value, fresh_until))
+        redis = await get_redis()
+        keys_key = self._key(namespace, "__keys__")
+        payload = json.dumps({"value": value, "fresh_until": fresh_until}, ensure_ascii=False)
+        pipe = redis.pipeline(transaction=False)
+        pipe.setex(cache_key, ttl + self.stale_ttl, payload)
+        pipe.sadd(keys_key, cache_key)
+        pipe.expire(keys_key, ttl + self.stale_ttl)
+        await pipe.execute()
+        return value
+
+    async def get_or_load(self, namespace: str, key: Any, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[int] = None):
+        """
+        命中缓存直接返回，否则调用 loader 加载并写入缓存；loader 返回 None 时不缓存。
+        已过期但仍在 stale_ttl 内的值会直接返回，同时在后台刷新，
+        所以 loader 不能依赖请求作用域的对象（例如路由注入的数据库会话）。
+        """
+        cache_key = self._key(namespace, key)
+        entry = await self._get_entry(cache_key)
+        if entry is not None:
+            value, fresh_until = entry
+            if fresh_until > time.time():
+                return value
+            self.counters["stale_hits"] += 1
+            if cache_key not in self._flights:
+                self._start_flight(cache_key, namespace, key, loader, ttl, background=True)
+            return value
+        while True:
+            flight = self._flights.get(cache_key)
+            if flight is not None:
+                self.counters["coalesced"] += 1
+            else:
+                flight = self._start_flight(cache_key, namespace, key, loader, ttl, background=False)
+            # shield：某个等待的请求被取消时不影响其他请求共享的加载
+            value = await asyncio.shield(flight.future)
+            # 加入的是没有加载就结束的后台刷新：旧值已不在缓存中，重新发起加载（前台加载不会跳过）
+            if value is not _SKIPPED:
+                return value
+
+    def _start_flight(self, cache_key: str, namespace: str, key: Any, loader, ttl, background: bool) -> _Flight:
+        flight = _Flight()
+        self._flights[cache_key] = flight
+        asyncio.create_task(self._run_flight(cache_key, namespace, key, loader, ttl, background, flight))
+        return flight
+
+    async def _run_flight(self, cache_key: str, namespace: str, key: Any, loader, ttl, background: bool,
+                          flight: _Flight):
+        try:
+            value = await self._load_locked(cache_key, namespace, key, loader, ttl, background, flight)
+        except Exception as e:
+            flight.future.set_exception(e)
+        else:
+            flight.future.set_result(value)
+        finally:
+            if self._flights.get(cache_key) is flight:
+                del self._flights[cache_key]
+
+    async def _load_locked(self, cache_key: str, namespace: str, key: Any, loader, ttl, background: bool,
+                           flight: _Flight):
+        redis = await get_redis()
+        lock_key = f"lock:{cache_key}"
+        token = uuid.uuid4().hex
+        acquired = await redis.set(lock_key, token, nx=True, px=self.lock_ms)
+        if not acquired:
+            if background:
+                # 其他 worker 正在刷新，发起刷新的请求已返回旧值
+                return _SKIPPED
+            self.counters["lock_waits"] += 1
+            deadline = time.monotonic() + self.lock_ms / 1000
+            while time.monotonic() < deadline:
+                await asyncio.sleep(LOCK_POLL_SECONDS)
+                entry = await self._read_remote(cache_key)
+                if entry is not None and entry[1] > time.time():
+                    return entry[0]
+                if not await redis.exists(lock_key):
+                    # 对方已释放锁但没有写入（结果为空或加载失败）
+                    break
+            # 不再等待，自己加载（持锁的 worker 可能已崩溃）
+        try:
+            self.counters["loads"] += 1
+            value = await loader()
+            if value is None:
+                return None
+            if flight.invalidated:
+                # 加载期间数据已变更，结果可以返回给本次请求，但不能写入缓存
+                return jsonable_encoder(value)
+            return await self.set(namespace, key, value, ttl)
+        finally:
+            if acquired:
+                await release_lock(redis, lock_key, token)
+
+    async def invalidate(self, namespace: str, key: Any = None):
+        """key 为 None 时清除整个命名空间"""
+        self.counters["invalidations"] += 1
+        self._drop_local(namespace, key)
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        if key is None:
+            keys_key = self._key(namespace, "__keys__")
+            keys = await redis.smembers(keys_key)
+            if keys:
+                pipe.delete(*keys)
+            pipe.delete(keys_key)
+        else:
+            pipe.delete(self._key(namespace, key))
+        pipe.publish(CHANNEL, json.dumps({"ns": namespace, "key": key, "origin": self.origin}))
+        await pipe.execute()
+
+    def _drop_local(self, namespace: str, key: Any):
+        if key is None:
+            prefix = self._key(namespace, "")
+            self.l1.delete_prefix(prefix)
+            flights = [(cache_key, flight) for cache_key, flight in self._flights.items() if cache_key.startswith(prefix)]
+        else:
+            cache_key = self._key(namespace, key)
+            self.l1.delete(cache_key)
+            flights = [(cache_key, self._flights[cache_key])] if cache_key in self._flights else []
+        for cache_key, flight in flights:
+            # 已在等待的请求仍拿到这次加载的结果（不写入缓存）；之后的请求不再加入，重新加载最新数据
+            flight.invalidated = True
+            del self._flights[cache_key]
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    if payload.get("origin") != self.origin:
+                        self._drop_local(payload["ns"], payload.get("key"))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 断线期间可能漏掉失效消息，清空 L1 后重连
+                self.l1.clear()
+                await asyncio.sleep(1)
+            finally:
+                # 每次重连都新建 pubsub，旧的必须关闭，否则连接一直占用
+                if pubsub is not None:
+                    with contextlib.suppress(Exception):
+                        await pubsub.close()
+
+    def start_listener(self):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "evictions": self.l1.evictions,
+            "l1_size": len(self.l1),
+            "inflight": len(self._flights),
+        }
+
+
+cache = TwoTierCache(
+    l1_max_items=settings.CACHE_L1_MAX_ITEMS,
+    l1_ttl=settings.CACHE_L1_TTL,
+    l2_ttl=settings.CACHE_L2_TTL,
+    stale_ttl=settings.CACHE_STALE_TTL,
+    lock_ms=settings.CACHE_LOCK_MS,
+)
+
+
+def cached(namespace: str, key: Optional[Callable[..., Any]] = None, ttl: Optional[int] = None):
+    """
+    缓存路由函数返回的 ResponseModel（只缓存 code == 200 的结果）。
+    key 接收路由函数的关键字参数并返回缓存键，不传则整个命名空间只缓存一份：
+
+        @router.get("/stats/global")
+        @cached("stats", ttl=30)
+        async def get_stats(...): ...
+
+    加载可能在后台执行（过期刷新），注入的数据库会话会替换为加载时新开的会话。
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            # 路由之间也会按位置直接调用（如 get_stats(db)），统一按参数名处理
+            arguments = signature.bind(*args, **kwargs).arguments
+            cache_key = key(**arguments) if key else "default"
+            uncached = []
+            
+            async def loader():
+                async with async_session_maker() as session:
+                    call_kwargs = {
+                        name: session if isinstance(value, AsyncSession) else value
+                        for name, value in arguments.items()
+                    }
+                    result = await func(**call_kwargs)
+                if result.code == 200:
+                    return result
+                uncached.append(result)
+                return None
+            
+            data = await cache.get_or_load(namespace, cache_key, loader, ttl)
+            if data is not None:
+                return ResponseModel(**data)
+            if uncached:
+                return uncached[0]
+            # 合并到了其他请求的加载，且结果不可缓存：自己执行一次
+            return await func(*args, **kwargs)
+        return wrapper
+    return decorator
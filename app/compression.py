@@ -0,0 +1,60 @@
+"""
+提示词正文压缩
+
+压缩后的数据第一个字节为格式版本，目前只有 FORMAT_ZLIB_V1：zlib + 内置预置字典。
+预置字典由提示词中高频出现的中英文短语组成，对几 KB 的短正文压缩率提升明显；
+以后更换字典只需新增格式版本，旧数据仍可按原版本解压。
+"""
+import zlib
+from typing import Optional
+from app.config import settings
+
+FORMAT_ZLIB_V1 = 1
+
+# zlib 字典中越靠后的内容越容易被引用，高频短语放在末尾
+_ZDICT_V1 = "".join([
+    "Here is the text: ", "Input: ", "Output: ", "Example: ", "Examples:\n",
+    "Constraints:\n", "Requirements:\n", "Instructions:\n", "Context:\n", "Task:\n",
+    "Do not include any explanation. ", "Return the result in JSON format. ",
+    "Respond in Markdown. ", "Use bullet points. ", "Keep it concise. ",
+    "Think step by step. ", "Let's think step by step. ",
+    "Please answer in Chinese. ", "Please answer in English. ",
+    "You are a helpful assistant. ", "You are an expert ", "Act as a ",
+    "I want you to act as a ", "I will provide you with ", "My first request is ",
+    "背景：", "任务：", "要求：", "限制：", "示例：", "输入：", "输出：", "格式：",
+    "请使用 Markdown 格式输出。", "请以 JSON 格式返回结果。", "不要输出任何解释。",
+    "请一步一步思考。", "请用中文回答。", "请用英文回答。", "字数控制在",
+    "请根据以下内容", "请帮我", "并给出", "需要注意的是，", "如果信息不足，请先提问。",
+    "输出格式如下：\n", "注意事项：\n", "## 角色\n", "## 技能\n", "## 约束\n", "## 工作流程\n",
+    "## 输出格式\n", "## 初始化\n", "# Role\n", "# Skills\n", "# Constraints\n", "# Workflow\n",
+    "你是一名经验丰富的", "你是一个专业的", "你现在是一名", "请扮演", "我希望你扮演",
+]).encode()
+
+
+def compress(text: str) -> bytes:
+    compressor = zlib.compressobj(level=6, zdict=_ZDICT_V1)
+    return bytes([FORMAT_ZLIB_V1]) + compressor.compress(text.encode()) + compressor.flush()
+
+
+def decompress(data: bytes) -> str:
+    data = bytes(data)
+    if data[0] != FORMAT_ZLIB_V1:
+        raise ValueError(f"未知的正文压缩格式: {data[0]}")
+    decompressor = zlib.decompressobj(zdict=_ZDICT_V1)
+    return (decompressor.decompress(data[1:]) + decompressor.flush()).decode()
+
+
+def maybe_compress(text: str) -> Optional[bytes]:
+    """达到长度阈值且确实变小时返回压缩数据，否则返回 None（按原文存储）"""
+    if len(text) < settings.CONTENT_COMPRESSION_MIN_LENGTH:
+        return None
+    data = compress(text)
+    if len(data) >= len(text.encode()):
+        return None
+    return data
+
+
+def load_content(text: Optional[str], data: Optional[bytes]) -> str:
+    if data is not None:
+        return decompress(data)
+    return text
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -13,6 +14,80 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str
     SMTP_FROM: str
     
+    # 启动时数据库结构版本落后是否自动执行迁移；关闭后需先运行 python init_db.py，否则启动失败
+    AUTO_MIGRATE: bool = True
+    
+    # 开启后新写入的长正文以压缩形式存储（读取时自动解压）。
+    # 数据库无法对压缩后的正文做模糊匹配，开启压缩时必须同时设置 KEYWORD_SEARCH_CONTENT=false（关键词只匹配标题），
+    # 否则启动失败；关闭压缩并恢复正文搜索前，先用 compress_content.py --decompress 还原已压缩的正文
+    CONTENT_COMPRESSION: bool = False
+    CONTENT_COMPRESSION_MIN_LENGTH: int = 1024
+    KEYWORD_SEARCH_CONTENT: bool = True
+    
+    # 两级缓存：进程内 L1 条数上限与过期秒数、Redis L2 过期秒数
+    CACHE_L1_MAX_ITEMS: int = 1000
+    CACHE_L1_TTL: int = 30
+    CACHE_L2_TTL: int = 300
+    # 过期后仍可返回旧值（同时后台刷新）的秒数，以及加载时 Redis 锁的毫秒数
+    CACHE_STALE_TTL: int = 30
+    CACHE_LOCK_MS: int = 3000
+    
+    # 浏览记录按月分区：原始记录保留的月数（之后汇总为按月统计），以及提前创建的分区月数
+    VIEW_RETENTION_MONTHS: int = 12
+    VIEW_PARTITIONS_AHEAD: int = 3
+    
+    # Token 吊销：各 worker 同步吊销列表的间隔秒数与 Bloom 过滤器误判率
+    REVOCATION_SYNC_SECONDS: int = 5
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    
+    # 事件管道：开启后浏览、点赞等派生数据由 worker（run_worker.sh）异步处理，关闭时在请求内同步处理
+    EVENT_PIPELINE_ENABLED: bool = False
+    EVENT_STREAM_MAXLEN: int = 1000000
+    EVENT_BATCH_SIZE: int = 100
+    EVENT_BLOCK_MS: int = 1000
+    EVENT_CLAIM_IDLE_MS: int = 60000
+    EVENT_MAX_DELIVERIES: int = 5
+    
+    # 按需剖析：带 X-Profile: <PROFILE_TOKEN> 的请求或按比例抽样的请求记录调用栈与 SQL / Redis 耗时，
+    # 两者都未配置时不注册中间件；PROFILE_TOKEN 同时用于访问 /admin/profiles
+    PROFILE_TOKEN: str = ""
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_INTERVAL_MS: int = 5
+    PROFILE_KEEP: int = 100
+    PROFILE_TTL: int = 86400
+    
+    # 准入控制：按路由类别（read / search / write / auth）自适应限制并发，
+    # 排队超过 ADMISSION_QUEUE_TIMEOUT_MS 或队列已满时返回 503 + Retry-After
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_QUEUE_TIMEOUT_MS: int = 500
+    ADMISSION_LATENCY_TOLERANCE: float = 2.0
+    ADMISSION_RETRY_AFTER: int = 1
+    
+    # 实时计数推送（GET /prompts/stream）：每个连接两次推送的最小间隔、心跳间隔、可订阅的 id 数与每个 worker 的连接上限
+    SSE_MIN_INTERVAL_MS: int = 500
+    SSE_HEARTBEAT_SECONDS: int = 15
+    SSE_MAX_IDS: int = 100
+    SSE_MAX_CONNECTIONS: int = 10000
+    
+    # 日志：格式化与输出在后台线程完成（LOG_FORMAT 为 json 或 text），队列满时丢弃
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    # 访问日志抽样比例；5xx 与超过 LOG_SLOW_MS 的请求总是记录
+    LOG_ACCESS_SAMPLE_RATE: float = 1.0
+    LOG_SLOW_MS: int = 1000
+    # 记录所有请求的 SQL（按比例抽样）；关闭时仍可用请求头 X-Log-SQL: <PROFILE_TOKEN> 为单个请求打开
+    LOG_SQL: bool = False
+    LOG_SQL_SAMPLE_RATE: float = 1.0
+    
+    @model_validator(mode="after")
+    def check_compression(self):
+        if self.CONTENT_COMPRESSION and self.KEYWORD_SEARCH_CONTENT:
+            raise ValueError(
+                "CONTENT_COMPRESSION=true 时关键词搜索无法匹配压缩后的正文，请同时设置 KEYWORD_SEARCH_CONTENT=false"
+            )
+        return self
+    
     class Config:
         env_file = ".env"
 
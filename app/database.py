@@ -1,8 +1,41 @@
+from sqlalchemy import event
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.config import settings
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+# DATABASE_URL=sqlite+aiosqlite:///./prompts.db 时使用 SQLite（单节点部署、本地基准测试）
+IS_SQLITE = settings.DATABASE_URL.startswith("sqlite")
+
+# WAL 允许读写并发；synchronous=NORMAL 在 WAL 下只在检查点时 fsync，断电最多丢失最近的事务
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "foreign_keys": "ON",
+    "busy_timeout": 5000,
+    "cache_size": -64000,  # 负数单位为 KiB，即 64MB
+    "temp_store": "MEMORY",
+    "mmap_size": 268435456,
+}
+
+def create_engine(url: str = settings.DATABASE_URL, **kwargs):
+    engine = create_async_engine(url, **kwargs)
+    if engine.dialect.name == "sqlite":
+        @event.listens_for(engine.sync_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    return engine
+
+def insert(model):
+    """带 ON CONFLICT 子句的 INSERT，按当前数据库选择方言"""
+    return sqlite_insert(model) if IS_SQLITE else pg_insert(model)
+
+# SQL 日志由 app/logs.py 按请求开启，引擎本身不 echo
+engine = create_engine(settings.DATABASE_URL)
 async_session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 Base = declarative_base()
 
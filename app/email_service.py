@@ -1,7 +1,4 @@
 import random
-import aiosmtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from app.config import settings
 from app.redis_client import get_redis
 
@@ -9,6 +6,11 @@ async def generate_code() -> str:
     return str(random.randint(100000, 999999))
 
 async def send_verification_code(email: str, code: str):
+    # SMTP 客户端只在发送验证码时才用到，推迟导入以缩短启动时间
+    import aiosmtplib
+    from email.mime.text import MIMEText
+    from email.mime.multipart import MIMEMultipart
+    
     message = MIMEMultipart()
     message["From"] = settings.SMTP_FROM
     message["To"] = email
@@ -0,0 +1,113 @@
+"""
+事件处理函数
+
+每个消费组对应一个处理函数，接收一批事件（dict），只处理自己关心的类型。
+事件至少投递一次，处理函数需要能承受重放：浏览记录在写入前去重，索引与热度按数据库中的最新状态重建。
+"""
+from collections import Counter
+from typing import Dict, List
+from app.database import async_session_maker
+from app.models import PromptView
+from app.redis_client import get_redis
+from app.compression import load_content
+from app.cache import cache
+from app import events, queries, similarity, suggest, live, authors
+
+Event = Dict[str, str]
+
+INTERACTION_WEIGHTS = {
+    events.PROMPT_LIKED: suggest.LIKE_WEIGHT,
+    events.PROMPT_FAVORITED: suggest.FAVORITE_WEIGHT,
+}
+
+
+async def handle_views(batch: List[Event]):
+    """写入浏览记录（同一 IP 在保留期内只记一次），累加提示词与作者的浏览数、热度并推送最新计数"""
+    unique = {}
+    for event in batch:
+        if event["type"] == events.PROMPT_VIEWED:
+            unique.setdefault((int(event["prompt_id"]), event["ip"]), event.get("user_id") or None)
+    if not unique:
+        return
+    async with async_session_maker() as db:
+        result = await db.execute(queries.existing_views(list(unique)))
+        existing = set(result.all())
+        new_views = [(key, user_id) for key, user_id in unique.items() if key not in existing]
+        if not new_views:
+            return
+        db.add_all([
+            PromptView(prompt_id=prompt_id, user_id=int(user_id) if user_id else None, ip_address=ip)
+            for (prompt_id, ip), user_id in new_views
+        ])
+        counts = Counter(prompt_id for (prompt_id, _), _ in new_views)
+        author_views = Counter()
+        for prompt_id, count in counts.items():
+            result = await db.execute(queries.increment_view_count(prompt_id, count))
+            prompt = result.one_or_none()
+            if prompt is not None and prompt.state == 1:
+                author_views[prompt.user_id] += count
+        author_stats = []
+        for user_id, count in author_views.items():
+            author_stats.append(await authors.adjust(db, user_id, view_count=count))
+        await db.commit()
+    await authors.update_leaderboard(author_stats)
+    redis = await get_redis()
+    for prompt_id, count in counts.items():
+        await suggest.bump_popularity(redis, prompt_id, count * suggest.VIEW_WEIGHT)
+    await live.publish_counters(counts)
+
+
+async def handle_interactions(batch: List[Event]):
+    """点赞 / 收藏变化后更新热度，让详情缓存中的计数失效，并推送最新计数"""
+    amounts = Counter()
+    for event in batch:
+        weight = INTERACTION_WEIGHTS.get(event["type"])
+        if weight is not None:
+            amounts[int(event["prompt_id"])] += weight * int(event["delta"])
+    if not amounts:
+        return
+    redis = await get_redis()
+    for prompt_id, amount in amounts.items():
+        if amount:
+            await suggest.bump_popularity(redis, prompt_id, amount)
+        await cache.invalidate("prompt", prompt_id)
+    await live.publish_counters(amounts)
+
+
+async def handle_indexes(batch: List[Event]):
+    """按数据库中的最新状态重建相似度与标题联想索引"""
+    prompt_ids = {
+        int(event["prompt_id"]) for event in batch
+        if event["type"] in (events.PROMPT_CREATED, events.PROMPT_UPDATED, events.PROMPT_DELETED)
+    }
+    if not prompt_ids:
+        return
+    async with async_session_maker() as db:
+        result = await db.execute(queries.index_rows(prompt_ids))
+        rows = result.all()
+    redis = await get_redis()
+    active = [row for row in rows if row.state == 1]
+    for prompt_id in prompt_ids - {row.id for row in active}:
+        await similarity.remove_prompt(redis, prompt_id)
+        await suggest.remove_title(redis, prompt_id)
+    if not active:
+        return
+    signatures = similarity.compute_signatures([load_content(row.content_text, row.content_z) for row in active])
+    for row, signature in zip(active, signatures):
+        await similarity.index_prompt(redis, row.id, None, int(signature))
+        popularity = suggest.popularity_score(row.view_count, row.like_count, row.favorite_count)
+        await suggest.index_title(redis, row.id, row.title, popularity=popularity)
+
+
+# 消费组名 -> 处理函数；新增派生功能时在这里注册一个新的消费组
+HANDLERS = {
+    "views": handle_views,
+    "interactions": handle_interactions,
+    "indexes": handle_indexes,
+}
+
+
+async def dispatch_inline(event: Event):
+    """未启用事件管道时在请求内同步处理"""
+    for handler in HANDLERS.values():
+        await handler([event])
@@ -0,0 +1,46 @@
+"""
+提示词交互事件
+
+路由只负责写入主数据，浏览记录、计数、索引、热度、缓存等派生数据都通过事件更新：
+EVENT_PIPELINE_ENABLED 开启时事件追加到 Redis Stream（events:prompts）后立即返回，
+由 app/worker.py 中各个消费组异步批量处理；关闭时（或使用进程内 Redis 时）在请求内直接调用同样的处理函数。
+事件字段全部为字符串，尽量只放 id，处理时再从数据库读取最新状态。
+"""
+from typing import Dict
+from app.config import settings
+from app.redis_client import get_redis, IN_PROCESS
+
+# 进程内 Redis 无法与 worker 进程共享事件流
+PIPELINE_ENABLED = settings.EVENT_PIPELINE_ENABLED and not IN_PROCESS
+
+STREAM = "events:prompts"
+DEAD_LETTER_STREAM = "events:prompts:dead"
+
+PROMPT_CREATED = "created"
+PROMPT_UPDATED = "updated"
+PROMPT_DELETED = "deleted"
+PROMPT_VIEWED = "viewed"
+PROMPT_LIKED = "liked"
+PROMPT_FAVORITED = "favorited"
+
+
+async def emit(event_type: str, prompt_id: int, **fields):
+    event: Dict[str, str] = {"type": event_type, "prompt_id": str(prompt_id)}
+    event.update({key: "" if value is None else str(value) for key, value in fields.items()})
+    if not PIPELINE_ENABLED:
+        # 延迟导入：处理函数依赖数据库、索引等模块
+        from app.event_handlers import dispatch_inline
+        await dispatch_inline(event)
+        return
+    redis = await get_redis()
+    # MAXLEN 只是兜底，正常情况下由 worker 按消费进度裁剪
+    await redis.xadd(STREAM, event, maxlen=settings.EVENT_STREAM_MAXLEN, approximate=True)
+
+
+async def emit_view(prompt_id: int, user_id, ip: str):
+    await emit(PROMPT_VIEWED, prompt_id, user_id=user_id, ip=ip)
+
+
+async def emit_interaction(event_type: str, prompt_id: int, delta: int):
+    """delta 为 1（新增）或 -1（取消）"""
+    await emit(event_type, prompt_id, delta=delta)
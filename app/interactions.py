@@ -0,0 +1,141 @@
+"""
+点赞 / 收藏的原子写入
+
+每次操作只发一条语句：在 CTE 中 INSERT ... ON CONFLICT DO NOTHING RETURNING（或 DELETE ... RETURNING），
+外层 UPDATE 只在确实插入 / 删除了记录时更新计数并返回新值与作者，同一事务内再增减作者汇总（app/authors.py）。
+并发的重复点击最多只有一条生效，不会再触发唯一索引冲突。
+SQLite 不支持在 CTE 中写入，改为同一事务内的两条语句（SQLite 写事务串行执行，同样不会重复计数）。
+"""
+from typing import Optional
+from sqlalchemy import select, update, delete, and_, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import IS_SQLITE
+from app.models import Prompt
+from app import authors
+
+NOT_FOUND = "not_found"
+OWN_PROMPT = "own_prompt"
+UNCHANGED = "unchanged"
+
+
+def add_statement(model, counter: str, prompt_id: int, user_id: int):
+    counter_column = getattr(Prompt, counter)
+    inserted = (
+        pg_insert(model)
+        .from_select(
+            ["prompt_id", "user_id"],
+            select(literal(prompt_id), literal(user_id)).where(
+                and_(Prompt.id == prompt_id, Prompt.state == 1, Prompt.user_id != user_id)
+            )
+        )
+        .on_conflict_do_nothing(index_elements=["prompt_id", "user_id"])
+        .returning(model.prompt_id)
+        .cte("inserted")
+    )
+    return (
+        update(Prompt)
+        .where(Prompt.id.in_(select(inserted.c.prompt_id)))
+        .values({counter: counter_column + 1})
+        .returning(counter_column, Prompt.user_id)
+        .add_cte(inserted)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def remove_statement(model, counter: str, prompt_id: int, user_id: int):
+    counter_column = getattr(Prompt, counter)
+    deleted = (
+        delete(model)
+        .where(and_(
+            model.prompt_id == prompt_id,
+            model.user_id == user_id,
+            model.prompt_id.in_(select(Prompt.id).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
+        ))
+        .returning(model.prompt_id)
+        .cte("deleted")
+    )
+    return (
+        update(Prompt)
+        .where(Prompt.id.in_(select(deleted.c.prompt_id)))
+        .values({counter: counter_column - 1})
+        .returning(counter_column, Prompt.user_id)
+        .add_cte(deleted)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def sqlite_add_statement(model, prompt_id: int, user_id: int):
+    return (
+        sqlite_insert(model)
+        .from_select(
+            ["prompt_id", "user_id"],
+            select(literal(prompt_id), literal(user_id)).where(
+                and_(Prompt.id == prompt_id, Prompt.state == 1, Prompt.user_id != user_id)
+            )
+        )
+        .on_conflict_do_nothing(index_elements=["prompt_id", "user_id"])
+    )
+
+
+def sqlite_remove_statement(model, prompt_id: int, user_id: int):
+    return delete(model).where(and_(
+        model.prompt_id == prompt_id,
+        model.user_id == user_id,
+        model.prompt_id.in_(select(Prompt.id).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
+    ))
+
+
+async def _apply_sqlite(db: AsyncSession, statement, counter: str, prompt_id: int, delta: int):
+    result = await db.execute(statement)
+    if not result.rowcount:
+        return None
+    counter_column = getattr(Prompt, counter)
+    updated = await db.execute(
+        update(Prompt)
+        .where(Prompt.id == prompt_id)
+        .values({counter: counter_column + delta})
+        .returning(counter_column, Prompt.user_id)
+        .execution_options(synchronize_session=False)
+    )
+    return updated.one()
+
+
+async def _finish(db: AsyncSession, updated, counter: str, delta: int) -> Optional[int]:
+    """updated 为 (新计数, 作者) 或 None；计数确实变化时同一事务内增减作者汇总，提交后更新排行榜"""
+    stats = await authors.adjust(db, updated[1], **{counter: delta}) if updated is not None else None
+    await db.commit()
+    await authors.update_leaderboard([stats])
+    return updated[0] if updated is not None else None
+
+
+async def add(db: AsyncSession, model, counter: str, prompt_id: int, user_id: int) -> Optional[int]:
+    """新增点赞 / 收藏，返回更新后的计数；已存在、提示词不存在或是自己的提示词时返回 None"""
+    if IS_SQLITE:
+        updated = await _apply_sqlite(db, sqlite_add_statement(model, prompt_id, user_id), counter, prompt_id, 1)
+    else:
+        result = await db.execute(add_statement(model, counter, prompt_id, user_id))
+        updated = result.one_or_none()
+    return await _finish(db, updated, counter, 1)
+
+
+async def remove(db: AsyncSession, model, counter: str, prompt_id: int, user_id: int) -> Optional[int]:
+    """取消点赞 / 收藏，返回更新后的计数；原本不存在或提示词不存在时返回 None"""
+    if IS_SQLITE:
+        updated = await _apply_sqlite(db, sqlite_remove_statement(model, prompt_id, user_id), counter, prompt_id, -1)
+    else:
+        result = await db.execute(remove_statement(model, counter, prompt_id, user_id))
+        updated = result.one_or_none()
+    return await _finish(db, updated, counter, -1)
+
+
+async def explain_noop(db: AsyncSession, prompt_id: int, user_id: int) -> str:
+    """add / remove 未生效时查明原因，只在这种少见情况下多查一次"""
+    result = await db.execute(select(Prompt.user_id).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        return NOT_FOUND
+    if owner_id == user_id:
+        return OWN_PROMPT
+    return UNCHANGED
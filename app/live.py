@@ -0,0 +1,207 @@
+"""
+实时计数推送（Server-Sent Events）
+
+浏览、点赞、收藏的事件处理函数更新计数后，从数据库读出最新的 viewCount / likeCount / favoriteCount，
+整批发布到 Redis 频道 prompts:counters。每个 worker 只用一个 pub/sub 连接订阅该频道，
+再按提示词 id 分发给本进程内订阅了它的 SSE 连接。
+
+每个 SSE 连接只有一个等待中的协程、一个 Event 和一份待发送的 dict，不占用数据库或 Redis 连接，
+空闲连接只每隔 SSE_HEARTBEAT_SECONDS 发送一次心跳注释。
+各 worker 在哈希 live:watchers 中按提示词 id 记录本进程的 SSE 连接数（连接时 +1、断开时 -1），
+计数变化时只查询、发布有人订阅的提示词，没有订阅者时既不查数据库也不 PUBLISH。
+worker 异常退出时它的计数不会减回去，只会让这些提示词多查询几次，不会漏推送。
+同一连接两次推送之间至少间隔 SSE_MIN_INTERVAL_MS，期间同一提示词的多次变化合并为最新值，
+热门提示词每秒最多推送 1000 / SSE_MIN_INTERVAL_MS 次。
+"""
+import asyncio
+import contextlib
+import json
+import time
+from typing import Dict, Iterable, List, Set
+from app.config import settings
+from app.database import async_session_maker
+from app.redis_client import get_redis, IN_PROCESS
+from app import queries
+
+CHANNEL = "prompts:counters"
+WATCHERS_KEY = "live:watchers"
+# 新连接等待频道订阅确认的最长时间；Redis 不可用时不无限期挂起 SSE 请求
+SUBSCRIBE_TIMEOUT_SECONDS = 5
+
+
+async def load_counters(prompt_ids: Iterable[int]) -> List[dict]:
+    async with async_session_maker() as db:
+        result = await db.execute(queries.counter_rows(prompt_ids))
+        return [
+            {"id": row.id, "viewCount": row.view_count, "likeCount": row.like_count, "favoriteCount": row.favorite_count}
+            for row in result.all()
+        ]
+
+
+async def watched(prompt_ids: Iterable[int]) -> List[int]:
+    """有 SSE 连接订阅的提示词"""
+    prompt_ids = list(prompt_ids)
+    # 进程内 Redis 只有本进程一个订阅者，直接看本进程的连接
+    if IN_PROCESS:
+        return hub.watched(prompt_ids)
+    if not prompt_ids:
+        return []
+    redis = await get_redis()
+    watchers = await redis.hmget(WATCHERS_KEY, prompt_ids)
+    return [prompt_id for prompt_id, count in zip(prompt_ids, watchers) if int(count or 0) > 0]
+
+
+async def publish_counters(prompt_ids: Iterable[int]):
+    """由事件处理函数在计数变化后调用"""
+    prompt_ids = await watched(prompt_ids)
+    if not prompt_ids:
+        return
+    counters = await load_counters(prompt_ids)
+    if counters:
+        redis = await get_redis()
+        await redis.publish(CHANNEL, json.dumps(counters))
+
+
+class Subscriber:
+    def __init__(self, prompt_ids: Set[int]):
+        self.prompt_ids = prompt_ids
+        self.pending: Dict[int, dict] = {}
+        self.changed = asyncio.Event()
+
+    def push(self, counter: dict):
+        self.pending[counter["id"]] = counter
+        self.changed.set()
+
+    def take(self) -> List[dict]:
+        pending, self.pending = self.pending, {}
+        self.changed.clear()
+        return list(pending.values())
+
+
+class CounterHub:
+    """每个 worker 一个：一条 Redis 订阅连接，按提示词 id 分发给本进程的 SSE 连接"""
+    def __init__(self):
+        self._subscribers: Dict[int, Set[Subscriber]] = {}
+        self._connections = 0
+        self._listener = None
+        # 订阅连接收到 SUBSCRIBE 确认后置位，断线重连期间清除
+        self._ready = asyncio.Event()
+        self._pending_unwatch: Set[asyncio.Task] = set()
+        self.published = 0
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    async def subscribe(self, prompt_ids: Set[int]) -> Subscriber:
+        # 先登记再加入本进程，并等到频道订阅生效后才返回：返回后发布的变化一定能收到，
+        # 调用方在这之后读取的当前计数不会早于漏掉的变化。等待超时（Redis 不可用）时照常返回，
+        # 订阅恢复前的变化会丢失，下一次变化时推送的是最新值
+        await self._count_watchers(prompt_ids, 1)
+        subscriber = Subscriber(prompt_ids)
+        for prompt_id in prompt_ids:
+            self._subscribers.setdefault(prompt_id, set()).add(subscriber)
+        self._connections += 1
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(self._ready.wait(), SUBSCRIBE_TIMEOUT_SECONDS)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for prompt_id in subscriber.prompt_ids:
+            subscribers = self._subscribers.get(prompt_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[prompt_id]
+        self._connections -= 1
+        # SSE 响应体被取消时不能再等待 Redis，减计数放到后台执行
+        task = asyncio.create_task(self._count_watchers(subscriber.prompt_ids, -1))
+        self._pending_unwatch.add(task)
+        task.add_done_callback(self._pending_unwatch.discard)
+
+    async def _count_watchers(self, prompt_ids: Iterable[int], delta: int):
+        if IN_PROCESS:
+            return
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=False)
+        for prompt_id in prompt_ids:
+            # 计数归零后保留字段（最多每个提示词一个），HDEL 会与其他 worker 的 +1 竞争
+            pipe.hincrby(WATCHERS_KEY, prompt_id, delta)
+        await pipe.execute()
+
+    def watched(self, prompt_ids: Iterable[int]) -> List[int]:
+        return [prompt_id for prompt_id in prompt_ids if prompt_id in self._subscribers]
+
+    def _dispatch(self, counters: List[dict]):
+        for counter in counters:
+            for subscriber in self._subscribers.get(counter["id"], ()):
+                subscriber.push(counter)
+                self.published += 1
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        self._dispatch(json.loads(message["data"]))
+                    elif message["type"] == "subscribe":
+                        self._ready.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 断线期间的变化会丢失，下一次变化时推送的是最新值
+                await asyncio.sleep(1)
+            finally:
+                self._ready.clear()
+                if pubsub is not None:
+                    with contextlib.suppress(Exception):
+                        await pubsub.close()
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+            self._ready.clear()
+
+    def stats(self) -> dict:
+        return {"connections": self._connections, "prompts": len(self._subscribers), "published": self.published}
+
+
+hub = CounterHub()
+
+
+def _event(name: str, data) -> str:
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream(prompt_ids: Set[int]):
+    """SSE 响应体：先发送当前计数，之后推送变化（合并后的最新值）"""
+    subscriber = await hub.subscribe(prompt_ids)
+    try:
+        yield _event("counters", await load_counters(prompt_ids))
+        min_interval = settings.SSE_MIN_INTERVAL_MS / 1000
+        last_sent = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.changed.wait(), settings.SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            # 距上次推送不足最小间隔时先等待，期间到达的变化一起合并
+            wait = last_sent + min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            last_sent = time.monotonic()
+            yield _event("counters", subscriber.take())
+    finally:
+        hub.unsubscribe(subscriber)
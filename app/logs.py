@@ -0,0 +1,217 @@
+"""
+日志
+
+事件循环里只把 LogRecord 放进有界队列（QueueHandler），格式化成 JSON 和写 stdout 都在后台线程（QueueListener）中完成，
+慢速的日志输出不会阻塞请求；队列满时直接丢弃并计数，不等待。
+
+AccessLogMiddleware 为每个请求生成 request id（或沿用请求头 X-Request-Id），响应头返回同一个 id，
+请求内产生的所有日志都带上它。请求结束时写一条访问日志：路由模板、状态码、耗时、SQL 条数。
+访问日志按 LOG_ACCESS_SAMPLE_RATE 抽样，5xx 与超过 LOG_SLOW_MS 的慢请求总是记录。
+
+SQL 日志默认关闭（引擎不再 echo）：LOG_SQL=true 时按 LOG_SQL_SAMPLE_RATE 抽样记录所有请求的 SQL，
+或者只为单个请求打开：请求头 X-Log-SQL: <PROFILE_TOKEN>。
+"""
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.config import settings
+
+LOG_SQL_HEADER = b"x-log-sql"
+REQUEST_ID_HEADER = b"x-request-id"
+MAX_STATEMENT_LENGTH = 1000
+
+access_logger = logging.getLogger("app.access")
+sql_logger = logging.getLogger("app.sql")
+
+
+class RequestLog:
+    __slots__ = ("id", "sql_count", "log_sql")
+
+    def __init__(self, request_id: str, log_sql: bool):
+        self.id = request_id
+        self.sql_count = 0
+        self.log_sql = log_sql
+
+
+_request: ContextVar[Optional[RequestLog]] = ContextVar("request_log", default=None)
+
+
+def current_request_id() -> Optional[str]:
+    request = _request.get()
+    return request.id if request is not None else None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志一行 JSON；extra={"fields": {...}} 中的字段合并到顶层"""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            data["request_id"] = record.request_id
+        fields = getattr(record, "fields", None)
+        if fields:
+            data.update(fields)
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """在调用方线程只补上 request id 并入队；格式化推迟到后台线程，队列满时丢弃"""
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if not hasattr(record, "request_id"):
+            record.request_id = current_request_id()
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def setup_logging():
+    """配置根 logger（重复调用无效）；uvicorn 自己的 logger 不受影响"""
+    global _handler, _listener
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    _handler = NonBlockingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    _listener = QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+
+def stop_logging():
+    """停止后台线程前会写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def stats() -> dict:
+    return {
+        "queued": _handler.queue.qsize() if _handler is not None else 0,
+        "dropped": _handler.dropped if _handler is not None else 0,
+    }
+
+
+def instrument_engine(engine):
+    """统计每个请求的 SQL 条数；开启 SQL 日志的请求额外记录语句与耗时"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request = _request.get()
+        if request is None:
+            return
+        request.sql_count += 1
+        if request.log_sql:
+            conn.info.setdefault("log_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        request = _request.get()
+        started = conn.info.get("log_started")
+        if request is None or not request.log_sql or not started:
+            return
+        sql_logger.info("sql", extra={"fields": {
+            "statement": " ".join(statement.split())[:MAX_STATEMENT_LENGTH],
+            "ms": round((time.perf_counter() - started.pop()) * 1000, 3),
+            "executemany": executemany,
+        }})
+
+
+class AccessLogMiddleware:
+    """纯 ASGI 中间件；routes 传入 app.routes，用于把请求路径还原成路由模板（如 /prompts/{promptId}）"""
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = routes
+        self._templates = {}
+
+    def _route_template(self, scope) -> Optional[str]:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return None
+        # 同一个 endpoint 同时注册在 / 与 /api 下
+        key = (endpoint, scope["path"].startswith("/api/"))
+        if key not in self._templates:
+            self._templates[key] = next((
+                route.path for route in self.routes
+                if getattr(route, "endpoint", None) is endpoint and route.path_regex.match(scope["path"])
+            ), None)
+        return self._templates[key]
+
+    def _log_sql(self, headers) -> bool:
+        if settings.LOG_SQL:
+            return random.random() < settings.LOG_SQL_SAMPLE_RATE
+        token = headers.get(LOG_SQL_HEADER)
+        if token is None:
+            return False
+        from app.profiler import check_token
+        return check_token(token.decode())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers", []))
+        request_id = headers.get(REQUEST_ID_HEADER, b"").decode("latin-1")[:64] or uuid.uuid4().hex[:16]
+        request = RequestLog(request_id, self._log_sql(headers))
+        token = _request.set(request)
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (REQUEST_ID_HEADER, request_id.encode())]}
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            latency_ms = (time.perf_counter() - start) * 1000
+            if (status >= 500 or latency_ms >= settings.LOG_SLOW_MS or request.log_sql
+                    or random.random() < settings.LOG_ACCESS_SAMPLE_RATE):
+                access_logger.info("request", extra={"request_id": request_id, "fields": {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": self._route_template(scope),
+                    "status": status,
+                    "latency_ms": round(latency_ms, 3),
+                    "sql_count": request.sql_count,
+                }})
+            _request.reset(token)
@@ -1,10 +1,26 @@
+import asyncio
+import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, prompts
-from app.database import engine, Base
+from app.routers import auth, prompts, users, admin
+from app.config import settings
+from app.database import engine
+from app import migrations, view_partitions
+from app.cache import cache
+from app.revocation import revocations
+from app import profiler, admission, logs, suggest
+from app.redis_client import get_redis
+from app.live import hub
+
+logs.setup_logging()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="提示词管理系统")
 
+# 先注册的中间件在内层：准入控制在 CORS 之内，503 响应同样带跨域头
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -13,15 +29,56 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 配置了 PROFILE_TOKEN 或 PROFILE_SAMPLE_RATE 时才注册剖析中间件与 SQL / Redis 计时
+if profiler.enabled():
+    app.add_middleware(profiler.ProfilerMiddleware)
+    profiler.instrument_engine(engine)
+    profiler.instrument_redis()
+
+# 最外层：request id 与访问日志覆盖被准入控制拒绝的请求
+app.add_middleware(logs.AccessLogMiddleware, routes=app.routes)
+logs.instrument_engine(engine)
+
 app.include_router(auth.router)
 app.include_router(prompts.router)
+app.include_router(users.router)
+app.include_router(admin.router)
 app.include_router(auth.router, prefix="/api")
 app.include_router(prompts.router, prefix="/api")
+app.include_router(users.router, prefix="/api")
+app.include_router(admin.router, prefix="/api")
+
+# 启动后在后台执行的任务（保留引用，避免被垃圾回收）
+background_tasks = set()
+
+async def ensure_view_partitions():
+    # 分区平时由 maintain_views.py 每天补齐，这里只是兜底，不阻塞启动
+    try:
+        async with engine.begin() as conn:
+            if not await view_partitions.is_partitioned(conn):
+                logger.error("prompt_views 不是分区表，浏览记录不会按月清理，请在维护窗口执行 python maintain_views.py --migrate")
+                return
+            await view_partitions.ensure_partitions(conn)
+    except Exception as e:
+        logger.warning("补齐浏览记录分区失败: %r", e)
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # 结构版本已是最新时只查询一行，不再每次启动都执行 create_all
+    await migrations.ensure_current(engine, auto_migrate=settings.AUTO_MIGRATE)
+    cache.start_listener()
+    revocations.start_sync()
+    if engine.dialect.name == "postgresql":
+        task = asyncio.create_task(ensure_view_partitions())
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await cache.stop_listener()
+    await hub.stop_listener()
+    await revocations.stop_sync()
+    await suggest.flush_popularity(await get_redis())
 
 @app.get("/")
 async def root():
@@ -0,0 +1,502 @@
+"""
+进程内的 Redis 替代实现（REDIS_URL=memory://）
+
+用于单节点部署和本地基准测试：只实现本项目用到的命令，行为与 redis.asyncio（decode_responses=True）一致：
+  - 所有值以字符串返回，数字按 Redis 的规则转换
+  - 过期时间惰性检查，写入时定期清理已过期的 key
+  - 有序集合按 (分数, 成员的 UTF-8 字节) 排序，ZRANGEBYLEX 与 Redis 的字节序一致
+  - 每个命令都不会让出事件循环，pipeline 中的命令依次执行，天然是原子的
+数据只存在于当前进程，多个 worker 进程之间不共享；不支持 Stream，事件管道在此模式下总是同步处理。
+"""
+import asyncio
+import bisect
+import fnmatch
+import time
+from operator import itemgetter
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+# 每写入这么多次检查一遍已过期的 key
+SWEEP_EVERY = 1000
+
+# SortedSet._items 元素为 (分数, 成员的 UTF-8 字节, 成员)
+_SCORE = itemgetter(0)
+_ENCODED = itemgetter(1)
+
+
+def _str(value) -> str:
+    if isinstance(value, bytes):
+        return value.decode()
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def _flatten(values) -> List:
+    if len(values) == 1 and isinstance(values[0], (list, tuple, set)):
+        return list(values[0])
+    return list(values)
+
+
+def _parse_score(value, exclusive_ok: bool = True) -> Tuple[float, bool]:
+    """返回 (分数, 是否开区间)"""
+    value = _str(value)
+    if exclusive_ok and value.startswith("("):
+        return float(value[1:]), True
+    return float(value), False
+
+
+def _parse_lex(value) -> Tuple[Optional[bytes], bool, int]:
+    """返回 (边界, 是否闭区间, 无穷方向)：'-' 为 -1，'+' 为 1"""
+    value = value if isinstance(value, bytes) else _str(value).encode()
+    if value == b"-":
+        return None, False, -1
+    if value == b"+":
+        return None, False, 1
+    if value[:1] not in (b"[", b"("):
+        raise ValueError("ZRANGEBYLEX 边界必须以 [ 或 ( 开头")
+    return value[1:], value[:1] == b"[", 0
+
+
+class SortedSet:
+    def __init__(self):
+        self.scores: Dict[str, float] = {}
+        self._items: List[Tuple[float, bytes, str]] = []
+
+    def add(self, member: str, score: float) -> bool:
+        old = self.scores.get(member)
+        if old == score:
+            return False
+        if old is not None:
+            self._remove_item(member, old)
+        self.scores[member] = score
+        bisect.insort(self._items, (score, member.encode(), member))
+        return old is None
+
+    def remove(self, member: str) -> bool:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return False
+        self._remove_item(member, score)
+        return True
+
+    def _remove_item(self, member: str, score: float):
+        item = (score, member.encode(), member)
+        index = bisect.bisect_left(self._items, item)
+        del self._items[index]
+
+    def range(self, start: int, end: int, desc: bool = False) -> List[Tuple[str, float]]:
+        size = len(self._items)
+        start = max(start + size if start < 0 else start, 0)
+        end = end + size if end < 0 else min(end, size - 1)
+        if end < start:
+            return []
+        if desc:
+            # 倒序按下标换算后切片，不复制整个列表
+            items = self._items[size - 1 - end:size - start][::-1]
+        else:
+            items = self._items[start:end + 1]
+        return [(member, score) for score, _, member in items]
+
+    @staticmethod
+    def _limit(low: int, high: int, offset: int, count: Optional[int]) -> Tuple[int, int]:
+        """在 [low, high) 上应用 LIMIT offset count（count 为负或 None 表示不限）"""
+        low = min(low + max(offset, 0), high)
+        if count is not None and count >= 0:
+            high = min(high, low + count)
+        return low, high
+
+    def by_score(self, low, high, offset: int = 0, count: Optional[int] = None) -> List[Tuple[str, float]]:
+        low_value, low_open = (float("-inf"), False) if _str(low) == "-inf" else _parse_score(low)
+        high_value, high_open = (float("inf"), False) if _str(high) in ("+inf", "inf") else _parse_score(high)
+        start = (bisect.bisect_right if low_open else bisect.bisect_left)(self._items, low_value, key=_SCORE)
+        stop = (bisect.bisect_left if high_open else bisect.bisect_right)(self._items, high_value, key=_SCORE)
+        start, stop = self._limit(start, stop, offset, count)
+        return [(member, score) for score, _, member in self._items[start:stop]]
+
+    def by_lex(self, low, high, offset: int = 0, count: Optional[int] = None) -> List[str]:
+        # 与 Redis 一样，只有所有成员分数相同时结果才有意义（此时 _items 按成员字节有序，可以二分）
+        low_bound, low_closed, low_inf = _parse_lex(low)
+        high_bound, high_closed, high_inf = _parse_lex(high)
+        if low_inf == 1 or high_inf == -1:
+            return []
+        start, stop = 0, len(self._items)
+        if low_inf == 0:
+            start = (bisect.bisect_left if low_closed else bisect.bisect_right)(self._items, low_bound, key=_ENCODED)
+        if high_inf == 0:
+            stop = (bisect.bisect_right if high_closed else bisect.bisect_left)(self._items, high_bound, key=_ENCODED)
+        start, stop = self._limit(start, max(start, stop), offset, count)
+        return [member for _, _, member in self._items[start:stop]]
+
+    def __len__(self):
+        return len(self.scores)
+
+
+class MemoryPipeline:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str):
+        if not hasattr(self._client, name):
+            raise AttributeError(name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self) -> List[Any]:
+        commands, self._commands = self._commands, []
+        return [await getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands = []
+
+
+class MemoryPubSub:
+    def __init__(self, client: "MemoryRedis"):
+        self._client = client
+        self._queue: "asyncio.Queue[dict]" = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def subscribe(self, *channels):
+        for channel in channels:
+            channel = _str(channel)
+            self.channels.add(channel)
+            self._client._subscribers.setdefault(channel, set()).add(self)
+            self._queue.put_nowait({"type": "subscribe", "channel": channel, "data": len(self.channels)})
+
+    async def unsubscribe(self, *channels):
+        for channel in [_str(c) for c in channels] or list(self.channels):
+            self.channels.discard(channel)
+            self._client._subscribers.get(channel, set()).discard(self)
+
+    async def listen(self) -> AsyncIterator[dict]:
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        await self.unsubscribe()
+
+    aclose = close
+
+
+class MemoryRedis:
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._subscribers: Dict[str, Set[MemoryPubSub]] = {}
+        self._writes = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "MemoryRedis":
+        return cls()
+
+    # ---- key 与过期时间 ----
+
+    def _alive(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            del self._expires[key]
+            return False
+        return key in self._data
+
+    def _get(self, key, kind):
+        key = _str(key)
+        if not self._alive(key):
+            return None
+        value = self._data[key]
+        if not isinstance(value, kind):
+            raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _get_or_create(self, key, kind):
+        value = self._get(key, kind)
+        if value is None:
+            value = self._data[_str(key)] = kind()
+        return value
+
+    def _written(self, key: str):
+        # 集合类型删空后与 Redis 一样视为不存在
+        value = self._data.get(key)
+        if isinstance(value, (dict, set, SortedSet)) and not len(value):
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            now = time.monotonic()
+            for expired in [k for k, t in self._expires.items() if t <= now]:
+                self._data.pop(expired, None)
+                del self._expires[expired]
+
+    async def delete(self, *names) -> int:
+        count = 0
+        for name in names:
+            name = _str(name)
+            if self._alive(name):
+                count += 1
+            self._data.pop(name, None)
+            self._expires.pop(name, None)
+        return count
+
+    async def exists(self, *names) -> int:
+        return sum(1 for name in names if self._alive(_str(name)))
+
+    async def expire(self, name, time_seconds) -> bool:
+        name = _str(name)
+        if not self._alive(name):
+            return False
+        self._expires[name] = time.monotonic() + float(time_seconds)
+        return True
+
+    async def ttl(self, name) -> int:
+        name = _str(name)
+        if not self._alive(name):
+            return -2
+        expires_at = self._expires.get(name)
+        return -1 if expires_at is None else max(int(round(expires_at - time.monotonic())), 0)
+
+    async def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None):
+        for key in list(self._data):
+            if self._alive(key) and (match is None or fnmatch.fnmatchcase(key, match)):
+                yield key
+
+    async def flushall(self):
+        self._data.clear()
+        self._expires.clear()
+
+    # ---- 字符串与计数器 ----
+
+    async def get(self, name) -> Optional[str]:
+        return self._get(name, str)
+
+    async def mget(self, keys, *args) -> List[Optional[str]]:
+        return [self._get(key, str) for key in _flatten((keys,) + args)]
+
+    async def set(self, name, value, ex=None, px=None, nx: bool = False, xx: bool = False,
+                  keepttl: bool = False) -> Optional[bool]:
+        name = _str(name)
+        exists = self._alive(name)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._data[name] = _str(value)
+        if ex is not None:
+            self._expires[name] = time.monotonic() + float(ex)
+        elif px is not None:
+            self._expires[name] = time.monotonic() + float(px) / 1000
+        elif not keepttl:
+            self._expires.pop(name, None)
+        self._written(name)
+        return True
+
+    async def setex(self, name, time_seconds, value) -> bool:
+        return await self.set(name, value, ex=time_seconds)
+
+    async def incr(self, name, amount: int = 1) -> int:
+        return await self.incrby(name, amount)
+
+    async def incrby(self, name, amount: int = 1) -> int:
+        name = _str(name)
+        current = self._get(name, str)
+        try:
+            value = int(current or 0) + int(amount)
+        except ValueError:
+            raise ValueError("ERR value is not an integer or out of range")
+        self._data[name] = str(value)
+        self._written(name)
+        return value
+
+    async def delete_if_equals(self, name, value) -> int:
+        """仅当值等于 value 时删除（对应 Redis 中常见的 compare-and-delete 脚本）"""
+        if self._get(name, str) != _str(value):
+            return 0
+        return await self.delete(name)
+
+    # ---- 哈希 ----
+
+    async def hget(self, name, key) -> Optional[str]:
+        value = self._get(name, dict)
+        return None if value is None else value.get(_str(key))
+
+    async def hmget(self, name, keys, *args) -> List[Optional[str]]:
+        value = self._get(name, dict) or {}
+        return [value.get(_str(key)) for key in _flatten((keys,) + args)]
+
+    async def hset(self, name, key=None, value=None, mapping: Optional[dict] = None) -> int:
+        data = self._get_or_create(name, dict)
+        items = dict(mapping or {})
+        if key is not None:
+            items[key] = value
+        added = 0
+        for field, field_value in items.items():
+            field = _str(field)
+            added += field not in data
+            data[field] = _str(field_value)
+        self._written(_str(name))
+        return added
+
+    async def hincrby(self, name, key, amount: int = 1) -> int:
+        data = self._get_or_create(name, dict)
+        field = _str(key)
+        try:
+            value = int(data.get(field) or 0) + int(amount)
+        except ValueError:
+            raise ValueError("ERR hash value is not an integer")
+        data[field] = str(value)
+        self._written(_str(name))
+        return value
+
+    async def hdel(self, name, *keys) -> int:
+        data = self._get(name, dict)
+        if data is None:
+            return 0
+        removed = sum(1 for key in keys if data.pop(_str(key), None) is not None)
+        self._written(_str(name))
+        return removed
+
+    async def hgetall(self, name) -> Dict[str, str]:
+        return dict(self._get(name, dict) or {})
+
+    # ---- 集合 ----
+
+    async def sadd(self, name, *values) -> int:
+        data = self._get_or_create(name, set)
+        before = len(data)
+        data.update(_str(value) for value in values)
+        self._written(_str(name))
+        return len(data) - before
+
+    async def srem(self, name, *values) -> int:
+        data = self._get(name, set)
+        if data is None:
+            return 0
+        before = len(data)
+        data.difference_update(_str(value) for value in values)
+        self._written(_str(name))
+        return before - len(data)
+
+    async def smembers(self, name) -> Set[str]:
+        return set(self._get(name, set) or ())
+
+    async def sunion(self, keys, *args) -> Set[str]:
+        result: Set[str] = set()
+        for key in _flatten((keys,) + args):
+            result.update(self._get(key, set) or ())
+        return result
+
+    # ---- 有序集合 ----
+
+    async def zadd(self, name, mapping: dict, nx: bool = False, xx: bool = False) -> int:
+        data = self._get_or_create(name, SortedSet)
+        added = 0
+        for member, score in mapping.items():
+            member = _str(member)
+            exists = member in data.scores
+            if (nx and exists) or (xx and not exists):
+                continue
+            added += data.add(member, float(score))
+        self._written(_str(name))
+        return added
+
+    async def zrem(self, name, *values) -> int:
+        data = self._get(name, SortedSet)
+        if data is None:
+            return 0
+        removed = sum(1 for value in values if data.remove(_str(value)))
+        self._written(_str(name))
+        return removed
+
+    async def zincrby(self, name, amount, value) -> float:
+        data = self._get_or_create(name, SortedSet)
+        member = _str(value)
+        score = data.scores.get(member, 0.0) + float(amount)
+        data.add(member, score)
+        self._written(_str(name))
+        return score
+
+    async def zscore(self, name, value) -> Optional[float]:
+        data = self._get(name, SortedSet)
+        return None if data is None else data.scores.get(_str(value))
+
+    async def zmscore(self, key, members: Iterable) -> List[Optional[float]]:
+        data = self._get(key, SortedSet)
+        return [None if data is None else data.scores.get(_str(member)) for member in members]
+
+    async def zcard(self, name) -> int:
+        data = self._get(name, SortedSet)
+        return 0 if data is None else len(data)
+
+    async def zrange(self, name, start: int, end: int, desc: bool = False, withscores: bool = False,
+                     score_cast_func=float):
+        data = self._get(name, SortedSet)
+        items = data.range(int(start), int(end), desc) if data is not None else []
+        if withscores:
+            return [(member, score_cast_func(score)) for member, score in items]
+        return [member for member, _ in items]
+
+    async def zrevrange(self, name, start: int, end: int, withscores: bool = False, score_cast_func=float):
+        return await self.zrange(name, start, end, desc=True, withscores=withscores,
+                                 score_cast_func=score_cast_func)
+
+    async def zrangebyscore(self, name, min, max, start: Optional[int] = None, num: Optional[int] = None,
+                            withscores: bool = False, score_cast_func=float):
+        data = self._get(name, SortedSet)
+        # 与 Redis 一样，start 与 num 同时给出时才生效；只取出需要的那一段
+        limit = (int(start), int(num)) if start is not None and num is not None else (0, None)
+        items = data.by_score(min, max, *limit) if data is not None else []
+        if withscores:
+            return [(member, score_cast_func(score)) for member, score in items]
+        return [member for member, _ in items]
+
+    async def zremrangebyscore(self, name, min, max) -> int:
+        data = self._get(name, SortedSet)
+        if data is None:
+            return 0
+        items = data.by_score(min, max)
+        for member, _ in items:
+            data.remove(member)
+        self._written(_str(name))
+        return len(items)
+
+    async def zremrangebyrank(self, name, min: int, max: int) -> int:
+        data = self._get(name, SortedSet)
+        if data is None:
+            return 0
+        items = data.range(int(min), int(max))
+        for member, _ in items:
+            data.remove(member)
+        self._written(_str(name))
+        return len(items)
+
+    async def zrangebylex(self, name, min, max, start: Optional[int] = None, num: Optional[int] = None):
+        data = self._get(name, SortedSet)
+        limit = (int(start), int(num)) if start is not None and num is not None else (0, None)
+        return data.by_lex(min, max, *limit) if data is not None else []
+
+    # ---- 发布订阅 ----
+
+    async def publish(self, channel, message) -> int:
+        subscribers = self._subscribers.get(_str(channel), set())
+        for pubsub in subscribers:
+            pubsub._queue.put_nowait({"type": "message", "channel": _str(channel), "data": _str(message)})
+        return len(subscribers)
+
+    def pubsub(self) -> MemoryPubSub:
+        return MemoryPubSub(self)
+
+    # ---- 其他 ----
+
+    def pipeline(self, transaction: bool = True) -> MemoryPipeline:
+        return MemoryPipeline(self)
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+    aclose = close
@@ -0,0 +1,138 @@
+"""
+迁移使用的冻结表结构
+
+app/models.py 描述的是最新结构，迁移不能直接用它建表：之后对模型的修改会混进早期版本，
+后续迁移执行时表和列已经存在。这里按版本记录各迁移创建时的表结构，发布后不再修改；
+结构变更写成新的迁移，需要建新表时在这里追加该版本的表定义。
+"""
+from sqlalchemy import (
+    BigInteger, Column, Date, DateTime, ForeignKey, Index, Integer, LargeBinary, MetaData, String, Table, Text, text
+)
+from sqlalchemy.sql import func
+from app.database import IS_SQLITE
+
+metadata = MetaData()
+
+# ---- 版本 1：基线结构 ----
+
+users = Table(
+    "users", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("username", String(50), unique=True, nullable=False, index=True),
+    Column("email", String(100), unique=True, nullable=True, index=True),
+    Column("hashed_password", String(255), nullable=False),
+    Column("state", Integer),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+)
+
+prompts = Table(
+    "prompts", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("title", String(200), nullable=False),
+    Column("content", Text, nullable=True),
+    Column("content_z", LargeBinary, nullable=True),
+    Column("state", Integer),
+    Column("view_count", Integer),
+    Column("like_count", Integer),
+    Column("favorite_count", Integer),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Column("updated_at", DateTime(timezone=True)),
+    Index("idx_user_state", "user_id", "state"),
+)
+Index("idx_prompts_active_created", prompts.c.created_at.desc(), prompts.c.id.desc(),
+      postgresql_where=text("state = 1"), sqlite_where=text("state = 1"))
+Index("idx_prompts_user_active_created", prompts.c.user_id, prompts.c.created_at.desc(), prompts.c.id.desc(),
+      postgresql_where=text("state = 1"), sqlite_where=text("state = 1"))
+
+prompt_revisions = Table(
+    "prompt_revisions", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False),
+    Column("version", Integer, nullable=False),
+    Column("title", String(200), nullable=False),
+    Column("is_snapshot", Integer),
+    Column("data", Text, nullable=False),
+    Column("content_length", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("idx_prompt_version", "prompt_id", "version", unique=True),
+)
+
+tags = Table(
+    "tags", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(50), unique=True, nullable=False),
+    Column("prompt_count", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+Index("idx_tags_prompt_count", tags.c.prompt_count.desc(), tags.c.id)
+
+prompt_tags = Table(
+    "prompt_tags", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False),
+    Column("tag_id", Integer, ForeignKey("tags.id"), nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Index("idx_prompt_tag", "prompt_id", "tag_id", unique=True),
+)
+Index("idx_tag_created", prompt_tags.c.tag_id, prompt_tags.c.created_at.desc(), prompt_tags.c.prompt_id.desc())
+
+prompt_views = Table(
+    "prompt_views", metadata,
+    Column("id", BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=True, index=True),
+    Column("ip_address", String(45), nullable=False),
+    Column("created_at", DateTime(timezone=True), primary_key=not IS_SQLITE, server_default=func.now()),
+    Index("idx_prompt_ip", "prompt_id", "ip_address"),
+    postgresql_partition_by="RANGE (created_at)",
+)
+
+prompt_view_stats = Table(
+    "prompt_view_stats", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False),
+    Column("month", Date, nullable=False),
+    Column("view_count", Integer, nullable=False),
+    Column("user_count", Integer, nullable=False),
+    Index("idx_view_stat_prompt_month", "prompt_id", "month", unique=True),
+)
+
+prompt_likes = Table(
+    "prompt_likes", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("idx_prompt_user_like", "prompt_id", "user_id", unique=True),
+)
+Index("idx_like_user_created", prompt_likes.c.user_id, prompt_likes.c.created_at.desc(), prompt_likes.c.id.desc())
+
+prompt_favorites = Table(
+    "prompt_favorites", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("prompt_id", Integer, ForeignKey("prompts.id"), nullable=False, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+    Index("idx_prompt_user_fav", "prompt_id", "user_id", unique=True),
+)
+Index("idx_fav_user_created", prompt_favorites.c.user_id, prompt_favorites.c.created_at.desc(),
+      prompt_favorites.c.id.desc())
+
+V1_TABLES = [
+    users, prompts, prompt_revisions, tags, prompt_tags, prompt_views, prompt_view_stats,
+    prompt_likes, prompt_favorites,
+]
+
+# ---- 版本 2：作者统计 ----
+
+author_stats = Table(
+    "author_stats", metadata,
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    Column("prompt_count", Integer, nullable=False),
+    Column("view_count", Integer, nullable=False),
+    Column("like_count", Integer, nullable=False),
+    Column("favorite_count", Integer, nullable=False),
+)
@@ -0,0 +1,80 @@
+"""
+版本化的数据库结构迁移
+
+schema_version 表只有一行，记录已执行到的版本号。启动时只查询这一行（不反射表结构、不执行 create_all）：
+版本已是最新时直接就绪；落后时执行尚未执行的迁移，PostgreSQL 上先取事务级咨询锁，
+多个 worker 同时启动时只有一个在执行，其余拿到锁后看到的已是新版本。
+修改表结构时在 MIGRATIONS 末尾追加新版本，不要修改已发布的迁移。
+迁移按 app/migration_tables.py 中冻结的表结构建表，不使用 app/models.py 的最新模型。
+"""
+import logging
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from app.schema import upgrade_schema
+from app import authors, migration_tables
+
+logger = logging.getLogger(__name__)
+
+# PostgreSQL 咨询锁的键，任意固定整数即可
+LOCK_KEY = 720_042
+
+
+async def _baseline(conn):
+    """全新的库直接建表；迁移机制之前用 create_all 建立的库补齐新增列、索引与浏览记录分区"""
+    await conn.run_sync(migration_tables.metadata.create_all, tables=migration_tables.V1_TABLES)
+    await upgrade_schema(conn, migration_tables.V1_TABLES)
+
+
+async def _author_stats(conn):
+    """作者汇总表，按已有提示词一次性统计"""
+    await conn.run_sync(migration_tables.metadata.create_all, tables=[migration_tables.author_stats])
+    await authors.recount(conn)
+
+
+# (版本, 说明, 迁移函数)，迁移函数在同一个事务中依次执行
+MIGRATIONS = [
+    (1, "基线结构", _baseline),
+    (2, "作者统计", _author_stats),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+async def current_version(engine) -> int:
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(text("SELECT version FROM schema_version"))
+            return result.scalar() or 0
+    except DBAPIError:
+        # 表不存在：全新的库，或迁移机制之前建立的库
+        return 0
+
+
+async def migrate(engine) -> List[int]:
+    """执行所有未执行的迁移，返回本次执行的版本"""
+    applied = []
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOCK_KEY})
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+        version = (await conn.execute(text("SELECT version FROM schema_version"))).scalar()
+        if version is None:
+            await conn.execute(text("INSERT INTO schema_version (version) VALUES (0)"))
+            version = 0
+        for number, description, upgrade in MIGRATIONS:
+            if number > version:
+                logger.info("执行数据库迁移 %s：%s", number, description)
+                await upgrade(conn)
+                applied.append(number)
+        if applied:
+            await conn.execute(text("UPDATE schema_version SET version = :version"), {"version": applied[-1]})
+    return applied
+
+
+async def ensure_current(engine, auto_migrate: bool = True):
+    """启动时调用：版本已是最新时只有一次单行查询"""
+    if await current_version(engine) >= LATEST:
+        return
+    if not auto_migrate:
+        raise RuntimeError(f"数据库结构版本落后（最新为 {LATEST}），请先执行 python init_db.py")
+    await migrate(engine)
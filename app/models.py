@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Text, Date, DateTime, ForeignKey, Index, LargeBinary, text
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, IS_SQLITE
+from app.config import settings
+from app import compression
 
 class User(Base):
     __tablename__ = "users"
@@ -19,7 +22,9 @@ class Prompt(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     title = Column(String(200), nullable=False)
-    content = Column(Text, nullable=False)
+    # 正文存在 content（原文）或 content_z（压缩）其中之一，统一通过 Prompt.content 读写
+    content_text = Column("content", Text, nullable=True)
+    content_z = Column(LargeBinary, nullable=True)
     state = Column(Integer, default=1)  # 0=已删除, 1=正常
     view_count = Column(Integer, default=0)
     like_count = Column(Integer, default=0)
@@ -29,19 +34,118 @@ class Prompt(Base):
     
     __table_args__ = (
         Index('idx_user_state', 'user_id', 'state'),
+        # 列表 / 我的提示词按 created_at desc, id desc 分页，只索引正常状态的记录
+        Index('idx_prompts_active_created', created_at.desc(), id.desc(),
+              postgresql_where=text('state = 1'), sqlite_where=text('state = 1')),
+        Index('idx_prompts_user_active_created', user_id, created_at.desc(), id.desc(),
+              postgresql_where=text('state = 1'), sqlite_where=text('state = 1')),
+    )
+    
+    @hybrid_property
+    def content(self):
+        # 只在访问正文时才解压
+        return compression.load_content(self.content_text, self.content_z)
+    
+    @content.setter
+    def content(self, value):
+        for key, column_value in Prompt.content_values(value).items():
+            setattr(self, key, column_value)
+    
+    @content.expression
+    def content(cls):
+        return cls.content_text
+    
+    @staticmethod
+    def content_values(value: str) -> dict:
+        """批量 update(Prompt).values(...) 时用它生成正文列，不要直接写 content="""
+        data = compression.maybe_compress(value) if settings.CONTENT_COMPRESSION else None
+        if data is None:
+            return {"content_text": value, "content_z": None}
+        return {"content_text": None, "content_z": data}
+
+class AuthorStats(Base):
+    """作者正常状态提示词的数量与所获浏览 / 点赞 / 收藏总数，与提示词上的计数在同一事务中增减（见 app/authors.py）"""
+    __tablename__ = "author_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    prompt_count = Column(Integer, nullable=False, default=0)
+    view_count = Column(Integer, nullable=False, default=0)
+    like_count = Column(Integer, nullable=False, default=0)
+    favorite_count = Column(Integer, nullable=False, default=0)
+
+class PromptRevision(Base):
+    __tablename__ = "prompt_revisions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    version = Column(Integer, nullable=False)
+    title = Column(String(200), nullable=False)
+    is_snapshot = Column(Integer, default=0)  # 1=全文快照, 0=相对上一版本的增量
+    data = Column(Text, nullable=False)
+    content_length = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_prompt_version', 'prompt_id', 'version', unique=True),
+    )
+
+class Tag(Base):
+    __tablename__ = "tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, nullable=False)
+    # 正常状态提示词的数量，随打标签 / 删除提示词同步维护，标签侧栏不需要 GROUP BY
+    prompt_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index('idx_tags_prompt_count', prompt_count.desc(), id),
+    )
+
+class PromptTag(Base):
+    """只保存正常状态提示词的标签，提示词删除时一并删除"""
+    __tablename__ = "prompt_tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id"), nullable=False)
+    # 冗余提示词的 created_at，按标签筛选时直接沿索引顺序分页
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    
+    __table_args__ = (
+        Index('idx_prompt_tag', 'prompt_id', 'tag_id', unique=True),
+        Index('idx_tag_created', tag_id, created_at.desc(), prompt_id.desc()),
     )
 
 class PromptView(Base):
     __tablename__ = "prompt_views"
     
-    id = Column(Integer, primary_key=True, index=True)
+    # 按月分区（见 app/view_partitions.py），分区键 created_at 必须包含在主键中；
+    # SQLite 不分区，且只有单列 INTEGER 主键才能自增
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
     ip_address = Column(String(45), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=not IS_SQLITE, server_default=func.now())
     
     __table_args__ = (
         Index('idx_prompt_ip', 'prompt_id', 'ip_address'),
+        {'postgresql_partition_by': 'RANGE (created_at)'},
+    )
+
+class PromptViewStat(Base):
+    """超过保留期的浏览记录按提示词、按月汇总"""
+    __tablename__ = "prompt_view_stats"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_id = Column(Integer, ForeignKey("prompts.id"), nullable=False)
+    month = Column(Date, nullable=False)
+    view_count = Column(Integer, nullable=False, default=0)
+    user_count = Column(Integer, nullable=False, default=0)  # 登录用户去重数
+    
+    __table_args__ = (
+        Index('idx_view_stat_prompt_month', 'prompt_id', 'month', unique=True),
     )
 
 class PromptLike(Base):
@@ -54,6 +158,8 @@ class PromptLike(Base):
     
     __table_args__ = (
         Index('idx_prompt_user_like', 'prompt_id', 'user_id', unique=True),
+        # 我的点赞按点赞时间倒序分页
+        Index('idx_like_user_created', user_id, created_at.desc(), id.desc()),
     )
 
 class PromptFavorite(Base):
@@ -66,4 +172,6 @@ class PromptFavorite(Base):
     
     __table_args__ = (
         Index('idx_prompt_user_fav', 'prompt_id', 'user_id', unique=True),
+        # 我的收藏按收藏时间倒序分页
+        Index('idx_fav_user_created', user_id, created_at.desc(), id.desc()),
     )
@@ -0,0 +1,383 @@
+"""
+按需请求剖析
+
+默认关闭且没有任何开销：只有配置了 PROFILE_TOKEN 或 PROFILE_SAMPLE_RATE > 0 时才注册中间件和 SQL / Redis 计时。
+以下请求会被剖析：
+  - 请求头 X-Profile: <PROFILE_TOKEN>，或查询参数 __profile=<PROFILE_TOKEN>
+  - 按 PROFILE_SAMPLE_RATE 随机抽样的请求
+剖析期间后台线程每隔 PROFILE_INTERVAL_MS 读取事件循环线程的调用栈：
+事件循环正在执行该请求的任务时记录调用栈，否则记为 “(等待)”（等待数据库、Redis 或其他请求占用事件循环）。
+同时记录该请求内每条 SQL 与每个 Redis 命令的耗时。请求内另起的后台任务不计入。
+结果写入 Redis（保留最近 PROFILE_KEEP 条），响应头 X-Profile-Id 返回 id，
+通过 /admin/profiles 查看列表并下载 collapsed stack（flamegraph.pl）或 speedscope 格式。
+"""
+import asyncio
+import inspect
+import json
+import logging
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+HEADER = "x-profile"
+QUERY_PARAM = "__profile"
+INDEX_KEY = "profiles:index"
+# 单个剖析结果最多保留的 SQL / Redis 明细条数
+MAX_CALLS = 200
+MAX_STATEMENT_LENGTH = 300
+MAX_STACK_DEPTH = 128
+WAITING = "(等待)"
+
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+def enabled() -> bool:
+    return bool(settings.PROFILE_TOKEN) or settings.PROFILE_SAMPLE_RATE > 0
+
+
+def check_token(value: Optional[str]) -> bool:
+    return bool(settings.PROFILE_TOKEN) and secrets.compare_digest(value or "", settings.PROFILE_TOKEN)
+
+
+def _profile_key(profile_id: str) -> str:
+    return f"profile:{profile_id}"
+
+
+class Profile:
+    def __init__(self, method: str, path: str, reason: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status: Optional[int] = None
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.samples: Counter = Counter()
+        self.sql: List[dict] = []
+        self.sql_ms = 0.0
+        self.sql_count = 0
+        self.redis: List[dict] = []
+        self.redis_ms = 0.0
+        self.redis_count = 0
+
+    def add_sql(self, statement: str, ms: float):
+        self.sql_ms += ms
+        self.sql_count += 1
+        if len(self.sql) < MAX_CALLS:
+            self.sql.append({"statement": " ".join(statement.split())[:MAX_STATEMENT_LENGTH], "ms": round(ms, 3)})
+
+    def add_redis(self, command: str, ms: float):
+        self.redis_ms += ms
+        self.redis_count += 1
+        if len(self.redis) < MAX_CALLS:
+            self.redis.append({"command": command, "ms": round(ms, 3)})
+
+    def finish(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "reason": self.reason,
+            "status": self.status,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 3),
+            "interval_ms": settings.PROFILE_INTERVAL_MS,
+            "sample_count": sum(self.samples.values()),
+            "sql_count": self.sql_count,
+            "sql_ms": round(self.sql_ms, 3),
+            "redis_count": self.redis_count,
+            "redis_ms": round(self.redis_ms, 3),
+        }
+
+    def to_dict(self) -> dict:
+        return {**self.summary(), "samples": dict(self.samples), "sql": self.sql, "redis": self.redis}
+
+
+# 正在剖析的请求：asyncio 任务 -> Profile
+_active: Dict[asyncio.Task, Profile] = {}
+
+
+def current() -> Optional[Profile]:
+    if not _active:
+        return None
+    try:
+        return _active.get(asyncio.current_task())
+    except RuntimeError:
+        return None
+
+
+_frame_names: Dict[object, str] = {}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    name = _frame_names.get(code)
+    if name is None:
+        filename = code.co_filename
+        for prefix in sys.path:
+            if prefix and filename.startswith(prefix):
+                filename = os.path.relpath(filename, prefix)
+                break
+        name = _frame_names[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+    return name
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        # 到事件循环调度回调的位置为止，上面是 asyncio / uvicorn 的公共部分
+        if frame.f_code.co_name == "_run" and frame.f_code.co_filename.startswith(_ASYNCIO_DIR):
+            break
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class Sampler:
+    """有请求在剖析时才运行的后台采样线程"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    def ensure_running(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._loop = asyncio.get_running_loop()
+            self._loop_thread_id = threading.get_ident()
+            self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        while True:
+            time.sleep(interval)
+            profiles = list(_active.items())
+            if not profiles:
+                with self._lock:
+                    if not _active:
+                        self._thread = None
+                        return
+                continue
+            # 读取事件循环线程当前执行的任务（asyncio 内部登记表，只读）
+            running = asyncio.tasks._current_tasks.get(self._loop)
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _collapse(frame) if frame is not None else WAITING
+            for task, profile in profiles:
+                profile.samples[stack if task is running else WAITING] += 1
+
+
+_sampler = Sampler()
+
+
+class ProfilerMiddleware:
+    """纯 ASGI 中间件：请求在同一个任务中执行，采样线程据此判断事件循环是否在处理该请求"""
+    def __init__(self, app):
+        self.app = app
+
+    def _reason(self, scope) -> Optional[str]:
+        if settings.PROFILE_TOKEN:
+            for name, value in scope.get("headers", []):
+                if name == HEADER.encode() and check_token(value.decode()):
+                    return "header"
+            query = scope.get("query_string", b"")
+            if QUERY_PARAM.encode() in query and check_token(parse_qs(query.decode()).get(QUERY_PARAM, [""])[0]):
+                return "query"
+        if settings.PROFILE_SAMPLE_RATE > 0 and random.random() < settings.PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/admin/") or scope["path"].startswith("/api/admin/"):
+            await self.app(scope, receive, send)
+            return
+        reason = self._reason(scope)
+        if reason is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], reason)
+        task = asyncio.current_task()
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        _active[task] = profile
+        _sampler.ensure_running()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active.pop(task, None)
+            profile.finish()
+            try:
+                await save(profile)
+            except Exception as e:
+                logger.warning("保存剖析结果失败: %r", e)
+
+
+async def save(profile: Profile):
+    redis = await get_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.setex(_profile_key(profile.id), settings.PROFILE_TTL, json.dumps(profile.to_dict(), ensure_ascii=False))
+    pipe.zadd(INDEX_KEY, {profile.id: profile.started_at})
+    # 只保留最近 PROFILE_KEEP 条（按排名删除最早的）
+    pipe.zremrangebyrank(INDEX_KEY, 0, -settings.PROFILE_KEEP - 1)
+    await pipe.execute()
+
+
+async def list_profiles(limit: int = 50) -> List[dict]:
+    redis = await get_redis()
+    ids = await redis.zrange(INDEX_KEY, 0, limit - 1, desc=True)
+    if not ids:
+        return []
+    values = await redis.mget([_profile_key(profile_id) for profile_id in ids])
+    result = []
+    for value in values:
+        if value is not None:
+            data = json.loads(value)
+            result.append({key: data[key] for key in data if key not in ("samples", "sql", "redis")})
+    return result
+
+
+async def load_profile(profile_id: str) -> Optional[dict]:
+    redis = await get_redis()
+    value = await redis.get(_profile_key(profile_id))
+    return json.loads(value) if value is not None else None
+
+
+def to_collapsed(profile: dict) -> str:
+    """flamegraph.pl / speedscope 都能导入的 collapsed stack 文本：每行 “栈 次数”"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["samples"].items())
+
+
+def to_speedscope(profile: dict) -> dict:
+    frames: List[dict] = []
+    frame_index: Dict[str, int] = {}
+    samples, weights = [], []
+    for stack, count in profile["samples"].items():
+        indexes = []
+        for name in stack.split(";"):
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({"name": name})
+            indexes.append(frame_index[name])
+        samples.append(indexes)
+        weights.append(count * profile["interval_ms"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile['method']} {profile['path']}",
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights,
+        }],
+        "name": f"{profile['method']} {profile['path']} ({profile['id']})",
+        "exporter": "prompt-words-back-end",
+    }
+
+
+# ---- SQL / Redis 计时（只在 enabled() 时安装） ----
+
+def instrument_engine(engine):
+    from sqlalchemy import event
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if current() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # SQLAlchemy 的 greenlet 在请求所在的任务中运行，current() 能找到对应的剖析
+        profile = current()
+        started = conn.info.get("profile_started")
+        if profile is not None and started:
+            profile.add_sql(statement, (time.perf_counter() - started.pop()) * 1000)
+
+
+class TimedPipeline:
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+        self._commands: List[str] = []
+
+    def __getattr__(self, name):
+        attr = getattr(self._pipeline, name)
+        if name == "execute" or not callable(attr):
+            return attr
+
+        def queue(*args, **kwargs):
+            self._commands.append(name)
+            attr(*args, **kwargs)
+            return self
+        return queue
+
+    async def execute(self, *args, **kwargs):
+        profile = current()
+        start = time.perf_counter()
+        try:
+            return await self._pipeline.execute(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.add_redis(f"pipeline[{','.join(self._commands)}]", (time.perf_counter() - start) * 1000)
+
+
+class TimedRedis:
+    """为正在剖析的请求记录每个 Redis 命令的耗时，其余请求直接透传"""
+    def __init__(self, client):
+        self._client = client
+
+    def pipeline(self, *args, **kwargs):
+        return TimedPipeline(self._client.pipeline(*args, **kwargs))
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        # redis.asyncio 的命令方法是返回协程的普通函数（return self.execute_command(...)），
+        # 不能按 iscoroutinefunction 判断，调用后结果可等待时才计时
+        def timed(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            profile = current()
+            if profile is None or not inspect.isawaitable(result):
+                return result
+            return _timed_await(profile, name, result)
+        return timed
+
+
+async def _timed_await(profile: Profile, name: str, awaitable):
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        profile.add_redis(name, (time.perf_counter() - start) * 1000)
+
+
+def instrument_redis():
+    from app import redis_client
+    if not isinstance(redis_client.client(), TimedRedis):
+        redis_client.redis_client = TimedRedis(redis_client.client())
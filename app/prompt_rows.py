@@ -0,0 +1,41 @@
+"""
+列表接口的只读结果
+
+列表只是把每行数据原样输出，不需要 ORM 对象的身份映射、属性埋点和变更追踪：
+queries 中的分页查询只选出 LIST_COLUMNS，返回的 Row（命名元组）直接转换成
+与 PromptResponse.model_dump(by_alias=True) 相同结构的 dict，也不再逐条经过 pydantic 校验。
+字段有增减时需与 schemas.PromptResponse 保持一致。
+"""
+from typing import Dict, Iterable, List
+from app.compression import load_content
+
+
+def response_item(row, tags: List[str], is_liked: bool = False, is_favorited: bool = False) -> Dict:
+    return {
+        "id": row.id,
+        "userId": row.user_id,
+        "title": row.title,
+        "content": load_content(row.content_text, row.content_z),
+        "state": row.state,
+        "viewCount": row.view_count,
+        "likeCount": row.like_count,
+        "favoriteCount": row.favorite_count,
+        "createdAt": row.created_at,
+        "updatedAt": row.updated_at,
+        "isLiked": is_liked,
+        "isFavorited": is_favorited,
+        "tags": tags,
+    }
+
+
+def with_flags(items: Iterable[Dict], liked_ids, favorited_ids) -> List[Dict]:
+    """补充当前用户的点赞 / 收藏状态，返回新的 dict，不修改传入的（可能来自缓存的）对象"""
+    return [
+        {**item, "isLiked": item["id"] in liked_ids, "isFavorited": item["id"] in favorited_ids}
+        for item in items
+    ]
+
+
+def list_response(items: List[Dict], total: int, page: int, page_size: int) -> Dict:
+    """与 PromptListResponse.model_dump(by_alias=True) 的结构相同"""
+    return {"list": items, "total": total, "page": page, "pageSize": page_size}
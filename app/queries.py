@@ -0,0 +1,372 @@
+"""
+提示词相关的查询语句
+
+路由中用到的查询都在这里构造，check_query_plans.py 会对这些语句逐一执行 EXPLAIN，
+新增查询时请同时在 check_query_plans.py 中登记。
+分页查询的排序都带上 id 作为次序键，与 models 中的复合索引一致。
+列表分页只选出 LIST_COLUMNS，结果由 app/prompt_rows.py 直接转换为响应结构。
+"""
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import select, update, delete, func, and_, or_, tuple_, exists
+from app.models import (
+    User, Prompt, PromptView, PromptViewStat, PromptLike, PromptFavorite, PromptRevision, Tag, PromptTag, AuthorStats
+)
+from app.config import settings
+from app import view_partitions
+
+# 列表响应所需的列（正文按存储形式取出，由 prompt_rows 解压）
+LIST_COLUMNS = (
+    Prompt.id, Prompt.user_id, Prompt.title, Prompt.content_text, Prompt.content_z, Prompt.state,
+    Prompt.view_count, Prompt.like_count, Prompt.favorite_count, Prompt.created_at, Prompt.updated_at,
+)
+# 作者汇总增减后返回的列，用于更新作者排行榜
+AUTHOR_STATS_COLUMNS = (
+    AuthorStats.user_id, AuthorStats.prompt_count, AuthorStats.view_count,
+    AuthorStats.like_count, AuthorStats.favorite_count,
+)
+
+
+def _keyword_filter(keyword: str):
+    """正文压缩存储时（KEYWORD_SEARCH_CONTENT=false）只匹配标题，避免只搜到未压缩的那部分正文"""
+    pattern = f"%{keyword}%"
+    if not settings.KEYWORD_SEARCH_CONTENT:
+        return Prompt.title.ilike(pattern)
+    return or_(Prompt.title.ilike(pattern), Prompt.content.ilike(pattern))
+
+
+def active_prompt(prompt_id: int):
+    return select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1))
+
+
+def take_prompt_write_lock(prompt_id: int):
+    """SQLite 不支持 FOR UPDATE：事务开始时先执行一条不改变数据的 UPDATE 取得写锁"""
+    return update(Prompt).where(Prompt.id == prompt_id).values(updated_at=Prompt.updated_at)
+
+
+def active_prompt_id(prompt_id: int):
+    return select(Prompt.id).where(and_(Prompt.id == prompt_id, Prompt.state == 1))
+
+
+def owned_prompt(prompt_id: int, user_id: int, for_update: bool = False):
+    """
+    for_update 时锁住该行直到事务结束：编辑需要在锁内读取最新正文与修订版本号。
+    会话中已加载过该行时同样用加锁读到的值覆盖，否则会基于加锁前的旧正文计算增量
+    """
+    statement = select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.user_id == user_id, Prompt.state == 1))
+    if not for_update:
+        return statement
+    return statement.with_for_update().execution_options(populate_existing=True)
+
+
+def active_prompts_by_ids(prompt_ids: Iterable[int]):
+    return select(Prompt).where(and_(Prompt.id.in_(list(prompt_ids)), Prompt.state == 1))
+
+
+def active_prompt_ids_in(prompt_ids: Iterable[int]):
+    return select(Prompt.id).where(and_(Prompt.id.in_(list(prompt_ids)), Prompt.state == 1))
+
+
+def feed_page(offset: int, limit: int, keyword: Optional[str] = None):
+    query = select(*LIST_COLUMNS).where(Prompt.state == 1)
+    if keyword:
+        query = query.where(_keyword_filter(keyword))
+    return query.order_by(Prompt.created_at.desc(), Prompt.id.desc()).limit(limit).offset(offset)
+
+
+def feed_count(keyword: Optional[str] = None):
+    query = select(func.count(Prompt.id)).where(Prompt.state == 1)
+    if keyword:
+        query = query.where(_keyword_filter(keyword))
+    return query
+
+
+def _tag_filter(tag_ids: List[int]):
+    """
+    tag_ids 需按 prompt_count 升序排列：沿最少用的标签的 (tag_id, created_at) 索引顺序扫描，
+    其余标签逐条用 (prompt_id, tag_id) 唯一索引确认，扫描量不超过最少用的标签下的提示词数
+    """
+    driver = PromptTag.__table__.alias("driver")
+    conditions = [driver.c.tag_id == tag_ids[0]]
+    for tag_id in tag_ids[1:]:
+        conditions.append(exists().where(
+            and_(PromptTag.prompt_id == driver.c.prompt_id, PromptTag.tag_id == tag_id)
+        ))
+    return driver, and_(*conditions)
+
+
+def tag_feed_page(tag_ids: List[int], offset: int, limit: int, keyword: Optional[str] = None):
+    driver, condition = _tag_filter(tag_ids)
+    query = (
+        select(*LIST_COLUMNS)
+        .select_from(driver)
+        .join(Prompt, Prompt.id == driver.c.prompt_id)
+        .where(and_(condition, Prompt.state == 1))
+    )
+    if keyword:
+        query = query.where(_keyword_filter(keyword))
+    return query.order_by(driver.c.created_at.desc(), driver.c.prompt_id.desc()).limit(limit).offset(offset)
+
+
+def tag_feed_count(tag_ids: List[int], keyword: Optional[str] = None):
+    driver, condition = _tag_filter(tag_ids)
+    query = select(func.count()).select_from(driver).where(condition)
+    if keyword:
+        query = query.join(Prompt, Prompt.id == driver.c.prompt_id).where(_keyword_filter(keyword))
+    return query
+
+
+def tags_by_names(names: Iterable[str]):
+    return select(Tag).where(Tag.name.in_(list(names)))
+
+
+def top_tags(limit: int):
+    return select(Tag.id, Tag.name, Tag.prompt_count).where(Tag.prompt_count > 0).order_by(
+        Tag.prompt_count.desc(), Tag.id
+    ).limit(limit)
+
+
+def prompt_tag_names(prompt_ids: Iterable[int]):
+    return (
+        select(PromptTag.prompt_id, Tag.name)
+        .join(Tag, Tag.id == PromptTag.tag_id)
+        .where(PromptTag.prompt_id.in_(list(prompt_ids)))
+        .order_by(PromptTag.prompt_id, PromptTag.id)
+    )
+
+
+def prompt_tag_ids(prompt_id: int):
+    return select(PromptTag.tag_id).where(PromptTag.prompt_id == prompt_id)
+
+
+def delete_prompt_tags(prompt_id: int, tag_ids: Iterable[int]):
+    return delete(PromptTag).where(and_(PromptTag.prompt_id == prompt_id, PromptTag.tag_id.in_(list(tag_ids))))
+
+
+def adjust_tag_counts(tag_ids: Iterable[int], delta: int):
+    return update(Tag).where(Tag.id.in_(list(tag_ids))).values(prompt_count=Tag.prompt_count + delta)
+
+
+def user_prompts_page(user_id: int, offset: int, limit: int):
+    return (
+        select(*LIST_COLUMNS)
+        .where(and_(Prompt.user_id == user_id, Prompt.state == 1))
+        .order_by(Prompt.created_at.desc(), Prompt.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def user_prompts_count(user_id: int):
+    return select(func.count(Prompt.id)).where(and_(Prompt.user_id == user_id, Prompt.state == 1))
+
+
+def favorites_page(user_id: int, offset: int, limit: int):
+    return (
+        select(*LIST_COLUMNS)
+        .select_from(Prompt)
+        .join(PromptFavorite)
+        .where(and_(PromptFavorite.user_id == user_id, Prompt.state == 1))
+        .order_by(PromptFavorite.created_at.desc(), PromptFavorite.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def favorites_count(user_id: int):
+    return (
+        select(func.count(Prompt.id))
+        .join(PromptFavorite)
+        .where(and_(PromptFavorite.user_id == user_id, Prompt.state == 1))
+    )
+
+
+def likes_page(user_id: int, offset: int, limit: int):
+    return (
+        select(*LIST_COLUMNS)
+        .select_from(Prompt)
+        .join(PromptLike)
+        .where(and_(PromptLike.user_id == user_id, Prompt.state == 1))
+        .order_by(PromptLike.created_at.desc(), PromptLike.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def likes_count(user_id: int):
+    return (
+        select(func.count(Prompt.id))
+        .join(PromptLike)
+        .where(and_(PromptLike.user_id == user_id, Prompt.state == 1))
+    )
+
+
+def index_rows(prompt_ids: Iterable[int]):
+    """重建相似度 / 联想索引所需的列，包含已删除的记录以便从索引中移除"""
+    return select(
+        Prompt.id, Prompt.title, Prompt.content_text, Prompt.content_z, Prompt.state,
+        Prompt.view_count, Prompt.like_count, Prompt.favorite_count
+    ).where(Prompt.id.in_(list(prompt_ids)))
+
+
+def counter_rows(prompt_ids: Iterable[int]):
+    """实时计数推送所需的列"""
+    return select(
+        Prompt.id, Prompt.view_count, Prompt.like_count, Prompt.favorite_count
+    ).where(Prompt.id.in_(list(prompt_ids)), Prompt.state == 1)
+
+
+def author_stats(user_id: int):
+    """用户与作者汇总按主键各取一行；没有发布过提示词的用户汇总列为 NULL"""
+    return (
+        select(User.id, User.username, *AUTHOR_STATS_COLUMNS[1:])
+        .outerjoin(AuthorStats, AuthorStats.user_id == User.id)
+        .where(User.id == user_id)
+    )
+
+
+def authors_stats_by_ids(user_ids: Iterable[int]):
+    """排行榜一页作者的汇总"""
+    return (
+        select(User.id, User.username, *AUTHOR_STATS_COLUMNS[1:])
+        .join(AuthorStats, AuthorStats.user_id == User.id)
+        .where(User.id.in_(list(user_ids)))
+    )
+
+
+def adjust_author_stats(user_id: int, deltas: dict):
+    """deltas 为 {列名: 增量}，返回增减后的汇总；作者还没有汇总行时不返回行"""
+    return (
+        update(AuthorStats)
+        .where(AuthorStats.user_id == user_id)
+        .values({name: getattr(AuthorStats, name) + delta for name, delta in deltas.items()})
+        .returning(*AUTHOR_STATS_COLUMNS)
+    )
+
+
+def author_stats_batch(after_user_id: int, limit: int):
+    """按 user_id 顺序分批读取有正常提示词的作者，用于重建排行榜"""
+    return (
+        select(*AUTHOR_STATS_COLUMNS)
+        .where(and_(AuthorStats.user_id > after_user_id, AuthorStats.prompt_count > 0))
+        .order_by(AuthorStats.user_id)
+        .limit(limit)
+    )
+
+
+def author_totals():
+    """按作者对正常状态提示词求和，只在迁移 / 重新统计时使用"""
+    return (
+        select(
+            Prompt.user_id, func.count(Prompt.id), func.coalesce(func.sum(Prompt.view_count), 0),
+            func.coalesce(func.sum(Prompt.like_count), 0), func.coalesce(func.sum(Prompt.favorite_count), 0),
+        )
+        .where(Prompt.state == 1)
+        .group_by(Prompt.user_id)
+    )
+
+
+def like_exists(prompt_id: int, user_id: int):
+    return select(PromptLike).where(and_(PromptLike.prompt_id == prompt_id, PromptLike.user_id == user_id))
+
+
+def favorite_exists(prompt_id: int, user_id: int):
+    return select(PromptFavorite).where(
+        and_(PromptFavorite.prompt_id == prompt_id, PromptFavorite.user_id == user_id)
+    )
+
+
+def liked_prompt_ids(user_id: int, prompt_ids: Iterable[int]):
+    """列表中当前用户点赞过的提示词，一次查询代替逐条 like_exists"""
+    return select(PromptLike.prompt_id).where(
+        and_(PromptLike.user_id == user_id, PromptLike.prompt_id.in_(list(prompt_ids)))
+    )
+
+
+def favorited_prompt_ids(user_id: int, prompt_ids: Iterable[int]):
+    return select(PromptFavorite.prompt_id).where(
+        and_(PromptFavorite.user_id == user_id, PromptFavorite.prompt_id.in_(list(prompt_ids)))
+    )
+
+
+def revision_list(prompt_id: int):
+    return (
+        select(
+            PromptRevision.version,
+            PromptRevision.user_id,
+            PromptRevision.title,
+            PromptRevision.content_length,
+            PromptRevision.created_at
+        )
+        .where(PromptRevision.prompt_id == prompt_id)
+        .order_by(PromptRevision.version.desc())
+    )
+
+
+def latest_revision_version(prompt_id: int):
+    return select(func.max(PromptRevision.version)).where(PromptRevision.prompt_id == prompt_id)
+
+
+def revision_chain(prompt_id: int, version: int):
+    """从 version 之前最近的快照到 version 的所有修订"""
+    snapshot_version = (
+        select(func.max(PromptRevision.version))
+        .where(and_(
+            PromptRevision.prompt_id == prompt_id,
+            PromptRevision.version <= version,
+            PromptRevision.is_snapshot == 1
+        ))
+        .scalar_subquery()
+    )
+    return (
+        select(PromptRevision)
+        .where(and_(
+            PromptRevision.prompt_id == prompt_id,
+            PromptRevision.version >= snapshot_version,
+            PromptRevision.version <= version
+        ))
+        .order_by(PromptRevision.version)
+    )
+
+
+def existing_views(pairs: List[Tuple[int, str]]):
+    """批量查询保留期内已有浏览记录的 (prompt_id, ip)"""
+    return select(PromptView.prompt_id, PromptView.ip_address).where(and_(
+        tuple_(PromptView.prompt_id, PromptView.ip_address).in_(pairs),
+        PromptView.created_at >= view_partitions.retention_start()
+    )).distinct()
+
+
+def increment_view_count(prompt_id: int, amount: int = 1):
+    """返回作者与状态，正常状态提示词的浏览数同时计入作者汇总"""
+    return (
+        update(Prompt)
+        .where(Prompt.id == prompt_id)
+        .values(view_count=Prompt.view_count + amount)
+        .returning(Prompt.user_id, Prompt.state)
+    )
+
+
+def update_prompt(prompt_id: int, values: dict):
+    """正文请先用 Prompt.content_values() 转换"""
+    return update(Prompt).where(Prompt.id == prompt_id).values(**values)
+
+
+def soft_delete_prompt(prompt_id: int):
+    """返回删除时（已加行锁）的计数，从作者汇总中扣除；已删除的记录不返回行，不会重复扣除"""
+    return (
+        update(Prompt)
+        .where(and_(Prompt.id == prompt_id, Prompt.state == 1))
+        .values(state=0)
+        .returning(Prompt.user_id, Prompt.view_count, Prompt.like_count, Prompt.favorite_count)
+    )
+
+
+def total_active_prompts():
+    return select(func.count(Prompt.id)).where(Prompt.state == 1)
+
+
+def total_views():
+    """保留期内的原始记录数加上已汇总的浏览数"""
+    raw = select(func.count()).select_from(PromptView).scalar_subquery()
+    compacted = select(func.coalesce(func.sum(PromptViewStat.view_count), 0)).scalar_subquery()
+    return select(raw + compacted)
@@ -1,7 +1,34 @@
-import redis.asyncio as redis
 from app.config import settings
+from app.memory_redis import MemoryRedis
 
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# REDIS_URL=memory:// 时使用进程内实现（单节点部署、本地基准测试），数据不跨进程共享
+IN_PROCESS = settings.REDIS_URL.startswith("memory://")
 
-async def get_redis():
+# 仅当锁仍由自己持有（值等于 token）时删除
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# 首次使用时才创建（redis 客户端库的导入也推迟到这时），缩短 worker 启动时间
+redis_client = None
+
+def client():
+    global redis_client
+    if redis_client is None:
+        if IN_PROCESS:
+            redis_client = MemoryRedis.from_url(settings.REDIS_URL)
+        else:
+            import redis.asyncio as redis
+            redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
     return redis_client
+
+async def get_redis():
+    return redis_client or client()
+
+async def release_lock(client, key: str, token: str) -> int:
+    if IN_PROCESS:
+        return await client.delete_if_equals(key, token)
+    return await client.eval(RELEASE_LOCK_SCRIPT, 1, key, token)
@@ -0,0 +1,178 @@
+"""
+提示词修订历史
+
+每次编辑存一条修订：每隔 SNAPSHOT_INTERVAL 个版本存一次全文快照，其余版本只存相对上一版本的增量。
+增量是 JSON 数组，元素为 [start, end]（复用上一版本的该区间）或字符串（新插入的文本），
+还原任意版本最多需要一个快照加 SNAPSHOT_INTERVAL - 1 个增量。
+当前版本仍然只存在 prompts 表中，读取详情不经过修订表。
+"""
+import json
+import re
+from difflib import SequenceMatcher
+from typing import List, Optional, Union
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import IS_SQLITE
+from app.models import PromptRevision
+from app import queries
+
+SNAPSHOT_INTERVAL = 20
+# 中间差异部分两侧总长不超过该值时做逐字符比较，否则按句子比较
+CHAR_DIFF_LIMIT = 2000
+
+_TOKEN = re.compile(r"[^。！？；.!?;\n]*[。！？；.!?;\n]|[^。！？；.!?;\n]+")
+
+Op = Union[List[int], str]
+
+
+def _common_prefix(a: str, b: str) -> int:
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix(a: str, b: str, limit: int) -> int:
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _append(ops: List[Op], op: Op):
+    if not op:
+        return
+    if ops and isinstance(op, list) and isinstance(ops[-1], list) and ops[-1][1] == op[0]:
+        ops[-1] = [ops[-1][0], op[1]]
+    elif ops and isinstance(op, str) and isinstance(ops[-1], str):
+        ops[-1] += op
+    elif isinstance(op, str) or op[0] < op[1]:
+        ops.append(op)
+
+
+def _diff_chars(old: str, offset: int, new: str, ops: List[Op]):
+    matcher = SequenceMatcher(None, old, new, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            _append(ops, [offset + i1, offset + i2])
+        elif tag in ("insert", "replace"):
+            _append(ops, new[j1:j2])
+
+
+def _diff_middle(old: str, offset: int, new: str, ops: List[Op]):
+    if not old or not new:
+        _append(ops, new)
+        return
+    if len(old) + len(new) <= CHAR_DIFF_LIMIT:
+        _diff_chars(old, offset, new, ops)
+        return
+    old_tokens = _TOKEN.findall(old)
+    new_tokens = _TOKEN.findall(new)
+    old_pos = [0]
+    for token in old_tokens:
+        old_pos.append(old_pos[-1] + len(token))
+    matcher = SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            _append(ops, [offset + old_pos[i1], offset + old_pos[i2]])
+        elif tag == "insert":
+            _append(ops, "".join(new_tokens[j1:j2]))
+        elif tag == "replace":
+            old_part = old[old_pos[i1]:old_pos[i2]]
+            new_part = "".join(new_tokens[j1:j2])
+            if len(old_part) + len(new_part) <= CHAR_DIFF_LIMIT:
+                _diff_chars(old_part, offset + old_pos[i1], new_part, ops)
+            else:
+                _append(ops, new_part)
+
+
+def make_delta(old: str, new: str) -> List[Op]:
+    prefix = _common_prefix(old, new)
+    suffix = _common_suffix(old, new, min(len(old), len(new)) - prefix)
+    ops: List[Op] = []
+    _append(ops, [0, prefix])
+    _diff_middle(old[prefix:len(old) - suffix], prefix, new[prefix:len(new) - suffix], ops)
+    _append(ops, [len(old) - suffix, len(old)])
+    return ops
+
+
+def apply_delta(base: str, ops: List[Op]) -> str:
+    return "".join(base[op[0]:op[1]] if isinstance(op, list) else op for op in ops)
+
+
+def encode_delta(ops: List[Op]) -> str:
+    return json.dumps(ops, ensure_ascii=False, separators=(",", ":"))
+
+
+def decode_delta(data: str) -> List[Op]:
+    return json.loads(data)
+
+
+def is_snapshot_version(version: int) -> bool:
+    return (version - 1) % SNAPSHOT_INTERVAL == 0
+
+
+def build_revision(prompt_id: int, user_id: int, version: int, title: str, content: str,
+                   previous_content: Optional[str]) -> PromptRevision:
+    if previous_content is None or is_snapshot_version(version):
+        return PromptRevision(
+            prompt_id=prompt_id, user_id=user_id, version=version, title=title,
+            is_snapshot=1, data=content, content_length=len(content)
+        )
+    return PromptRevision(
+        prompt_id=prompt_id, user_id=user_id, version=version, title=title,
+        is_snapshot=0, data=encode_delta(make_delta(previous_content, content)),
+        content_length=len(content)
+    )
+
+
+async def latest_version(db: AsyncSession, prompt_id: int) -> int:
+    result = await db.execute(queries.latest_revision_version(prompt_id))
+    return result.scalar() or 0
+
+
+async def load_for_edit(db: AsyncSession, prompt_id: int, user_id: int):
+    """
+    加锁读取待编辑的提示词（不存在或无权限时返回 None），锁持有到调用方提交：
+    并发编辑依次执行，每次都基于上一次提交后的正文计算增量，修订版本号不会冲突
+    """
+    if IS_SQLITE:
+        # 并发的编辑在 busy_timeout 内等待写锁，拿到锁后读到的已是最新正文
+        await db.execute(queries.take_prompt_write_lock(prompt_id))
+    result = await db.execute(queries.owned_prompt(prompt_id, user_id, for_update=True))
+    return result.scalar_one_or_none()
+
+
+async def record_revision(db: AsyncSession, prompt, title: str, content: str, user_id: int):
+    """在更新提示词前调用，prompt 为 load_for_edit 加锁读取的更新前对象；随调用方的事务一起提交"""
+    version = await latest_version(db, prompt.id)
+    if version == 0:
+        # 修订功能上线前创建的提示词，先把原始内容存为第 1 版
+        version = 1
+        db.add(build_revision(prompt.id, prompt.user_id, version, prompt.title, prompt.content, None))
+    db.add(build_revision(prompt.id, user_id, version + 1, title, content, prompt.content))
+
+
+async def load_version(db: AsyncSession, prompt_id: int, version: int) -> Optional[dict]:
+    result = await db.execute(queries.revision_chain(prompt_id, version))
+    chain = result.scalars().all()
+    if not chain or chain[-1].version != version:
+        return None
+    content = chain[0].data
+    for revision in chain[1:]:
+        content = apply_delta(content, decode_delta(revision.data))
+    target = chain[-1]
+    return {
+        "version": target.version,
+        "user_id": target.user_id,
+        "title": target.title,
+        "content": content,
+        "created_at": target.created_at,
+    }
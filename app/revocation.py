@@ -0,0 +1,198 @@
+"""
+Token 吊销
+
+每个 token 带 jti（唯一 id）与 iat（签发时间）。吊销记录存在 Redis，过期时间与 token 剩余有效期一致：
+  revoked:jti:{jti}     单个 token（退出登录）
+  revoked:user:{id}     该用户在此时间之前签发的所有 token（重置密码）
+所有吊销记录同时写入 revoked:log 有序集合（score 为过期时间），并递增 revoked:version。
+每个 worker 定期检查版本号，有变化时用 revoked:log 重建进程内的状态：jti 放入 Bloom 过滤器，
+数量很少的用户级吊销直接缓存吊销时间。绝大多数请求在内存中判定“未吊销”，
+只有过滤器命中（真吊销或误判）时才查询 Redis。
+其他 worker 上发生的吊销最多延迟 REVOCATION_SYNC_SECONDS 生效。
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, Iterable, Optional
+from app.config import settings
+from app.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+LOG_KEY = "revoked:log"
+VERSION_KEY = "revoked:version"
+
+
+def _jti_key(jti: str) -> str:
+    return f"revoked:jti:{jti}"
+
+
+def _user_key(user_id: int) -> str:
+    return f"revoked:user:{user_id}"
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(capacity, 1)
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    def __init__(self, sync_seconds: float, error_rate: float, min_capacity: int = 10000):
+        self.sync_seconds = sync_seconds
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.bloom: Optional[BloomFilter] = None
+        self.users: Dict[str, float] = {}
+        self.version: Optional[str] = None
+        self.synced_at = 0.0
+        self.counters = {"bloom_negatives": 0, "redis_checks": 0, "false_positives": 0, "syncs": 0}
+        self._task: Optional[asyncio.Task] = None
+
+    def _rebuild(self, members: Iterable[str], count: int):
+        # 预留一倍余量，避免两次同步之间新增的吊销让误判率上升
+        bloom = BloomFilter(max(self.min_capacity, count * 2), self.error_rate)
+        for member in members:
+            bloom.add(member)
+        self.bloom = bloom
+
+    def _fresh(self) -> bool:
+        # 连续多次同步失败时过滤器可能已过时，退回到每次查询 Redis
+        return self.bloom is not None and time.monotonic() - self.synced_at < self.sync_seconds * 3
+
+    async def sync(self):
+        redis = await get_redis()
+        version = await redis.get(VERSION_KEY)
+        if self.bloom is None or version != self.version:
+            await redis.zremrangebyscore(LOG_KEY, "-inf", time.time())
+            pipe = redis.pipeline(transaction=True)
+            pipe.zrange(LOG_KEY, 0, -1)
+            pipe.get(VERSION_KEY)
+            members, version = await pipe.execute()
+            user_ids = [member[5:] for member in members if member.startswith("user:")]
+            revoked_at = await redis.mget([_user_key(user_id) for user_id in user_ids]) if user_ids else []
+            self.users = {
+                user_id: float(value) for user_id, value in zip(user_ids, revoked_at) if value is not None
+            }
+            self._rebuild([member for member in members if member.startswith("jti:")],
+                          len(members) - len(user_ids))
+            self.version = version
+            self.counters["syncs"] += 1
+        self.synced_at = time.monotonic()
+
+    async def _record(self, member: str, key: str, value, expires_at: float):
+        ttl = int(expires_at - time.time()) + 1
+        if ttl <= 0:
+            return
+        redis = await get_redis()
+        pipe = redis.pipeline(transaction=True)
+        pipe.setex(key, ttl, value)
+        pipe.zadd(LOG_KEY, {member: expires_at})
+        pipe.incr(VERSION_KEY)
+        _, _, version = await pipe.execute()
+        # 期间没有其他 worker 吊销时，本地状态补上这一条后仍是最新的，下次同步无需重建
+        self.version = str(version) if self.version == str(version - 1) else None
+
+    async def revoke_token(self, payload: dict):
+        """吊销单个 token（payload 为解码后的声明）"""
+        jti = payload.get("jti")
+        if not jti:
+            # 旧版 token 没有 jti，只能吊销该用户的全部 token
+            await self.revoke_user(int(payload["sub"]))
+            return
+        await self._record(f"jti:{jti}", _jti_key(jti), 1, float(payload["exp"]))
+        if self.bloom is not None:
+            self.bloom.add(f"jti:{jti}")
+            # 过滤器超出容量时误判率上升，下次同步按新容量重建
+            if self.bloom.count > self.bloom.capacity:
+                self.version = None
+
+    async def revoke_user(self, user_id: int):
+        """吊销该用户此前签发的所有 token"""
+        now = time.time()
+        expires_at = now + settings.ACCESS_TOKEN_EXPIRE_DAYS * 86400
+        await self._record(f"user:{user_id}", _user_key(user_id), repr(now), expires_at)
+        self.users[str(user_id)] = now
+
+    async def is_revoked(self, payload: dict) -> bool:
+        user_id = str(payload.get("sub"))
+        jti = payload.get("jti")
+        # 旧版 token 没有 iat，视为在任何用户级吊销之前签发
+        issued_at = float(payload.get("iat", 0))
+        fresh = self._fresh()
+        if fresh:
+            revoked_at = self.users.get(user_id)
+            if revoked_at is not None and issued_at <= revoked_at:
+                return True
+            if not jti or f"jti:{jti}" not in self.bloom:
+                self.counters["bloom_negatives"] += 1
+                return False
+        self.counters["redis_checks"] += 1
+        redis = await get_redis()
+        token_revoked, revoked_at = await redis.mget(
+            _jti_key(jti) if jti else _jti_key("-"), _user_key(user_id)
+        )
+        revoked = token_revoked is not None or (revoked_at is not None and issued_at <= float(revoked_at))
+        if fresh and not revoked:
+            self.counters["false_positives"] += 1
+        return revoked
+
+    async def _sync_loop(self):
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 同步失败时继续使用本地副本，下一轮重试
+                logger.exception("同步令牌吊销列表失败")
+            await asyncio.sleep(self.sync_seconds)
+
+    def start_sync(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop_sync(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "bloom_items": self.bloom.count if self.bloom else 0,
+            "bloom_bytes": len(self.bloom.bits) if self.bloom else 0,
+            "revoked_users": len(self.users),
+            "fresh": self._fresh(),
+        }
+
+
+revocations = RevocationList(
+    sync_seconds=settings.REVOCATION_SYNC_SECONDS,
+    error_rate=settings.REVOCATION_BLOOM_ERROR_RATE,
+)
@@ -0,0 +1,51 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.schemas import ResponseModel
+from app import profiler, admission, logs
+from app.cache import cache
+from app.live import hub
+
+router = APIRouter(prefix="/admin", tags=["管理"])
+
+async def require_profile_token(x_profile_token: Optional[str] = Header(None)):
+    """管理接口使用 PROFILE_TOKEN 鉴权；未配置时接口视为不存在"""
+    if not profiler.check_token(x_profile_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+@router.get("/profiles", response_model=ResponseModel, dependencies=[Depends(require_profile_token)])
+async def list_profiles(limit: int = 50):
+    """最近的剖析结果（新的在前）"""
+    return ResponseModel(data=await profiler.list_profiles(max(1, min(limit, 500))))
+
+@router.get("/profiles/{profileId}", dependencies=[Depends(require_profile_token)])
+async def get_profile(profileId: str, format: str = "json"):
+    """下载剖析结果：json 为完整数据，collapsed 供 flamegraph.pl 使用，speedscope 可直接拖入 speedscope.app"""
+    if format not in ("json", "collapsed", "speedscope"):
+        return ResponseModel(code=400, msg="format 只能是 json、collapsed 或 speedscope")
+    
+    profile = await profiler.load_profile(profileId)
+    if profile is None:
+        return ResponseModel(code=404, msg="剖析结果不存在或已过期")
+    
+    if format == "collapsed":
+        return PlainTextResponse(
+            profiler.to_collapsed(profile),
+            headers={"Content-Disposition": f'attachment; filename="{profileId}.collapsed.txt"'}
+        )
+    if format == "speedscope":
+        return JSONResponse(
+            profiler.to_speedscope(profile),
+            headers={"Content-Disposition": f'attachment; filename="{profileId}.speedscope.json"'}
+        )
+    return ResponseModel(data=profile)
+
+@router.get("/metrics", response_model=ResponseModel, dependencies=[Depends(require_profile_token)])
+async def get_metrics():
+    """各路由类别的并发上限、排队与拒绝次数，缓存命中情况，实时计数连接数，以及日志队列积压与丢弃数"""
+    return ResponseModel(data={
+        "admission": admission.stats(),
+        "cache": cache.stats(),
+        "live": hub.stats(),
+        "logging": logs.stats(),
+    })
@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
 from app.database import get_db
@@ -7,9 +8,12 @@ from app.schemas import (
     UserRegister, UserLogin, EmailBind, SendCodeRequest, ResetPassword,
     ResponseModel, TokenResponse, UserResponse
 )
-from app.auth import verify_password, get_password_hash, create_access_token, get_current_user
+from app.auth import (
+    verify_password, get_password_hash, create_access_token, get_current_user, decode_token, security
+)
 from app.email_service import send_code_to_email, verify_code
-from app.redis_client import get_redis
+from app.cache import cache
+from app.revocation import revocations
 
 router = APIRouter(prefix="/auth", tags=["认证"])
 
@@ -87,6 +91,7 @@ async def bind_email(
         update(User).where(User.id == current_user.id).values(email=request.email, state=1)
     )
     await db.commit()
+    await cache.invalidate("user", current_user.id)
     
     return ResponseModel(msg="邮箱绑定成功")
 
@@ -105,12 +110,19 @@ async def reset_password(request: ResetPassword, db: AsyncSession = Depends(get_
         update(User).where(User.id == user.id).values(hashed_password=get_password_hash(request.new_password))
     )
     await db.commit()
+    await cache.invalidate("user", user.id)
+    # 重置密码后此前签发的所有 token 失效
+    await revocations.revoke_user(user.id)
     
     return ResponseModel(msg="密码重置成功")
 
 @router.post("/logout", response_model=ResponseModel)
-async def logout(current_user: User = Depends(get_current_user)):
-    # Token 在客户端清除即可
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: User = Depends(get_current_user)
+):
+    # get_current_user 已校验过 token，这里只需取出 jti 吊销
+    await revocations.revoke_token(decode_token(credentials.credentials))
     return ResponseModel(msg="退出成功")
 
 @router.get("/user", response_model=ResponseModel)
@@ -1,39 +1,114 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, func, and_, or_
 from typing import Optional
-from app.database import get_db
-from app.models import User, Prompt, PromptView, PromptLike, PromptFavorite
+from app.database import get_db, async_session_maker
+from app.models import User, Prompt, PromptLike, PromptFavorite
 from app.schemas import (
-    PromptCreate, PromptUpdate, ResponseModel, PromptResponse, PromptListResponse, StatsResponse
+    PromptCreate, PromptUpdate, ResponseModel, PromptResponse, StatsResponse,
+    PromptCreateResponse, SimilarPromptResponse, SuggestResponse, RevisionResponse, RevisionDetailResponse,
+    TagResponse
 )
 from app.auth import get_current_user, get_optional_user
 from app.redis_client import get_redis
+from app import similarity, suggest, revisions, interactions, queries, events, live, authors
+from app import tags as prompt_tags
+from app import prompt_rows
+from app.cache import cache, cached
+from app.config import settings
 
 router = APIRouter(prefix="/prompts", tags=["提示词"])
 
+PROMPT_CACHE_TTL = 60
+STATS_CACHE_TTL = 30
+TAGS_CACHE_TTL = 30
+# 首页第一页（无关键词、无标签）是最热的列表请求，公共部分缓存较短时间
+FEED_CACHE_TTL = 10
+FEED_CACHE_MAX_PAGE_SIZE = 50
+
 def get_client_ip(request: Request) -> str:
     forwarded = request.headers.get("X-Forwarded-For")
     if forwarded:
         return forwarded.split(",")[0]
     return request.client.host
 
+async def load_prompt_data(prompt_id: int) -> Optional[dict]:
+    """读取提示词公共字段（经过两级缓存），浏览数可能滞后最多一个缓存周期"""
+    async def loader():
+        async with async_session_maker() as db:
+            result = await db.execute(queries.active_prompt(prompt_id))
+            prompt = result.scalar_one_or_none()
+            if prompt is None:
+                return None
+            return PromptResponse(
+                id=prompt.id,
+                user_id=prompt.user_id,
+                title=prompt.title,
+                content=prompt.content,
+                state=prompt.state,
+                view_count=prompt.view_count,
+                like_count=prompt.like_count,
+                favorite_count=prompt.favorite_count,
+                created_at=prompt.created_at,
+                updated_at=prompt.updated_at,
+                tags=(await prompt_tags.load_tags(db, [prompt.id]))[prompt.id]
+            ).model_dump()
+    
+    return await cache.get_or_load("prompt", prompt_id, loader, ttl=PROMPT_CACHE_TTL)
+
+async def load_first_feed_page(page_size: int) -> dict:
+    """首页第一页的公共字段与总数（经过两级缓存），点赞 / 收藏状态由调用方按用户补充"""
+    async def loader():
+        async with async_session_maker() as db:
+            result = await db.execute(queries.feed_page(0, page_size, None))
+            rows = result.all()
+            count_result = await db.execute(queries.feed_count(None))
+            tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+            return {
+                "list": [prompt_rows.response_item(row, tag_map[row.id]) for row in rows],
+                "total": count_result.scalar(),
+            }
+    
+    return await cache.get_or_load("feed", f"page1:{page_size}", loader, ttl=FEED_CACHE_TTL)
+
 @router.post("", response_model=ResponseModel)
 async def create_prompt(
     prompt_data: PromptCreate,
+    checkDuplicate: bool = False,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    duplicate_ids = []
+    if checkDuplicate:
+        signature = similarity.compute_signature(prompt_data.content)
+        duplicates = await similarity.find_similar(
+            await get_redis(), signature, max_distance=similarity.DUPLICATE_MAX_DISTANCE
+        )
+        duplicate_ids = [prompt_id for prompt_id, _ in duplicates]
+        if duplicate_ids:
+            dup_result = await db.execute(queries.active_prompt_ids_in(duplicate_ids))
+            active_ids = set(dup_result.scalars().all())
+            duplicate_ids = [prompt_id for prompt_id in duplicate_ids if prompt_id in active_ids]
+    
     new_prompt = Prompt(
         user_id=current_user.id,
         title=prompt_data.title,
         content=prompt_data.content
     )
     db.add(new_prompt)
-    await db.commit()
+    await db.flush()
     await db.refresh(new_prompt)
-    
-    response = PromptResponse(
+    tags_changed = await prompt_tags.set_prompt_tags(db, new_prompt, prompt_data.tags)
+    author_stats = await authors.add_prompt(db, current_user.id)
+    await db.commit()
+    await authors.update_leaderboard([author_stats])
+    # 新提示词出现在首页第一页
+    await cache.invalidate("feed")
+    if tags_changed:
+        await cache.invalidate("tags")
+    await events.emit(events.PROMPT_CREATED, new_prompt.id)
+    
+    response = PromptCreateResponse(
         id=new_prompt.id,
         user_id=new_prompt.user_id,
         title=new_prompt.title,
@@ -43,71 +118,103 @@ async def create_prompt(
         like_count=new_prompt.like_count,
         favorite_count=new_prompt.favorite_count,
         created_at=new_prompt.created_at,
-        updated_at=new_prompt.updated_at
+        updated_at=new_prompt.updated_at,
+        tags=prompt_tags.normalize_tags(prompt_data.tags),
+        duplicate_ids=duplicate_ids
     )
     
+    if duplicate_ids:
+        return ResponseModel(data=response.model_dump(by_alias=True), msg="创建成功，存在相似提示词")
     return ResponseModel(data=response.model_dump(by_alias=True))
 
 @router.get("", response_model=ResponseModel)
 async def list_prompts(
     page: int = 1,
     pageSize: int = 10,
+    keyword: Optional[str] = None,
+    tags: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     page_size = pageSize
     offset = (page - 1) * page_size
     
-    query = select(Prompt).where(Prompt.state == 1).order_by(Prompt.created_at.desc())
-    result = await db.execute(query.limit(page_size).offset(offset))
-    prompts = result.scalars().all()
+    # tags=a,b 表示同时带有这些标签
+    tag_names = prompt_tags.parse_filter(tags)
+    rows = None
+    if tag_names:
+        filter_tags = await prompt_tags.resolve_filter(db, tag_names)
+        if filter_tags is None:
+            return ResponseModel(data=prompt_rows.list_response([], 0, page, page_size))
+        tag_ids = [tag.id for tag in filter_tags]
+        result = await db.execute(queries.tag_feed_page(tag_ids, offset, page_size, keyword))
+        rows = result.all()
+        if len(filter_tags) == 1 and not keyword:
+            # 单个标签直接使用维护好的计数
+            total = filter_tags[0].prompt_count
+        else:
+            count_result = await db.execute(queries.tag_feed_count(tag_ids, keyword))
+            total = count_result.scalar()
+    elif page == 1 and not keyword and 0 < page_size <= FEED_CACHE_MAX_PAGE_SIZE:
+        feed = await load_first_feed_page(page_size)
+        items = feed["list"]
+        total = feed["total"]
+    else:
+        result = await db.execute(queries.feed_page(offset, page_size, keyword))
+        rows = result.all()
+        
+        count_result = await db.execute(queries.feed_count(keyword))
+        total = count_result.scalar()
     
-    count_result = await db.execute(select(func.count(Prompt.id)).where(Prompt.state == 1))
-    total = count_result.scalar()
+    if rows is not None:
+        tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+        items = [prompt_rows.response_item(row, tag_map[row.id]) for row in rows]
     
-    prompt_list = []
-    for prompt in prompts:
-        is_liked = False
-        is_favorited = False
-        
-        if current_user:
-            like_result = await db.execute(
-                select(PromptLike).where(
-                    and_(PromptLike.prompt_id == prompt.id, PromptLike.user_id == current_user.id)
-                )
-            )
-            is_liked = like_result.scalar_one_or_none() is not None
-            
-            fav_result = await db.execute(
-                select(PromptFavorite).where(
-                    and_(PromptFavorite.prompt_id == prompt.id, PromptFavorite.user_id == current_user.id)
-                )
-            )
-            is_favorited = fav_result.scalar_one_or_none() is not None
-        
-        prompt_list.append(PromptResponse(
-            id=prompt.id,
-            user_id=prompt.user_id,
-            title=prompt.title,
-            content=prompt.content,
-            state=prompt.state,
-            view_count=prompt.view_count,
-            like_count=prompt.like_count,
-            favorite_count=prompt.favorite_count,
-            created_at=prompt.created_at,
-            updated_at=prompt.updated_at,
-            is_liked=is_liked,
-            is_favorited=is_favorited
-        ))
-    
-    response = PromptListResponse(
-        list=prompt_list,
-        total=total,
-        page=page,
-        page_size=page_size
-    )
+    if current_user and items:
+        prompt_ids = [item["id"] for item in items]
+        like_result = await db.execute(queries.liked_prompt_ids(current_user.id, prompt_ids))
+        fav_result = await db.execute(queries.favorited_prompt_ids(current_user.id, prompt_ids))
+        items = prompt_rows.with_flags(items, set(like_result.scalars().all()), set(fav_result.scalars().all()))
     
-    return ResponseModel(data=response.model_dump(by_alias=True))
+    return ResponseModel(data=prompt_rows.list_response(items, total, page, page_size))
+
+@router.get("/suggest", response_model=ResponseModel)
+async def suggest_titles(q: str = "", limit: int = 10):
+    redis = await get_redis()
+    items = await suggest.suggest(redis, q, limit=min(max(limit, 1), 20))
+    return ResponseModel(data=[SuggestResponse(**item).model_dump(by_alias=True) for item in items])
+
+@router.get("/tags", response_model=ResponseModel)
+@cached("tags", key=lambda limit, **_: min(max(limit, 1), 200), ttl=TAGS_CACHE_TTL)
+async def list_tags(limit: int = 50, db: AsyncSession = Depends(get_db)):
+    # 计数随写入同步维护，这里只读取 tags 表
+    result = await db.execute(queries.top_tags(min(max(limit, 1), 200)))
+    return ResponseModel(data=[
+        TagResponse(id=row.id, name=row.name, prompt_count=row.prompt_count).model_dump(by_alias=True)
+        for row in result.all()
+    ])
+
+@router.get("/stream")
+async def stream_counters(ids: str = ""):
+    """
+    实时计数（Server-Sent Events）：ids 为逗号分隔的提示词 id，
+    连接后先推送一次当前计数，之后在浏览数、点赞数、收藏数变化时推送 counters 事件
+    """
+    try:
+        prompt_ids = {int(value) for value in ids.split(",") if value.strip()}
+    except ValueError:
+        return ResponseModel(code=400, msg="ids 格式错误")
+    if not prompt_ids or len(prompt_ids) > settings.SSE_MAX_IDS:
+        return ResponseModel(code=400, msg=f"ids 数量需在 1 到 {settings.SSE_MAX_IDS} 之间")
+    if live.hub.connections >= settings.SSE_MAX_CONNECTIONS:
+        return ResponseModel(code=503, msg="连接数已满，请稍后重试")
+    
+    return StreamingResponse(
+        live.stream(prompt_ids),
+        media_type="text/event-stream",
+        # 关闭 nginx 等反向代理的缓冲，保证事件即时送达
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/{promptId}", response_model=ResponseModel)
 async def get_prompt(
@@ -117,62 +224,29 @@ async def get_prompt(
     current_user: Optional[User] = Depends(get_optional_user)
 ):
     prompt_id = promptId
-    result = await db.execute(select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
-    prompt = result.scalar_one_or_none()
+    prompt_data = await load_prompt_data(prompt_id)
     
-    if not prompt:
+    if not prompt_data:
         return ResponseModel(code=404, msg="提示词不存在")
     
-    # 记录浏览（限IP）
-    ip = get_client_ip(request)
-    view_result = await db.execute(
-        select(PromptView).where(and_(PromptView.prompt_id == prompt_id, PromptView.ip_address == ip))
-    )
-    if not view_result.scalar_one_or_none():
-        new_view = PromptView(
-            prompt_id=prompt_id,
-            user_id=current_user.id if current_user else None,
-            ip_address=ip
-        )
-        db.add(new_view)
-        await db.execute(
-            update(Prompt).where(Prompt.id == prompt_id).values(view_count=Prompt.view_count + 1)
-        )
-        await db.commit()
-        prompt.view_count += 1
+    # 记录浏览（限IP，去重与计数由事件处理）
+    await events.emit_view(prompt_id, current_user.id if current_user else None, get_client_ip(request))
     
     is_liked = False
     is_favorited = False
     
     if current_user:
-        like_result = await db.execute(
-            select(PromptLike).where(
-                and_(PromptLike.prompt_id == prompt_id, PromptLike.user_id == current_user.id)
-            )
-        )
+        like_result = await db.execute(queries.like_exists(prompt_id, current_user.id))
         is_liked = like_result.scalar_one_or_none() is not None
         
-        fav_result = await db.execute(
-            select(PromptFavorite).where(
-                and_(PromptFavorite.prompt_id == prompt_id, PromptFavorite.user_id == current_user.id)
-            )
-        )
+        fav_result = await db.execute(queries.favorite_exists(prompt_id, current_user.id))
         is_favorited = fav_result.scalar_one_or_none() is not None
     
-    response = PromptResponse(
-        id=prompt.id,
-        user_id=prompt.user_id,
-        title=prompt.title,
-        content=prompt.content,
-        state=prompt.state,
-        view_count=prompt.view_count,
-        like_count=prompt.like_count,
-        favorite_count=prompt.favorite_count,
-        created_at=prompt.created_at,
-        updated_at=prompt.updated_at,
-        is_liked=is_liked,
-        is_favorited=is_favorited
-    )
+    response = PromptResponse(**{
+        **prompt_data,
+        "is_liked": is_liked,
+        "is_favorited": is_favorited
+    })
     
     return ResponseModel(data=response.model_dump(by_alias=True))
 
@@ -184,10 +258,7 @@ async def update_prompt(
     db: AsyncSession = Depends(get_db)
 ):
     prompt_id = promptId
-    result = await db.execute(
-        select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.user_id == current_user.id, Prompt.state == 1))
-    )
-    prompt = result.scalar_one_or_none()
+    prompt = await revisions.load_for_edit(db, prompt_id, current_user.id)
     
     if not prompt:
         return ResponseModel(code=404, msg="提示词不存在或无权限")
@@ -198,10 +269,36 @@ async def update_prompt(
     if prompt_data.content is not None:
         update_data["content"] = prompt_data.content
     
+    tags_changed = False
+    if prompt_data.tags is not None:
+        tags_changed = await prompt_tags.set_prompt_tags(db, prompt, prompt_data.tags)
+        if not update_data:
+            await db.commit()
+            await cache.invalidate("prompt", prompt_id)
+            await cache.invalidate("feed")
+    
     if update_data:
-        await db.execute(update(Prompt).where(Prompt.id == prompt_id).values(**update_data))
+        await revisions.record_revision(
+            db,
+            prompt,
+            title=update_data.get("title", prompt.title),
+            content=update_data.get("content", prompt.content),
+            user_id=current_user.id
+        )
+        values = {key: value for key, value in update_data.items() if key != "content"}
+        if "content" in update_data:
+            values.update(Prompt.content_values(update_data["content"]))
+        await db.execute(queries.update_prompt(prompt_id, values))
         await db.commit()
         await db.refresh(prompt)
+        # 作者需要立即看到修改结果，详情缓存同步失效；索引由事件更新
+        await cache.invalidate("prompt", prompt_id)
+        await cache.invalidate("feed")
+        await events.emit(events.PROMPT_UPDATED, prompt_id)
+    
+    # 以上两个分支都已提交
+    if tags_changed:
+        await cache.invalidate("tags")
     
     response = PromptResponse(
         id=prompt.id,
@@ -213,7 +310,8 @@ async def update_prompt(
         like_count=prompt.like_count,
         favorite_count=prompt.favorite_count,
         created_at=prompt.created_at,
-        updated_at=prompt.updated_at
+        updated_at=prompt.updated_at,
+        tags=(await prompt_tags.load_tags(db, [prompt.id]))[prompt.id]
     )
     
     return ResponseModel(data=response.model_dump(by_alias=True))
@@ -225,58 +323,154 @@ async def delete_prompt(
     db: AsyncSession = Depends(get_db)
 ):
     prompt_id = promptId
-    result = await db.execute(
-        select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.user_id == current_user.id, Prompt.state == 1))
-    )
+    result = await db.execute(queries.owned_prompt(prompt_id, current_user.id))
     prompt = result.scalar_one_or_none()
     
     if not prompt:
         return ResponseModel(code=404, msg="提示词不存在或无权限")
     
-    await db.execute(update(Prompt).where(Prompt.id == prompt_id).values(state=0))
+    deleted_result = await db.execute(queries.soft_delete_prompt(prompt_id))
+    deleted = deleted_result.one_or_none()
+    tags_changed = await prompt_tags.clear_prompt_tags(db, prompt_id)
+    # 并发删除时只有一个请求拿到行，作者汇总只扣除一次
+    author_stats = await authors.remove_prompt(db, deleted) if deleted is not None else None
     await db.commit()
+    await authors.update_leaderboard([author_stats])
+    await cache.invalidate("prompt", prompt_id)
+    await cache.invalidate("feed")
+    if tags_changed:
+        await cache.invalidate("tags")
+    await events.emit(events.PROMPT_DELETED, prompt_id)
     
     return ResponseModel(msg="删除成功")
 
+@router.get("/{promptId}/revisions", response_model=ResponseModel)
+async def list_revisions(
+    promptId: int,
+    db: AsyncSession = Depends(get_db)
+):
+    prompt_id = promptId
+    result = await db.execute(queries.active_prompt_id(prompt_id))
+    if result.scalar_one_or_none() is None:
+        return ResponseModel(code=404, msg="提示词不存在")
+    
+    # 只取元数据列，不加载快照全文和增量数据
+    rev_result = await db.execute(queries.revision_list(prompt_id))
+    data = [
+        RevisionResponse(
+            version=r.version,
+            user_id=r.user_id,
+            title=r.title,
+            content_length=r.content_length,
+            created_at=r.created_at
+        ).model_dump(by_alias=True) for r in rev_result.all()
+    ]
+    return ResponseModel(data=data)
+
+@router.get("/{promptId}/revisions/{version}", response_model=ResponseModel)
+async def get_revision(
+    promptId: int,
+    version: int,
+    db: AsyncSession = Depends(get_db)
+):
+    prompt_id = promptId
+    result = await db.execute(queries.active_prompt_id(prompt_id))
+    if result.scalar_one_or_none() is None:
+        return ResponseModel(code=404, msg="提示词不存在")
+    
+    revision = await revisions.load_version(db, prompt_id, version)
+    if revision is None:
+        return ResponseModel(code=404, msg="版本不存在")
+    
+    return ResponseModel(data=RevisionDetailResponse(**revision).model_dump(by_alias=True))
 
-@router.post("/{promptId}/like", response_model=ResponseModel)
-async def like_prompt(
+@router.get("/{promptId}/similar", response_model=ResponseModel)
+async def similar_prompts(
     promptId: int,
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(10, ge=1, le=50),
     db: AsyncSession = Depends(get_db)
 ):
     prompt_id = promptId
-    result = await db.execute(select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
+    result = await db.execute(queries.active_prompt(prompt_id))
     prompt = result.scalar_one_or_none()
     
     if not prompt:
         return ResponseModel(code=404, msg="提示词不存在")
     
-    if prompt.user_id == current_user.id:
-        return ResponseModel(code=400, msg="不能点赞自己的提示词")
+    redis = await get_redis()
+    signature = await similarity.get_signature(redis, prompt_id)
+    if signature is None:
+        signature = await similarity.index_prompt(redis, prompt_id, prompt.content)
     
-    like_result = await db.execute(
-        select(PromptLike).where(
-            and_(PromptLike.prompt_id == prompt_id, PromptLike.user_id == current_user.id)
-        )
-    )
-    existing_like = like_result.scalar_one_or_none()
+    # 多取一些候选，过滤掉已删除的提示词后仍能凑够 limit 条
+    matches = await similarity.find_similar(redis, signature, limit=limit * 2, exclude_id=prompt_id)
+    if not matches:
+        return ResponseModel(data=[])
     
-    if existing_like:
-        await db.delete(existing_like)
-        await db.execute(
-            update(Prompt).where(Prompt.id == prompt_id).values(like_count=Prompt.like_count - 1)
-        )
-        await db.commit()
-        return ResponseModel(msg="取消点赞")
-    else:
-        new_like = PromptLike(prompt_id=prompt_id, user_id=current_user.id)
-        db.add(new_like)
-        await db.execute(
-            update(Prompt).where(Prompt.id == prompt_id).values(like_count=Prompt.like_count + 1)
-        )
-        await db.commit()
-        return ResponseModel(msg="点赞成功")
+    distances = dict(matches)
+    similar_result = await db.execute(queries.active_prompts_by_ids(distances))
+    similar = sorted(similar_result.scalars().all(), key=lambda p: (distances[p.id], p.id))[:limit]
+    
+    data = [
+        SimilarPromptResponse(
+            id=p.id,
+            user_id=p.user_id,
+            title=p.title,
+            content=p.content,
+            state=p.state,
+            view_count=p.view_count,
+            like_count=p.like_count,
+            favorite_count=p.favorite_count,
+            created_at=p.created_at,
+            updated_at=p.updated_at,
+            distance=distances[p.id]
+        ).model_dump(by_alias=True) for p in similar
+    ]
+    return ResponseModel(data=data)
+
+@router.post("/{promptId}/like", response_model=ResponseModel)
+async def like_prompt(
+    promptId: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    # 切换点赞状态：先尝试点赞，已点赞则取消
+    prompt_id = promptId
+    like_count = await interactions.add(db, PromptLike, "like_count", prompt_id, current_user.id)
+    if like_count is not None:
+        await events.emit_interaction(events.PROMPT_LIKED, prompt_id, 1)
+        return ResponseModel(data={"likeCount": like_count}, msg="点赞成功")
+    
+    like_count = await interactions.remove(db, PromptLike, "like_count", prompt_id, current_user.id)
+    if like_count is not None:
+        await events.emit_interaction(events.PROMPT_LIKED, prompt_id, -1)
+        return ResponseModel(data={"likeCount": like_count}, msg="取消点赞")
+    
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
+        return ResponseModel(code=404, msg="提示词不存在")
+    if reason == interactions.OWN_PROMPT:
+        return ResponseModel(code=400, msg="不能点赞自己的提示词")
+    return ResponseModel(msg="取消点赞")
+
+@router.put("/{promptId}/like", response_model=ResponseModel)
+async def put_like(
+    promptId: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    prompt_id = promptId
+    like_count = await interactions.add(db, PromptLike, "like_count", prompt_id, current_user.id)
+    if like_count is not None:
+        await events.emit_interaction(events.PROMPT_LIKED, prompt_id, 1)
+        return ResponseModel(data={"likeCount": like_count}, msg="点赞成功")
+    
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
+        return ResponseModel(code=404, msg="提示词不存在")
+    if reason == interactions.OWN_PROMPT:
+        return ResponseModel(code=400, msg="不能点赞自己的提示词")
+    return ResponseModel(msg="已点赞")
 
 @router.delete("/{promptId}/like", response_model=ResponseModel)
 async def unlike_prompt(
@@ -285,20 +479,15 @@ async def unlike_prompt(
     db: AsyncSession = Depends(get_db)
 ):
     prompt_id = promptId
-    result = await db.execute(select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
-    prompt = result.scalar_one_or_none()
-    if not prompt:
+    like_count = await interactions.remove(db, PromptLike, "like_count", prompt_id, current_user.id)
+    if like_count is not None:
+        await events.emit_interaction(events.PROMPT_LIKED, prompt_id, -1)
+        return ResponseModel(data={"likeCount": like_count}, msg="取消点赞")
+    
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
         return ResponseModel(code=404, msg="提示词不存在")
-    like_result = await db.execute(
-        select(PromptLike).where(and_(PromptLike.prompt_id == prompt_id, PromptLike.user_id == current_user.id))
-    )
-    existing_like = like_result.scalar_one_or_none()
-    if not existing_like:
-        return ResponseModel(msg="未点赞")
-    await db.delete(existing_like)
-    await db.execute(update(Prompt).where(Prompt.id == prompt_id).values(like_count=Prompt.like_count - 1))
-    await db.commit()
-    return ResponseModel(msg="取消点赞")
+    return ResponseModel(msg="未点赞")
 
 @router.post("/{promptId}/favorite", response_model=ResponseModel)
 async def favorite_prompt(
@@ -306,38 +495,43 @@ async def favorite_prompt(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
+    # 切换收藏状态：先尝试收藏，已收藏则取消
     prompt_id = promptId
-    result = await db.execute(select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
-    prompt = result.scalar_one_or_none()
-    
-    if not prompt:
+    favorite_count = await interactions.add(db, PromptFavorite, "favorite_count", prompt_id, current_user.id)
+    if favorite_count is not None:
+        await events.emit_interaction(events.PROMPT_FAVORITED, prompt_id, 1)
+        return ResponseModel(data={"favoriteCount": favorite_count}, msg="收藏成功")
+    
+    favorite_count = await interactions.remove(db, PromptFavorite, "favorite_count", prompt_id, current_user.id)
+    if favorite_count is not None:
+        await events.emit_interaction(events.PROMPT_FAVORITED, prompt_id, -1)
+        return ResponseModel(data={"favoriteCount": favorite_count}, msg="取消收藏")
+    
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
         return ResponseModel(code=404, msg="提示词不存在")
-    
-    if prompt.user_id == current_user.id:
+    if reason == interactions.OWN_PROMPT:
         return ResponseModel(code=400, msg="不能收藏自己的提示词")
+    return ResponseModel(msg="取消收藏")
+
+@router.put("/{promptId}/favorite", response_model=ResponseModel)
+async def put_favorite(
+    promptId: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    prompt_id = promptId
+    favorite_count = await interactions.add(db, PromptFavorite, "favorite_count", prompt_id, current_user.id)
+    if favorite_count is not None:
+        await events.emit_interaction(events.PROMPT_FAVORITED, prompt_id, 1)
+        return ResponseModel(data={"favoriteCount": favorite_count}, msg="收藏成功")
     
-    fav_result = await db.execute(
-        select(PromptFavorite).where(
-            and_(PromptFavorite.prompt_id == prompt_id, PromptFavorite.user_id == current_user.id)
-        )
-    )
-    existing_fav = fav_result.scalar_one_or_none()
-    
-    if existing_fav:
-        await db.delete(existing_fav)
-        await db.execute(
-            update(Prompt).where(Prompt.id == prompt_id).values(favorite_count=Prompt.favorite_count - 1)
-        )
-        await db.commit()
-        return ResponseModel(msg="取消收藏")
-    else:
-        new_fav = PromptFavorite(prompt_id=prompt_id, user_id=current_user.id)
-        db.add(new_fav)
-        await db.execute(
-            update(Prompt).where(Prompt.id == prompt_id).values(favorite_count=Prompt.favorite_count + 1)
-        )
-        await db.commit()
-        return ResponseModel(msg="收藏成功")
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
+        return ResponseModel(code=404, msg="提示词不存在")
+    if reason == interactions.OWN_PROMPT:
+        return ResponseModel(code=400, msg="不能收藏自己的提示词")
+    return ResponseModel(msg="已收藏")
 
 @router.delete("/{promptId}/favorite", response_model=ResponseModel)
 async def unfavorite_prompt(
@@ -346,20 +540,15 @@ async def unfavorite_prompt(
     db: AsyncSession = Depends(get_db)
 ):
     prompt_id = promptId
-    result = await db.execute(select(Prompt).where(and_(Prompt.id == prompt_id, Prompt.state == 1)))
-    prompt = result.scalar_one_or_none()
-    if not prompt:
+    favorite_count = await interactions.remove(db, PromptFavorite, "favorite_count", prompt_id, current_user.id)
+    if favorite_count is not None:
+        await events.emit_interaction(events.PROMPT_FAVORITED, prompt_id, -1)
+        return ResponseModel(data={"favoriteCount": favorite_count}, msg="取消收藏")
+    
+    reason = await interactions.explain_noop(db, prompt_id, current_user.id)
+    if reason == interactions.NOT_FOUND:
         return ResponseModel(code=404, msg="提示词不存在")
-    fav_result = await db.execute(
-        select(PromptFavorite).where(and_(PromptFavorite.prompt_id == prompt_id, PromptFavorite.user_id == current_user.id))
-    )
-    existing_fav = fav_result.scalar_one_or_none()
-    if not existing_fav:
-        return ResponseModel(msg="未收藏")
-    await db.delete(existing_fav)
-    await db.execute(update(Prompt).where(Prompt.id == prompt_id).values(favorite_count=Prompt.favorite_count - 1))
-    await db.commit()
-    return ResponseModel(msg="取消收藏")
+    return ResponseModel(msg="未收藏")
 
 @router.post("/{promptId}/collect", response_model=ResponseModel)
 async def collect_prompt(
@@ -369,6 +558,14 @@ async def collect_prompt(
 ):
     return await favorite_prompt(promptId, current_user, db)
 
+@router.put("/{promptId}/collect", response_model=ResponseModel)
+async def put_collect(
+    promptId: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    return await put_favorite(promptId, current_user, db)
+
 @router.delete("/{promptId}/collect", response_model=ResponseModel)
 async def uncollect_prompt(
     promptId: int,
@@ -387,37 +584,15 @@ async def my_prompts(
     page_size = pageSize
     offset = (page - 1) * page_size
     
-    query = select(Prompt).where(
-        and_(Prompt.user_id == current_user.id, Prompt.state == 1)
-    ).order_by(Prompt.created_at.desc())
+    result = await db.execute(queries.user_prompts_page(current_user.id, offset, page_size))
+    rows = result.all()
     
-    result = await db.execute(query.limit(page_size).offset(offset))
-    prompts = result.scalars().all()
-    
-    count_result = await db.execute(
-        select(func.count(Prompt.id)).where(
-            and_(Prompt.user_id == current_user.id, Prompt.state == 1)
-        )
-    )
+    count_result = await db.execute(queries.user_prompts_count(current_user.id))
     total = count_result.scalar()
     
-    prompt_list = [
-        PromptResponse(
-            id=p.id,
-            user_id=p.user_id,
-            title=p.title,
-            content=p.content,
-            state=p.state,
-            view_count=p.view_count,
-            like_count=p.like_count,
-            favorite_count=p.favorite_count,
-            created_at=p.created_at,
-            updated_at=p.updated_at
-        ) for p in prompts
-    ]
-    
-    response = PromptListResponse(list=prompt_list, total=total, page=page, page_size=page_size)
-    return ResponseModel(data=response.model_dump(by_alias=True))
+    tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+    items = [prompt_rows.response_item(row, tag_map[row.id]) for row in rows]
+    return ResponseModel(data=prompt_rows.list_response(items, total, page, page_size))
 
 @router.get("/my", response_model=ResponseModel)
 async def my_prompts_alias(
@@ -438,38 +613,15 @@ async def my_favorites(
     page_size = pageSize
     offset = (page - 1) * page_size
     
-    query = select(Prompt).join(PromptFavorite).where(
-        and_(PromptFavorite.user_id == current_user.id, Prompt.state == 1)
-    ).order_by(PromptFavorite.created_at.desc())
-    
-    result = await db.execute(query.limit(page_size).offset(offset))
-    prompts = result.scalars().all()
+    result = await db.execute(queries.favorites_page(current_user.id, offset, page_size))
+    rows = result.all()
     
-    count_result = await db.execute(
-        select(func.count(Prompt.id)).join(PromptFavorite).where(
-            and_(PromptFavorite.user_id == current_user.id, Prompt.state == 1)
-        )
-    )
+    count_result = await db.execute(queries.favorites_count(current_user.id))
     total = count_result.scalar()
     
-    prompt_list = [
-        PromptResponse(
-            id=p.id,
-            user_id=p.user_id,
-            title=p.title,
-            content=p.content,
-            state=p.state,
-            view_count=p.view_count,
-            like_count=p.like_count,
-            favorite_count=p.favorite_count,
-            created_at=p.created_at,
-            updated_at=p.updated_at,
-            is_favorited=True
-        ) for p in prompts
-    ]
-    
-    response = PromptListResponse(list=prompt_list, total=total, page=page, page_size=page_size)
-    return ResponseModel(data=response.model_dump(by_alias=True))
+    tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+    items = [prompt_rows.response_item(row, tag_map[row.id], is_favorited=True) for row in rows]
+    return ResponseModel(data=prompt_rows.list_response(items, total, page, page_size))
 
 @router.get("/my/collects", response_model=ResponseModel)
 async def my_collects_alias(
@@ -490,38 +642,15 @@ async def my_likes(
     page_size = pageSize
     offset = (page - 1) * page_size
     
-    query = select(Prompt).join(PromptLike).where(
-        and_(PromptLike.user_id == current_user.id, Prompt.state == 1)
-    ).order_by(PromptLike.created_at.desc())
-    
-    result = await db.execute(query.limit(page_size).offset(offset))
-    prompts = result.scalars().all()
+    result = await db.execute(queries.likes_page(current_user.id, offset, page_size))
+    rows = result.all()
     
-    count_result = await db.execute(
-        select(func.count(Prompt.id)).join(PromptLike).where(
-            and_(PromptLike.user_id == current_user.id, Prompt.state == 1)
-        )
-    )
+    count_result = await db.execute(queries.likes_count(current_user.id))
     total = count_result.scalar()
     
-    prompt_list = [
-        PromptResponse(
-            id=p.id,
-            user_id=p.user_id,
-            title=p.title,
-            content=p.content,
-            state=p.state,
-            view_count=p.view_count,
-            like_count=p.like_count,
-            favorite_count=p.favorite_count,
-            created_at=p.created_at,
-            updated_at=p.updated_at,
-            is_liked=True
-        ) for p in prompts
-    ]
-    
-    response = PromptListResponse(list=prompt_list, total=total, page=page, page_size=page_size)
-    return ResponseModel(data=response.model_dump(by_alias=True))
+    tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+    items = [prompt_rows.response_item(row, tag_map[row.id], is_liked=True) for row in rows]
+    return ResponseModel(data=prompt_rows.list_response(items, total, page, page_size))
 
 @router.get("/my/likes", response_model=ResponseModel)
 async def my_likes_alias(
@@ -533,11 +662,12 @@ async def my_likes_alias(
     return await my_likes(page, pageSize, current_user, db)
 
 @router.get("/stats/global", response_model=ResponseModel)
+@cached("stats", ttl=STATS_CACHE_TTL)
 async def get_stats(db: AsyncSession = Depends(get_db)):
-    total_prompts_result = await db.execute(select(func.count(Prompt.id)).where(Prompt.state == 1))
+    total_prompts_result = await db.execute(queries.total_active_prompts())
     total_prompts = total_prompts_result.scalar()
     
-    total_views_result = await db.execute(select(func.count(PromptView.id)))
+    total_views_result = await db.execute(queries.total_views())
     total_views = total_views_result.scalar()
     
     stats = StatsResponse(total_prompts=total_prompts, total_views=total_views)
@@ -545,56 +675,4 @@ async def get_stats(db: AsyncSession = Depends(get_db)):
 
 @router.get("/statistics", response_model=ResponseModel)
 async def get_statistics_alias(db: AsyncSession = Depends(get_db)):
-    return await get_stats(db)
-
-@router.get("", response_model=ResponseModel)
-async def list_prompts(
-    page: int = 1,
-    pageSize: int = 10,
-    keyword: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-    current_user: Optional[User] = Depends(get_optional_user)
-):
-    page_size = pageSize
-    offset = (page - 1) * page_size
-    base = select(Prompt).where(Prompt.state == 1)
-    if keyword:
-        pattern = f"%{keyword}%"
-        base = base.where(or_(Prompt.title.ilike(pattern), Prompt.content.ilike(pattern)))
-    result = await db.execute(base.order_by(Prompt.created_at.desc()).limit(page_size).offset(offset))
-    prompts = result.scalars().all()
-    count_query = select(func.count(Prompt.id)).where(Prompt.state == 1)
-    if keyword:
-        pattern = f"%{keyword}%"
-        count_query = count_query.where(or_(Prompt.title.ilike(pattern), Prompt.content.ilike(pattern)))
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
-    prompt_list = []
-    for prompt in prompts:
-        is_liked = False
-        is_favorited = False
-        if current_user:
-            like_result = await db.execute(
-                select(PromptLike).where(and_(PromptLike.prompt_id == prompt.id, PromptLike.user_id == current_user.id))
-            )
-            is_liked = like_result.scalar_one_or_none() is not None
-            fav_result = await db.execute(
-                select(PromptFavorite).where(and_(PromptFavorite.prompt_id == prompt.id, PromptFavorite.user_id == current_user.id))
-            )
-            is_favorited = fav_result.scalar_one_or_none() is not None
-        prompt_list.append(PromptResponse(
-            id=prompt.id,
-            user_id=prompt.user_id,
-            title=prompt.title,
-            content=prompt.content,
-            state=prompt.state,
-            view_count=prompt.view_count,
-            like_count=prompt.like_count,
-            favorite_count=prompt.favorite_count,
-            created_at=prompt.created_at,
-            updated_at=prompt.updated_at,
-            is_liked=is_liked,
-            is_favorited=is_favorited
-        ))
-    response = PromptListResponse(list=prompt_list, total=total, page=page, page_size=page_size)
-    return ResponseModel(data=response.model_dump(by_alias=True))
+    return await get_stats(db=db)
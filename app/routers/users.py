@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.schemas import ResponseModel, LeaderboardResponse
+from app import authors
+
+router = APIRouter(prefix="/users", tags=["用户"])
+
+LEADERBOARD_MAX_PAGE_SIZE = 50
+
+@router.get("/leaderboard", response_model=ResponseModel)
+async def get_leaderboard(page: int = 1, pageSize: int = 10, db: AsyncSession = Depends(get_db)):
+    """作者排行榜，按作者提示词的总热度（浏览、点赞、收藏加权）从高到低"""
+    page = max(page, 1)
+    page_size = max(1, min(pageSize, LEADERBOARD_MAX_PAGE_SIZE))
+
+    items, total = await authors.leaderboard(db, (page - 1) * page_size, page_size)
+    response = LeaderboardResponse(list=items, total=total, page=page, page_size=page_size)
+    return ResponseModel(data=response.model_dump(by_alias=True))
+
+@router.get("/{userId}/stats", response_model=ResponseModel)
+async def get_author_stats(userId: int, db: AsyncSession = Depends(get_db)):
+    """作者统计：正常状态提示词数量与所获浏览、点赞、收藏总数"""
+    stats = await authors.get_stats(db, userId)
+    if stats is None:
+        return ResponseModel(code=404, msg="用户不存在")
+    return ResponseModel(data=stats.model_dump(by_alias=True))
@@ -0,0 +1,28 @@
+"""
+已有数据库的结构升级
+create_all 只会创建缺失的表，已有表上新增的列、索引等变更在这里用幂等的 DDL 补齐；
+由基线迁移（app/migrations.py 版本 1）调用，之后的结构变更写成新的迁移版本
+"""
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from app.database import Base
+from app import view_partitions
+
+POSTGRES_UPGRADES = [
+    # 正文压缩
+    "ALTER TABLE prompts ADD COLUMN IF NOT EXISTS content_z BYTEA",
+    "ALTER TABLE prompts ALTER COLUMN content DROP NOT NULL",
+]
+
+async def upgrade_schema(conn, tables=None):
+    """tables 为要补齐索引的表，基线迁移传入冻结的版本 1 结构，默认为当前模型"""
+    if conn.dialect.name != "postgresql":
+        return
+    for statement in POSTGRES_UPGRADES:
+        await conn.execute(text(statement))
+    # 模型中新增的索引
+    for table in tables or Base.metadata.sorted_tables:
+        for index in table.indexes:
+            await conn.execute(CreateIndex(index, if_not_exists=True))
+    # 浏览记录的当前及未来月份分区
+    await view_partitions.ensure_partitions(conn)
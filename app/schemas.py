@@ -50,10 +50,12 @@ class TokenResponse(BaseModel):
 class PromptCreate(BaseModel):
     title: str = Field(..., max_length=200)
     content: str = Field(..., max_length=30000)
+    tags: List[str] = Field(default_factory=list, max_length=10)
 
 class PromptUpdate(BaseModel):
     title: Optional[str] = Field(None, max_length=200)
     content: Optional[str] = Field(None, max_length=30000)
+    tags: Optional[List[str]] = Field(None, max_length=10)
 
 class PromptResponse(BaseModel):
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
@@ -70,6 +72,44 @@ class PromptResponse(BaseModel):
     updated_at: Optional[datetime]
     is_liked: bool = False
     is_favorited: bool = False
+    tags: List[str] = []
+
+class PromptCreateResponse(PromptResponse):
+    duplicate_ids: List[int] = []
+
+class SimilarPromptResponse(PromptResponse):
+    distance: int
+
+class TagResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    id: int
+    name: str
+    prompt_count: int
+
+class SuggestResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    id: int
+    title: str
+
+class RevisionResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    version: int
+    user_id: int
+    title: str
+    content_length: int
+    created_at: datetime
+
+class RevisionDetailResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    version: int
+    user_id: int
+    title: str
+    content: str
+    created_at: datetime
 
 class PromptListResponse(BaseModel):
     model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
@@ -84,3 +124,25 @@ class StatsResponse(BaseModel):
     
     total_prompts: int
     total_views: int
+
+class AuthorStatsResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    user_id: int
+    username: str
+    prompt_count: int
+    view_count: int
+    like_count: int
+    favorite_count: int
+
+class LeaderboardItem(AuthorStatsResponse):
+    rank: int
+    score: int
+
+class LeaderboardResponse(BaseModel):
+    model_config = ConfigDict(populate_by_name=True, alias_generator=to_camel)
+    
+    list: List[LeaderboardItem]
+    total: int
+    page: int
+    page_size: int
@@ -0,0 +1,166 @@
+"""
+相似提示词索引
+
+对 Prompt.content 计算 64 位 SimHash 签名（字符 3-gram，NumPy 向量化批量计算），
+签名按 16 位切成 4 个 band 存入 Redis 分桶（LSH banding）。
+查询时只取同桶候选再计算汉明距离，无需扫描全部提示词。
+汉明距离 <= 3 的近似重复一定会落在同一个桶中（抽屉原理），更远的相似为概率召回。
+"""
+from typing import Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+SHINGLE_SIZE = 3
+BANDS = 4
+BAND_BITS = 64 // BANDS
+DUPLICATE_MAX_DISTANCE = 3
+SIMILAR_MAX_DISTANCE = 12
+# 单次向量化处理的 shingle 上限，控制批量计算时的内存占用
+CHUNK_SHINGLES = 1 << 20
+
+SIG_KEY = "simhash:sig"
+BAND_KEY = "simhash:band:{band}:{value:04x}"
+
+_PRIME = np.uint64(0x100000001B3)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+_S30, _S27, _S31 = np.uint64(30), np.uint64(27), np.uint64(31)
+_BAND_MASK = (1 << BAND_BITS) - 1
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    codes = np.frombuffer(_normalize(text).encode("utf-32-le"), dtype="<u4").astype(np.uint64)
+    if len(codes) < SHINGLE_SIZE:
+        codes = np.concatenate([codes, np.zeros(SHINGLE_SIZE - len(codes), dtype=np.uint64)])
+    n = len(codes) - SHINGLE_SIZE + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for i in range(SHINGLE_SIZE):
+        h = h * _PRIME + codes[i:i + n]
+    # splitmix64 混淆，让各比特分布均匀
+    h ^= h >> _S30
+    h *= _MIX1
+    h ^= h >> _S27
+    h *= _MIX2
+    h ^= h >> _S31
+    return h
+
+
+def _signatures_chunk(hashes: List[np.ndarray]) -> np.ndarray:
+    lengths = np.array([len(h) for h in hashes], dtype=np.int64)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    flat = np.concatenate(hashes).astype("<u8")
+    bits = np.unpackbits(flat.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    # 按文档切片求和比 np.add.reduceat 在 (n, 64) 上快 3 倍左右
+    counts = np.empty((len(hashes), 64), dtype=np.int64)
+    for i in range(len(hashes)):
+        counts[i] = bits[bounds[i]:bounds[i + 1]].sum(axis=0, dtype=np.uint32)
+    sig_bits = (counts * 2 > lengths[:, None]).astype(np.uint8)
+    return np.packbits(sig_bits, axis=1, bitorder="little").view("<u8").ravel()
+
+
+def compute_signatures(texts: Sequence[str]) -> np.ndarray:
+    """批量计算 SimHash 签名，返回 uint64 数组"""
+    result = np.zeros(len(texts), dtype=np.uint64)
+    chunk: List[np.ndarray] = []
+    chunk_start = 0
+    chunk_size = 0
+    for i, text in enumerate(texts):
+        hashes = _shingle_hashes(text)
+        if chunk and chunk_size + len(hashes) > CHUNK_SHINGLES:
+            result[chunk_start:i] = _signatures_chunk(chunk)
+            chunk, chunk_start, chunk_size = [], i, 0
+        chunk.append(hashes)
+        chunk_size += len(hashes)
+    if chunk:
+        result[chunk_start:] = _signatures_chunk(chunk)
+    return result
+
+
+def compute_signature(text: str) -> int:
+    return int(compute_signatures([text])[0])
+
+
+def hamming_distances(signature: int, candidates: np.ndarray) -> np.ndarray:
+    xor = (candidates.astype("<u8") ^ np.uint64(signature)).view(np.uint8)
+    return np.unpackbits(xor).reshape(-1, 64).sum(axis=1)
+
+
+def band_keys(signature: int) -> List[str]:
+    return [
+        BAND_KEY.format(band=band, value=(signature >> (band * BAND_BITS)) & _BAND_MASK)
+        for band in range(BANDS)
+    ]
+
+
+async def index_prompt(redis, prompt_id: int, content: str, signature: Optional[int] = None) -> int:
+    """新增或更新某条提示词的签名及分桶"""
+    if signature is None:
+        signature = compute_signature(content)
+    old = await redis.hget(SIG_KEY, prompt_id)
+    pipe = redis.pipeline(transaction=False)
+    if old is not None:
+        for key in band_keys(int(old)):
+            pipe.srem(key, prompt_id)
+    for key in band_keys(signature):
+        pipe.sadd(key, prompt_id)
+    pipe.hset(SIG_KEY, prompt_id, signature)
+    await pipe.execute()
+    return signature
+
+
+async def index_batch(redis, rows: Iterable[Tuple[int, str]]):
+    """离线批量建索引，rows 为 (prompt_id, content)"""
+    rows = list(rows)
+    if not rows:
+        return
+    signatures = compute_signatures([content for _, content in rows])
+    pipe = redis.pipeline(transaction=False)
+    for (prompt_id, _), signature in zip(rows, signatures):
+        signature = int(signature)
+        for key in band_keys(signature):
+            pipe.sadd(key, prompt_id)
+        pipe.hset(SIG_KEY, prompt_id, signature)
+    await pipe.execute()
+
+
+async def remove_prompt(redis, prompt_id: int):
+    old = await redis.hget(SIG_KEY, prompt_id)
+    if old is None:
+        return
+    pipe = redis.pipeline(transaction=False)
+    for key in band_keys(int(old)):
+        pipe.srem(key, prompt_id)
+    pipe.hdel(SIG_KEY, prompt_id)
+    await pipe.execute()
+
+
+async def get_signature(redis, prompt_id: int) -> Optional[int]:
+    value = await redis.hget(SIG_KEY, prompt_id)
+    return int(value) if value is not None else None
+
+
+async def find_similar(
+    redis,
+    signature: int,
+    max_distance: int = SIMILAR_MAX_DISTANCE,
+    limit: int = 10,
+    exclude_id: Optional[int] = None,
+) -> List[Tuple[int, int]]:
+    """返回按汉明距离升序的 (prompt_id, distance) 列表"""
+    candidate_ids = await redis.sunion(band_keys(signature))
+    candidate_ids = [int(c) for c in candidate_ids if int(c) != exclude_id]
+    if not candidate_ids:
+        return []
+    values = await redis.hmget(SIG_KEY, candidate_ids)
+    pairs = [(cid, int(v)) for cid, v in zip(candidate_ids, values) if v is not None]
+    if not pairs:
+        return []
+    ids = np.array([cid for cid, _ in pairs], dtype=np.int64)
+    distances = hamming_distances(signature, np.array([sig for _, sig in pairs], dtype=np.uint64))
+    mask = distances <= max_distance
+    ids, distances = ids[mask], distances[mask]
+    order = np.lexsort((ids, distances))[:limit]
+    return [(int(ids[i]), int(distances[i])) for i in order]
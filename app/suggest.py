@@ -0,0 +1,177 @@
+"""
+标题联想（输入提示）
+
+每个前缀一个 Redis 有序集合 suggest:prefix:{前缀}，成员为 prompt_id，分数为热度，
+只保留热度最高的 PREFIX_TOP_K 条。查询时直接 ZREVRANGE 取前 limit 条（O(log N + limit)），
+结果总是该前缀下最热门的标题，不受字母顺序影响。
+热度变化时总热度立即累加，前缀集合中的分数由后台任务每 POPULARITY_FLUSH_SECONDS 秒批量改写一次：
+一个标题有上百个前缀，逐批改写会让每次浏览 / 点赞产生上百条命令；合并后热门提示词每个周期只改写一次。
+改写时按标题重新计算前缀，把新分数写入每个前缀集合再裁剪，跌出前 K 的提示词在热度回升时重新进入。
+进程退出前未写入的分数会丢失，前缀排序稍有滞后，下一次热度变化时恢复。
+每个标题会写入多个词条：标题本身、从每个单词开始的后缀，
+含中文时额外写入全拼和拼音首字母，方便用拼音联想；每个词条取前 MAX_PREFIX_LENGTH 个字符的所有前缀。
+更长的查询先用截断后的前缀取候选，再按完整前缀过滤。
+"""
+import asyncio
+import logging
+import re
+from typing import List, Optional, Set
+
+PREFIX_KEY = "suggest:prefix:"
+TITLE_KEY = "suggest:title"
+POPULARITY_KEY = "suggest:popularity"
+# 每个前缀保留的提示词数，远大于单次查询的 limit（最多 20），删除提示词留下的空位不影响结果
+PREFIX_TOP_K = 100
+MAX_PREFIX_LENGTH = 20
+MAX_WORD_SUFFIXES = 5
+# 前缀集合中热度分数的批量改写间隔（秒）
+POPULARITY_FLUSH_SECONDS = 5
+
+VIEW_WEIGHT = 1
+LIKE_WEIGHT = 3
+FAVORITE_WEIGHT = 5
+
+_CJK = re.compile(r"[\u3400-\u9fff]")
+
+logger = logging.getLogger(__name__)
+
+# 热度已变化、前缀集合尚未改写的提示词
+_pending: Set[int] = set()
+_flush_task: Optional[asyncio.Task] = None
+
+
+def normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def popularity_score(view_count: int, like_count: int, favorite_count: int) -> int:
+    return (view_count or 0) * VIEW_WEIGHT + (like_count or 0) * LIKE_WEIGHT + (favorite_count or 0) * FAVORITE_WEIGHT
+
+
+def title_terms(title: str) -> List[str]:
+    text = normalize(title)
+    if not text:
+        return []
+    terms = [text]
+    words = text.split(" ")
+    for i in range(1, min(len(words), MAX_WORD_SUFFIXES + 1)):
+        terms.append(" ".join(words[i:]))
+    if _CJK.search(text):
+        # pypinyin 加载词典约需 0.25 秒，只在第一次索引中文标题时导入
+        from pypinyin import lazy_pinyin, Style
+        terms.append("".join(lazy_pinyin(text)).replace(" ", ""))
+        terms.append("".join(lazy_pinyin(text, style=Style.FIRST_LETTER)).replace(" ", ""))
+    return list(dict.fromkeys(t for t in terms if t))
+
+
+def _prefixes(title: str) -> List[str]:
+    prefixes = set()
+    for term in title_terms(title):
+        for length in range(1, min(len(term), MAX_PREFIX_LENGTH) + 1):
+            prefixes.add(term[:length])
+    return sorted(prefixes)
+
+
+def _add_to_prefixes(pipe, prompt_id: int, prefixes: List[str], popularity: float):
+    for prefix in prefixes:
+        key = PREFIX_KEY + prefix
+        pipe.zadd(key, {prompt_id: popularity})
+        pipe.zremrangebyrank(key, 0, -PREFIX_TOP_K - 1)
+
+
+async def index_title(redis, prompt_id: int, title: str, popularity: Optional[int] = None):
+    old_title = await redis.hget(TITLE_KEY, prompt_id)
+    if popularity is None:
+        popularity = await redis.zscore(POPULARITY_KEY, prompt_id) or 0
+    prefixes = _prefixes(title)
+    pipe = redis.pipeline(transaction=False)
+    if old_title is not None:
+        for prefix in set(_prefixes(old_title)) - set(prefixes):
+            pipe.zrem(PREFIX_KEY + prefix, prompt_id)
+    _add_to_prefixes(pipe, prompt_id, prefixes, popularity)
+    pipe.hset(TITLE_KEY, prompt_id, title)
+    pipe.zadd(POPULARITY_KEY, {prompt_id: popularity})
+    await pipe.execute()
+
+
+async def index_batch(redis, rows):
+    """离线批量建索引，rows 为 (prompt_id, title, popularity)"""
+    pipe = redis.pipeline(transaction=False)
+    for prompt_id, title, popularity in rows:
+        _add_to_prefixes(pipe, prompt_id, _prefixes(title), popularity)
+        pipe.hset(TITLE_KEY, prompt_id, title)
+        pipe.zadd(POPULARITY_KEY, {prompt_id: popularity})
+    await pipe.execute()
+
+
+async def remove_title(redis, prompt_id: int):
+    old_title = await redis.hget(TITLE_KEY, prompt_id)
+    if old_title is None:
+        return
+    pipe = redis.pipeline(transaction=False)
+    for prefix in _prefixes(old_title):
+        pipe.zrem(PREFIX_KEY + prefix, prompt_id)
+    pipe.hdel(TITLE_KEY, prompt_id)
+    pipe.zrem(POPULARITY_KEY, prompt_id)
+    await pipe.execute()
+
+
+async def bump_popularity(redis, prompt_id: int, amount: int):
+    """累加热度；前缀集合中的分数稍后由 flush_popularity 批量改写"""
+    global _flush_task
+    await redis.zincrby(POPULARITY_KEY, amount, prompt_id)
+    _pending.add(prompt_id)
+    # 事件循环切换后（如测试中多次 asyncio.run）旧循环中的任务不会再运行
+    if _flush_task is None or _flush_task.done() or _flush_task.get_loop() is not asyncio.get_running_loop():
+        _flush_task = asyncio.create_task(_flush_later(redis))
+
+
+async def _flush_later(redis):
+    await asyncio.sleep(POPULARITY_FLUSH_SECONDS)
+    try:
+        await flush_popularity(redis)
+    except Exception:
+        logger.exception("改写标题联想热度失败")
+
+
+async def flush_popularity(redis):
+    """把热度已变化的提示词的最新分数写入各自标题的所有前缀集合，失败时留待下次改写"""
+    prompt_ids = sorted(_pending)
+    _pending.clear()
+    if not prompt_ids:
+        return
+    try:
+        scores = await redis.zmscore(POPULARITY_KEY, prompt_ids)
+        titles = await redis.hmget(TITLE_KEY, prompt_ids)
+        pipe = redis.pipeline(transaction=False)
+        for prompt_id, popularity, title in zip(prompt_ids, scores, titles):
+            if popularity is not None and title is not None:
+                _add_to_prefixes(pipe, prompt_id, _prefixes(title), popularity)
+        await pipe.execute()
+    except Exception:
+        _pending.update(prompt_ids)
+        raise
+
+
+async def suggest(redis, q: str, limit: int = 10) -> List[dict]:
+    prefix = normalize(q)
+    if not prefix:
+        return []
+    truncated = len(prefix) > MAX_PREFIX_LENGTH
+    # 前缀集合已按热度排序；截断的长前缀需要过滤，多取一些候选
+    count = PREFIX_TOP_K if truncated else limit
+    members = await redis.zrevrange(PREFIX_KEY + prefix[:MAX_PREFIX_LENGTH], 0, count - 1)
+    ids = [int(member) for member in members]
+    if not ids:
+        return []
+    titles = await redis.hmget(TITLE_KEY, ids)
+    items = []
+    for prompt_id, title in zip(ids, titles):
+        if title is None:
+            continue
+        if truncated and not any(term.startswith(prefix) for term in title_terms(title)):
+            continue
+        items.append({"id": prompt_id, "title": title})
+        if len(items) >= limit:
+            break
+    return items
@@ -0,0 +1,95 @@
+"""
+提示词标签
+
+标签名统一小写、去除首尾空白，每条提示词最多 MAX_TAGS 个。
+prompt_tags 只保存正常状态提示词的标签，tags.prompt_count 与其行数在同一事务中同步增减。
+"""
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import insert
+from app.models import Tag, PromptTag
+from app import queries
+
+MAX_TAGS = 10
+MAX_TAG_LENGTH = 50
+
+
+def normalize_tags(names: Iterable[str]) -> List[str]:
+    result = []
+    for name in names:
+        name = " ".join(name.split()).lower()[:MAX_TAG_LENGTH]
+        if name and name not in result:
+            result.append(name)
+    return result[:MAX_TAGS]
+
+
+def parse_filter(value: Optional[str]) -> List[str]:
+    """查询参数 tags=a,b 解析为标签名列表"""
+    if not value:
+        return []
+    return normalize_tags(value.split(","))
+
+
+async def _ensure_tags(db: AsyncSession, names: List[str]) -> Dict[str, int]:
+    await db.execute(
+        insert(Tag)
+        .values([{"name": name, "prompt_count": 0} for name in names])
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    result = await db.execute(queries.tags_by_names(names))
+    return {tag.name: tag.id for tag in result.scalars().all()}
+
+
+async def set_prompt_tags(db: AsyncSession, prompt, names: List[str]) -> bool:
+    """把提示词的标签设置为 names，随调用方的事务一起提交；返回标签计数是否变化（提交后需让 tags 缓存失效）"""
+    names = normalize_tags(names)
+    result = await db.execute(queries.prompt_tag_ids(prompt.id))
+    old_ids = set(result.scalars().all())
+    tag_ids = await _ensure_tags(db, names) if names else {}
+    new_ids = set(tag_ids.values())
+
+    removed = old_ids - new_ids
+    if removed:
+        await db.execute(queries.delete_prompt_tags(prompt.id, removed))
+        await db.execute(queries.adjust_tag_counts(removed, -1))
+    added = new_ids - old_ids
+    if added:
+        db.add_all([
+            PromptTag(prompt_id=prompt.id, tag_id=tag_ids[name], created_at=prompt.created_at)
+            for name in names if tag_ids[name] in added
+        ])
+        await db.execute(queries.adjust_tag_counts(added, 1))
+    return bool(removed or added)
+
+
+async def clear_prompt_tags(db: AsyncSession, prompt_id: int) -> bool:
+    """提示词删除时调用，随调用方的事务一起提交；返回是否删除了标签"""
+    result = await db.execute(queries.prompt_tag_ids(prompt_id))
+    tag_ids = result.scalars().all()
+    if tag_ids:
+        await db.execute(queries.delete_prompt_tags(prompt_id, tag_ids))
+        await db.execute(queries.adjust_tag_counts(tag_ids, -1))
+    return bool(tag_ids)
+
+
+async def load_tags(db: AsyncSession, prompt_ids: Iterable[int]) -> Dict[int, List[str]]:
+    prompt_ids = list(prompt_ids)
+    tags: Dict[int, List[str]] = {prompt_id: [] for prompt_id in prompt_ids}
+    if not prompt_ids:
+        return tags
+    result = await db.execute(queries.prompt_tag_names(prompt_ids))
+    for prompt_id, name in result.all():
+        tags[prompt_id].append(name)
+    return tags
+
+
+async def resolve_filter(db: AsyncSession, names: List[str]) -> Optional[List[Tag]]:
+    """
+    查出筛选用的标签并按使用数升序排列（最少用的标签驱动查询）；
+    任一标签不存在或没有提示词时返回 None，表示结果必然为空
+    """
+    result = await db.execute(queries.tags_by_names(names))
+    found = result.scalars().all()
+    if len(found) < len(names) or any(tag.prompt_count <= 0 for tag in found):
+        return None
+    return sorted(found, key=lambda tag: (tag.prompt_count, tag.id))
@@ -0,0 +1,144 @@
+"""
+浏览记录按月分区（PostgreSQL）
+
+prompt_views 按 created_at 做 RANGE 分区，每个自然月（UTC）一个分区，命名为 prompt_views_yYYYYmMM。
+超过 VIEW_RETENTION_MONTHS 的分区先汇总成 prompt_view_stats 中的按月聚合，再整体 DETACH + DROP，
+删除旧数据不产生死元组，索引大小和 VACUUM 开销只与保留窗口内的数据量有关。
+分区需要提前创建：maintain_views.py（建议每天执行）会补齐当前及未来 VIEW_PARTITIONS_AHEAD 个月的分区，
+基线迁移与 API 启动后的后台任务也会补齐一次。
+另有默认分区 prompt_views_default 兜底：维护脚本长时间未执行时浏览记录写入默认分区而不是插入失败，
+下次补齐分区时按月份建好分区并把这些记录移过去（过期月份随后照常汇总删除）。
+"""
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+from sqlalchemy import text
+from app.config import settings
+
+PARENT = "prompt_views"
+DEFAULT_PARTITION = f"{PARENT}_default"
+
+_NAME = re.compile(r"^prompt_views_y(\d{4})m(\d{2})$")
+
+
+def month_start(value: Optional[datetime] = None) -> date:
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def retention_start(now: Optional[datetime] = None) -> datetime:
+    """早于该时间的原始浏览记录会被汇总后删除"""
+    start = add_months(month_start(now), -settings.VIEW_RETENTION_MONTHS)
+    return datetime(start.year, start.month, 1, tzinfo=timezone.utc)
+
+
+async def is_partitioned(conn) -> bool:
+    result = await conn.execute(text(
+        "SELECT c.relkind FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE c.relname = :name AND n.nspname = current_schema()"
+    ), {"name": PARENT})
+    return result.scalar() == "p"
+
+
+async def list_partitions(conn) -> List[date]:
+    result = await conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:parent AS regclass)"
+    ), {"parent": PARENT})
+    months = []
+    for (name,) in result:
+        match = _NAME.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+
+async def create_default_partition(conn):
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+async def default_partition_months(conn) -> List[date]:
+    """默认分区中的记录所属的月份（正常情况下默认分区为空；尚未创建默认分区时返回空列表）"""
+    exists = await conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    if not exists.scalar():
+        return []
+    result = await conn.execute(text(
+        f"SELECT DISTINCT CAST(date_trunc('month', created_at AT TIME ZONE 'UTC') AS date) FROM {DEFAULT_PARTITION}"
+    ))
+    return sorted(result.scalars().all())
+
+
+async def create_partition(conn, month: date):
+    upper = add_months(month, 1)
+    bounds = {
+        "lower": datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        "upper": datetime(upper.year, upper.month, 1, tzinfo=timezone.utc),
+    }
+    create = text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+    )
+    await create_default_partition(conn)
+    in_default = await conn.execute(text(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper)"
+    ), bounds)
+    if not in_default.scalar():
+        await conn.execute(create)
+        return
+    # 默认分区中已有该月的记录时不能直接建分区，先移出、建好分区再写回
+    await conn.execute(text(f"CREATE TEMP TABLE {PARENT}_moving (LIKE {PARENT})"))
+    await conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= :lower AND created_at < :upper "
+        f"RETURNING *) INSERT INTO {PARENT}_moving SELECT * FROM moved"
+    ), bounds)
+    await conn.execute(create)
+    await conn.execute(text(f"INSERT INTO {PARENT} SELECT * FROM {PARENT}_moving"))
+    await conn.execute(text(f"DROP TABLE {PARENT}_moving"))
+
+
+async def ensure_partitions(conn, ahead: Optional[int] = None, behind: int = 0) -> List[date]:
+    """
+    创建默认分区，以及从 behind 个月前到未来 ahead 个月的分区，返回新建的月份；
+    默认分区中已有记录的月份也会建好分区并把记录移过去
+    """
+    if conn.dialect.name != "postgresql" or not await is_partitioned(conn):
+        return []
+    ahead = settings.VIEW_PARTITIONS_AHEAD if ahead is None else ahead
+    await create_default_partition(conn)
+    current = month_start()
+    months = {add_months(current, offset) for offset in range(-behind, ahead + 1)}
+    months.update(await default_partition_months(conn))
+    created = sorted(months - set(await list_partitions(conn)))
+    for month in created:
+        await create_partition(conn, month)
+    return created
+
+
+async def compact_partition(conn, month: date):
+    """把一个分区汇总进 prompt_view_stats 后删除；按整个分区重新计算，重复执行结果不变"""
+    name = partition_name(month)
+    await conn.execute(text(
+        f"INSERT INTO prompt_view_stats (prompt_id, month, view_count, user_count) "
+        f"SELECT prompt_id, CAST(:month AS date), count(*), count(DISTINCT user_id) FROM {name} "
+        f"GROUP BY prompt_id "
+        f"ON CONFLICT (prompt_id, month) DO UPDATE "
+        f"SET view_count = excluded.view_count, user_count = excluded.user_count"
+    ), {"month": month})
+    await conn.execute(text(f"ALTER TABLE {PARENT} DETACH PARTITION {name}"))
+    await conn.execute(text(f"DROP TABLE {name}"))
+
+
+async def expired_partitions(conn) -> List[date]:
+    cutoff = month_start(retention_start())
+    return [month for month in await list_partitions(conn) if month < cutoff]
@@ -0,0 +1,232 @@
+"""
+事件消费 worker
+
+    python -m app.worker            # 运行所有消费组
+    python -m app.worker views      # 只运行指定的消费组（可多个）
+    python -m app.worker --stats    # 打印积压情况后退出
+
+每个消费组独立记录消费进度，同一消费组可以启动多个 worker 进程分摊负载。
+一批事件处理成功后才 XACK；处理失败的事件留在 pending 列表中，
+空闲超过 EVENT_CLAIM_IDLE_MS 后由任意 worker 通过 XAUTOCLAIM 接管重试，
+投递次数超过 EVENT_MAX_DELIVERIES 的事件转入死信流 events:prompts:dead。
+"""
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from redis.exceptions import ResponseError
+from app.config import settings
+from app.redis_client import get_redis, IN_PROCESS
+from app.events import STREAM, DEAD_LETTER_STREAM
+from app.event_handlers import HANDLERS
+from app import logs, suggest
+
+logger = logging.getLogger(__name__)
+
+# 打印积压指标与裁剪已消费事件的间隔
+METRICS_INTERVAL = 30
+
+
+def _id_key(entry_id: str):
+    ms, _, seq = entry_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def ensure_group(redis, group: str):
+    try:
+        # 从头开始消费，新增的消费组会处理流中尚未裁剪的历史事件
+        await redis.xgroup_create(STREAM, group, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+class Consumer:
+    def __init__(self, group: str, handler: Callable[[List[dict]], Awaitable[None]], name: Optional[str] = None):
+        self.group = group
+        self.handler = handler
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.processed = 0
+        self.failed = 0
+
+    async def _process(self, redis, entries) -> bool:
+        entries = [(entry_id, fields) for entry_id, fields in entries if fields is not None]
+        if not entries:
+            return True
+        try:
+            await self.handler([fields for _, fields in entries])
+        except Exception:
+            self.failed += len(entries)
+            logger.exception("[%s] 处理 %d 条事件失败，等待重试", self.group, len(entries))
+            return False
+        await redis.xack(STREAM, self.group, *[entry_id for entry_id, _ in entries])
+        self.processed += len(entries)
+        return True
+
+    async def _dead_letter(self, redis):
+        """投递次数过多的事件转入死信流，避免反复失败阻塞消费"""
+        pending = await redis.xpending_range(
+            STREAM, self.group, min="-", max="+", count=settings.EVENT_BATCH_SIZE,
+            idle=settings.EVENT_CLAIM_IDLE_MS
+        )
+        poisoned = [item["message_id"] for item in pending
+                    if item["times_delivered"] >= settings.EVENT_MAX_DELIVERIES]
+        for entry_id in poisoned:
+            entries = await redis.xrange(STREAM, entry_id, entry_id)
+            if entries:
+                await redis.xadd(DEAD_LETTER_STREAM, {**entries[0][1], "group": self.group, "id": entry_id})
+            await redis.xack(STREAM, self.group, entry_id)
+            logger.error("[%s] 事件 %s 多次处理失败，已转入死信流", self.group, entry_id)
+
+    async def _reclaim(self, redis):
+        """接管空闲过久的 pending 事件（消费者崩溃或处理失败）"""
+        await self._dead_letter(redis)
+        start = "0-0"
+        while True:
+            result = await redis.xautoclaim(
+                STREAM, self.group, self.name, min_idle_time=settings.EVENT_CLAIM_IDLE_MS,
+                start_id=start, count=settings.EVENT_BATCH_SIZE
+            )
+            start, entries = result[0], result[1]
+            if entries:
+                await self._process(redis, entries)
+            if start in ("0-0", b"0-0"):
+                break
+
+    async def run(self, stop: asyncio.Event):
+        redis = await get_redis()
+        await ensure_group(redis, self.group)
+        # 重启后先处理自己名下尚未确认的事件
+        last_id = "0"
+        while True:
+            backlog = await redis.xreadgroup(
+                self.group, self.name, {STREAM: last_id}, count=settings.EVENT_BATCH_SIZE
+            )
+            entries = backlog[0][1] if backlog else []
+            if not entries:
+                break
+            await self._process(redis, entries)
+            last_id = entries[-1][0]
+        last_claim = time.monotonic()
+        while not stop.is_set():
+            try:
+                result = await redis.xreadgroup(
+                    self.group, self.name, {STREAM: ">"},
+                    count=settings.EVENT_BATCH_SIZE, block=settings.EVENT_BLOCK_MS
+                )
+                for _, entries in result:
+                    await self._process(redis, entries)
+                if time.monotonic() - last_claim > settings.EVENT_CLAIM_IDLE_MS / 1000:
+                    await self._reclaim(redis)
+                    last_claim = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("[%s] 读取事件失败: %r", self.group, e)
+                await asyncio.sleep(1)
+
+
+async def stream_metrics(redis) -> Dict:
+    """积压指标：流长度，以及每个消费组的 pending 数、未读数（lag）和最老 pending 事件的等待时间"""
+    metrics = {
+        "length": await redis.xlen(STREAM),
+        "dead_letters": await redis.xlen(DEAD_LETTER_STREAM),
+        "groups": {},
+    }
+    try:
+        groups = await redis.xinfo_groups(STREAM)
+    except ResponseError:
+        return metrics
+    now_ms = int(time.time() * 1000)
+    for group in groups:
+        summary = await redis.xpending(STREAM, group["name"])
+        oldest = summary.get("min")
+        metrics["groups"][group["name"]] = {
+            "pending": group["pending"],
+            # lag 需要 Redis 7.0+，旧版本为 None
+            "lag": group.get("lag"),
+            "last_delivered_id": group["last-delivered-id"],
+            "oldest_pending_seconds": (now_ms - _id_key(oldest)[0]) / 1000 if oldest else 0,
+        }
+    return metrics
+
+
+async def trim_processed(redis):
+    """裁剪所有消费组都已确认的事件，流的长度只取决于积压量"""
+    try:
+        groups = await redis.xinfo_groups(STREAM)
+    except ResponseError:
+        return
+    if {group["name"] for group in groups} < set(HANDLERS):
+        return
+    boundaries = []
+    for group in groups:
+        summary = await redis.xpending(STREAM, group["name"])
+        boundaries.append(summary["min"] if summary.get("min") else group["last-delivered-id"])
+    if boundaries:
+        # 保留最慢消费组尚未确认（或尚未读取）的事件
+        min_id = min(boundaries, key=_id_key)
+        await redis.xtrim(STREAM, minid=min_id, approximate=True)
+
+
+async def report(stop: asyncio.Event, consumers: List[Consumer]):
+    redis = await get_redis()
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=METRICS_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+        try:
+            await trim_processed(redis)
+            metrics = await stream_metrics(redis)
+        except Exception as e:
+            logger.warning("读取积压指标失败: %r", e)
+            continue
+        processed = ", ".join(f"{c.group}={c.processed}/{c.failed}" for c in consumers)
+        groups = ", ".join(
+            f"{name}(pending={g['pending']}, lag={g['lag']})" for name, g in metrics["groups"].items()
+        )
+        logger.info("流长度 %s，%s；已处理/失败 %s", metrics["length"], groups, processed)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="事件消费 worker")
+    parser.add_argument("groups", nargs="*", help=f"要运行的消费组，默认全部：{', '.join(HANDLERS)}")
+    parser.add_argument("--stats", action="store_true", help="打印积压指标后退出")
+    args = parser.parse_args()
+
+    if IN_PROCESS:
+        parser.error("REDIS_URL=memory:// 时事件在 API 进程内同步处理，不需要也无法运行 worker")
+    if args.stats:
+        print(await stream_metrics(await get_redis()))
+        return
+
+    groups = args.groups or list(HANDLERS)
+    unknown = set(groups) - set(HANDLERS)
+    if unknown:
+        parser.error(f"未知的消费组: {', '.join(sorted(unknown))}")
+    logs.setup_logging()
+    if not settings.EVENT_PIPELINE_ENABLED:
+        logger.warning("EVENT_PIPELINE_ENABLED 未开启，API 不会写入事件流")
+
+    stop = asyncio.Event()
+    consumers = [Consumer(group, HANDLERS[group]) for group in groups]
+    logger.info("启动事件 worker：%s", ", ".join(groups))
+    tasks = [asyncio.create_task(consumer.run(stop)) for consumer in consumers]
+    tasks.append(asyncio.create_task(report(stop, consumers)))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        stop.set()
+        for task in tasks:
+            task.cancel()
+        await suggest.flush_popularity(await get_redis())
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
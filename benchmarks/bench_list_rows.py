@@ -0,0 +1,152 @@
+"""
+列表读取路径基准
+对比每页 100 条的列表在两种读取方式下的 CPU 时间与内存分配峰值（含查询、标签加载和组装响应）：
+  - ORM：select(Prompt) 加载实体（身份映射、属性埋点），再逐条构造 PromptResponse 并 model_dump
+  - 行元组：queries.feed_page 只选出 LIST_COLUMNS，Row 直接组装成响应 dict（app/prompt_rows.py）
+数据灌入临时 SQLite 文件，不需要 PostgreSQL / Redis：
+    python -m benchmarks.bench_list_rows
+"""
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+PROMPTS = 2000
+PAGE_SIZE = 100
+PAGES = 200
+MEMORY_PAGES = 20
+
+
+async def seed(rng: random.Random):
+    from sqlalchemy import insert
+    from app.database import async_session_maker
+    from app.models import User, Prompt, Tag, PromptTag
+
+    now = datetime.now(timezone.utc)
+    prompts = [{
+        "id": i + 1,
+        "user_id": 1,
+        "title": f"提示词 {i}",
+        "content_text": "请一步一步思考，并用中文回答。" * rng.randint(20, 120),
+        "state": 1,
+        "view_count": rng.randint(0, 1000),
+        "like_count": rng.randint(0, 100),
+        "favorite_count": rng.randint(0, 50),
+        "created_at": now - timedelta(minutes=PROMPTS - i),
+    } for i in range(PROMPTS)]
+    async with async_session_maker() as db:
+        await db.execute(insert(User), [{"id": 1, "username": "bench", "hashed_password": "!"}])
+        await db.execute(insert(Prompt), prompts)
+        await db.execute(insert(Tag), [{"id": i, "name": f"tag{i}", "prompt_count": 0} for i in range(1, 11)])
+        await db.execute(insert(PromptTag), [
+            {"prompt_id": p["id"], "tag_id": tag_id, "created_at": p["created_at"]}
+            for p in prompts for tag_id in rng.sample(range(1, 11), 2)
+        ])
+        await db.commit()
+
+
+async def orm_page(offset: int):
+    from sqlalchemy import select
+    from app.database import async_session_maker
+    from app.models import Prompt
+    from app.schemas import PromptResponse, PromptListResponse
+    from app import tags as prompt_tags
+
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(Prompt).where(Prompt.state == 1)
+            .order_by(Prompt.created_at.desc(), Prompt.id.desc()).limit(PAGE_SIZE).offset(offset)
+        )
+        prompts = result.scalars().all()
+        tag_map = await prompt_tags.load_tags(db, [p.id for p in prompts])
+        prompt_list = [
+            PromptResponse(
+                id=p.id,
+                user_id=p.user_id,
+                title=p.title,
+                content=p.content,
+                state=p.state,
+                view_count=p.view_count,
+                like_count=p.like_count,
+                favorite_count=p.favorite_count,
+                created_at=p.created_at,
+                updated_at=p.updated_at,
+                tags=tag_map[p.id]
+            ) for p in prompts
+        ]
+        response = PromptListResponse(list=prompt_list, total=PROMPTS, page=1, page_size=PAGE_SIZE)
+        return response.model_dump(by_alias=True)
+
+
+async def row_page(offset: int):
+    from app.database import async_session_maker
+    from app import queries, prompt_rows
+    from app import tags as prompt_tags
+
+    async with async_session_maker() as db:
+        result = await db.execute(queries.feed_page(offset, PAGE_SIZE))
+        rows = result.all()
+        tag_map = await prompt_tags.load_tags(db, [row.id for row in rows])
+        items = [prompt_rows.response_item(row, tag_map[row.id]) for row in rows]
+        return prompt_rows.list_response(items, PROMPTS, 1, PAGE_SIZE)
+
+
+async def measure(load_page, rng: random.Random) -> dict:
+    offsets = [rng.randrange(0, PROMPTS - PAGE_SIZE) for _ in range(PAGES)]
+    for offset in offsets[:10]:
+        await load_page(offset)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for offset in offsets:
+        await load_page(offset)
+    cpu_ms = (time.process_time() - cpu_start) * 1000 / PAGES
+    wall_ms = (time.perf_counter() - wall_start) * 1000 / PAGES
+
+    peaks = []
+    tracemalloc.start()
+    for offset in offsets[:MEMORY_PAGES]:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        await load_page(offset)
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+    return {"cpu_ms": cpu_ms, "wall_ms": wall_ms, "peak_kb": statistics.median(peaks) / 1024}
+
+
+async def run():
+    from fastapi.encoders import jsonable_encoder
+    from app.database import engine
+    from app.models import Base
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    rng = random.Random(42)
+    await seed(rng)
+
+    # 两种方式的输出必须完全一致
+    assert jsonable_encoder(await orm_page(300)) == jsonable_encoder(await row_page(300))
+
+    before = await measure(orm_page, random.Random(1))
+    after = await measure(row_page, random.Random(1))
+    await engine.dispose()
+
+    print(f"{PROMPTS} 条提示词，每页 {PAGE_SIZE} 条，CPU 时间取 {PAGES} 页平均，内存峰值取 {MEMORY_PAGES} 页中位数")
+    print(f"{'':<10}{'CPU ms/页':>12}{'耗时 ms/页':>12}{'内存峰值 KB/页':>16}")
+    for label, report in (("ORM", before), ("行元组", after)):
+        print(f"{label:<10}{report['cpu_ms']:>12.2f}{report['wall_ms']:>12.2f}{report['peak_kb']:>16.0f}")
+    print(f"CPU 时间减少 {1 - after['cpu_ms'] / before['cpu_ms']:.0%}，"
+          f"内存峰值减少 {1 - after['peak_kb'] / before['peak_kb']:.0%}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        os.environ["REDIS_URL"] = "memory://"
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
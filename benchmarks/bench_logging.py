@@ -0,0 +1,109 @@
+"""
+日志开销基准
+同一数据集（SQLite + 进程内 Redis）在三种日志配置下通过 ASGI 直接调用 API，对比吞吐量：
+  - echo：旧版配置，引擎 echo=True，每条 SQL 在事件循环中同步格式化并写出
+  - 默认：SQL 日志关闭，只有访问日志，经队列由后台线程格式化输出
+  - LOG_SQL：所有请求的 SQL 都经队列由后台线程输出
+日志写入临时文件（真实的磁盘 I/O）：
+    python -m benchmarks.bench_logging
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+MODES = {
+    "echo": ("echo=True（旧版）", {"LOG_ACCESS_SAMPLE_RATE": "0"}),
+    "off": ("默认（访问日志）", {}),
+    "sql": ("LOG_SQL=true", {"LOG_SQL": "true"}),
+}
+
+
+async def run_mode(mode: str, requests: int, concurrency: int) -> dict:
+    import logging
+    import httpx
+    from app.main import app
+    from app.database import engine
+    from app import logs
+    from benchmarks.bench_backends import seed, measure, WORDS
+
+    # httpx 客户端自身的请求日志不属于被测服务
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    await app.router.startup()
+    rng = random.Random(42)
+    prompt_ids = await seed(rng)
+    if mode == "echo":
+        engine.echo = True
+
+    scenarios = [
+        ("首页第一页", lambda c, i: c.get("/prompts?page=1&pageSize=20")),
+        ("深分页", lambda c, i: c.get(f"/prompts?page={rng.randint(2, 100)}&pageSize=20")),
+        ("关键词搜索", lambda c, i: c.get(f"/prompts?keyword={rng.choice(WORDS)}&pageSize=20")),
+        ("详情（记录浏览）", lambda c, i: c.get(f"/prompts/{rng.choice(prompt_ids)}")),
+    ]
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, make_request in scenarios:
+            await measure(client, name, make_request, concurrency, concurrency)
+            results.append(await measure(client, name, make_request, requests, concurrency))
+    dropped = logs.stats()["dropped"]
+    await app.router.shutdown()
+    await engine.dispose()
+    return {"results": results, "dropped": dropped}
+
+
+def spawn(directory: str, mode: str, requests: int, concurrency: int) -> dict:
+    label, overrides = MODES[mode]
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(directory, f'{mode}.db')}",
+        "REDIS_URL": "memory://",
+        **overrides,
+    }
+    output = os.path.join(directory, f"{mode}.json")
+    command = [sys.executable, "-m", "benchmarks.bench_logging", "--child", mode, "--output", output,
+               "--requests", str(requests), "--concurrency", str(concurrency)]
+    print(f"运行 {label} ...", flush=True)
+    log_path = os.path.join(directory, f"{mode}.log")
+    with open(log_path, "w") as log_file:
+        completed = subprocess.run(command, env=env, stdout=log_file, stderr=subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise SystemExit(f"{label} 运行失败：\n{completed.stderr[-3000:]}")
+    with open(output) as f:
+        report = json.load(f)
+    report["log_mb"] = os.path.getsize(log_path) / 1024 / 1024
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志开销基准")
+    parser.add_argument("--requests", type=int, default=500, help="每类请求的次数")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发请求数")
+    parser.add_argument("--child", choices=list(MODES), help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        report = asyncio.run(run_mode(args.child, args.requests, args.concurrency))
+        with open(args.output, "w") as f:
+            json.dump(report, f)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        reports = {mode: spawn(directory, mode, args.requests, args.concurrency) for mode in MODES}
+
+    print(f"\n每类 {args.requests} 次请求，并发 {args.concurrency}（req/s）")
+    print(f"{'请求':<14}" + "".join(f"{MODES[mode][0]:>18}" for mode in MODES))
+    for i, row in enumerate(reports["off"]["results"]):
+        print(f"{row['name']:<14}" + "".join(f"{reports[mode]['results'][i]['rps']:>18.0f}" for mode in MODES))
+    print(f"{'日志大小 MB':<14}" + "".join(f"{reports[mode]['log_mb']:>18.1f}" for mode in MODES))
+    print(f"{'丢弃条数':<14}" + "".join(f"{reports[mode]['dropped']:>18}" for mode in MODES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+修订历史存储与还原基准
+模拟对一条约 30000 字符的提示词连续编辑，统计每个修订的存储大小、生成增量耗时和还原耗时
+    python -m benchmarks.bench_revisions
+"""
+import random
+import statistics
+import time
+from app import revisions
+
+EDITS = 200
+SENTENCES = [
+    "你是一名资深的产品经理，请根据用户需求输出完整的需求文档。",
+    "Please answer in a concise and professional tone.",
+    "输出格式必须为 Markdown，并包含标题、背景、目标和验收标准。",
+    "如果信息不足，请先列出需要澄清的问题，不要编造事实。",
+    "Think step by step and explain the reasoning behind each decision.",
+    "每个小节控制在三百字以内，使用项目符号列出关键点。",
+]
+
+
+def make_content(rng: random.Random, length: int = 30000) -> str:
+    parts = []
+    size = 0
+    while size < length:
+        sentence = rng.choice(SENTENCES) + f"（{rng.randint(0, 99999)}）\n"
+        parts.append(sentence)
+        size += len(sentence)
+    return "".join(parts)[:length]
+
+
+def edit(rng: random.Random, content: str) -> str:
+    for _ in range(rng.randint(1, 3)):
+        pos = rng.randint(0, len(content))
+        kind = rng.random()
+        if kind < 0.4:
+            content = content[:pos] + rng.choice(SENTENCES) + content[pos:]
+        elif kind < 0.7:
+            content = content[:pos] + content[pos + rng.randint(1, 200):]
+        else:
+            content = content[:pos] + "修改" + content[pos + rng.randint(1, 20):]
+    return content[:30000]
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    rng = random.Random(42)
+    versions = [make_content(rng)]
+    for _ in range(EDITS):
+        versions.append(edit(rng, versions[-1]))
+
+    rows = []
+    delta_ms = []
+    for i, content in enumerate(versions):
+        previous = versions[i - 1] if i else None
+        start = time.perf_counter()
+        rows.append(revisions.build_revision(1, 1, i + 1, "bench", content, previous))
+        delta_ms.append((time.perf_counter() - start) * 1000)
+
+    full_bytes = [len(c.encode()) for c in versions]
+    stored_bytes = [len(r.data.encode()) for r in rows]
+    delta_bytes = [size for size, r in zip(stored_bytes, rows) if not r.is_snapshot]
+
+    restore_ms = []
+    for version in range(1, len(rows) + 1):
+        start_version = version - (version - 1) % revisions.SNAPSHOT_INTERVAL
+        chain = rows[start_version - 1:version]
+        start = time.perf_counter()
+        content = chain[0].data
+        for row in chain[1:]:
+            content = revisions.apply_delta(content, revisions.decode_delta(row.data))
+        restore_ms.append((time.perf_counter() - start) * 1000)
+        assert content == versions[version - 1]
+
+    print(f"版本数: {len(rows)}，快照间隔: {revisions.SNAPSHOT_INTERVAL}")
+    print(f"全文平均大小: {statistics.mean(full_bytes):.0f} B")
+    print(f"增量平均大小: {statistics.mean(delta_bytes):.0f} B（p99 {percentile(delta_bytes, 0.99)} B）")
+    print(f"含快照的平均每版本存储: {statistics.mean(stored_bytes):.0f} B，"
+          f"为全文存储的 {sum(stored_bytes) / sum(full_bytes):.1%}")
+    print(f"生成修订耗时: p50 {percentile(delta_ms, 0.5):.2f} ms，p99 {percentile(delta_ms, 0.99):.2f} ms")
+    print(f"还原任意版本耗时（不含查询）: p50 {percentile(restore_ms, 0.5):.2f} ms，"
+          f"p99 {percentile(restore_ms, 0.99):.2f} ms，最大 {max(restore_ms):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
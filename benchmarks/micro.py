@@ -0,0 +1,234 @@
+"""
+热点路径微基准
+每个请求都会经过的小段代码单独计时：JWT 编解码、to_camel 别名生成与 model_dump(by_alias=True)、
+约 30000 字符正文的 PromptResponse 构造、列表响应的 JSON 编码，以及路由中查询语句的构造与编译。
+全部离线运行，不需要 PostgreSQL / Redis（SQL 只编译为 PostgreSQL 方言，不执行）。
+
+    python -m benchmarks.micro run [--filter sql.] [--save]   # 运行；--save 写入基线
+    python -m benchmarks.micro compare [--threshold 0.25]      # 与基线对比，变慢超过阈值时返回非零
+    python -m benchmarks.micro list
+
+基线保存在 benchmarks/baselines/micro.json，记录的是生成基线的机器上的结果，
+换机器或升级依赖后应先在同一台机器上重新 --save。
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from datetime import datetime, timezone
+from typing import Callable, Dict
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+REPEATS = 7
+MIN_REPEAT_SECONDS = 0.1
+CONTENT_LENGTH = 30000
+
+# 名称 -> 返回被测函数的 setup 函数（setup 本身不计时）
+CASES: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+
+def case(name: str):
+    def register(setup):
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _prompt_fields(content_length: int = 200) -> dict:
+    from benchmarks.bench_revisions import make_content
+    import random
+    now = datetime.now(timezone.utc)
+    return {
+        "id": 12345,
+        "user_id": 42,
+        "title": "代码评审助手",
+        "content": make_content(random.Random(42), content_length),
+        "state": 1,
+        "view_count": 1024,
+        "like_count": 64,
+        "favorite_count": 16,
+        "created_at": now,
+        "updated_at": now,
+        "tags": ["代码", "review", "python"],
+    }
+
+
+@case("auth.jwt_decode")
+def jwt_decode():
+    from app.auth import create_access_token, decode_token
+    token = create_access_token({"sub": 42})
+    return lambda: decode_token(token)
+
+
+@case("auth.jwt_encode")
+def jwt_encode():
+    from app.auth import create_access_token
+    return lambda: create_access_token({"sub": 42})
+
+
+@case("schemas.to_camel")
+def to_camel():
+    from app.schemas import to_camel, PromptResponse
+    names = list(PromptResponse.model_fields)
+
+    def run():
+        for name in names:
+            to_camel(name)
+    return run
+
+
+@case("schemas.model_dump_by_alias")
+def model_dump_by_alias():
+    from app.schemas import PromptResponse
+    response = PromptResponse(**_prompt_fields())
+    return lambda: response.model_dump(by_alias=True)
+
+
+@case("schemas.prompt_response_30k")
+def prompt_response_30k():
+    from app.schemas import PromptResponse
+    fields = _prompt_fields(CONTENT_LENGTH)
+    return lambda: PromptResponse(**fields).model_dump(by_alias=True)
+
+
+@case("rows.response_item_30k")
+def response_item_30k():
+    from types import SimpleNamespace
+    from app import prompt_rows
+    fields = _prompt_fields(CONTENT_LENGTH)
+    row = SimpleNamespace(**fields, content_text=fields["content"], content_z=None)
+    return lambda: prompt_rows.response_item(row, fields["tags"])
+
+
+@case("response.list_page_encode")
+def list_page_encode():
+    from fastapi.encoders import jsonable_encoder
+    from app.schemas import ResponseModel
+    from app import prompt_rows
+    item = {**_prompt_fields(), "isLiked": False, "isFavorited": False}
+    items = [{**item, "id": i} for i in range(20)]
+    return lambda: jsonable_encoder(ResponseModel(data=prompt_rows.list_response(items, 1000, 1, 20)))
+
+
+def _sql_queries() -> Dict[str, Callable[[], object]]:
+    from app import queries
+    return {
+        "feed_page": lambda: queries.feed_page(40, 20),
+        "feed_page_keyword": lambda: queries.feed_page(0, 20, "代码"),
+        "tag_feed_page": lambda: queries.tag_feed_page([1, 2], 0, 20),
+        "active_prompt": lambda: queries.active_prompt(12345),
+        "liked_prompt_ids": lambda: queries.liked_prompt_ids(42, range(20)),
+    }
+
+
+def _register_sql_cases():
+    for query_name in ("feed_page", "feed_page_keyword", "tag_feed_page", "active_prompt", "liked_prompt_ids"):
+        def build_setup(query_name=query_name):
+            # 每次请求实际执行的部分：构造语句并生成缓存键（命中编译缓存时不再编译）
+            build = _sql_queries()[query_name]
+            return lambda: build()._generate_cache_key()
+
+        def compile_setup(query_name=query_name):
+            # 编译缓存未命中时的代价（新 worker、缓存被挤出）
+            from sqlalchemy.dialects import postgresql
+            build = _sql_queries()[query_name]
+            dialect = postgresql.dialect()
+            return lambda: build().compile(dialect=dialect)
+
+        CASES[f"sql.build.{query_name}"] = build_setup
+        CASES[f"sql.compile.{query_name}"] = compile_setup
+
+
+_register_sql_cases()
+
+
+def measure(setup) -> dict:
+    fn = setup()
+    timer = timeit.Timer(fn)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * MIN_REPEAT_SECONDS / max(elapsed, 1e-9)))
+    per_op = [t / number * 1e6 for t in timer.repeat(repeat=REPEATS, number=number)]
+    # 最小值受干扰最少，作为对比依据；中位数仅供参考
+    return {"us": min(per_op), "median_us": statistics.median(per_op)}
+
+
+def run_cases(name_filter: str = "") -> Dict[str, dict]:
+    results = {}
+    for name, setup in CASES.items():
+        if name_filter and name_filter not in name:
+            continue
+        results[name] = measure(setup)
+        print(f"  {name:<36}{results[name]['us']:>12.2f} µs{results[name]['median_us']:>12.2f} µs（中位数）", flush=True)
+    return results
+
+
+def load_baseline() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        raise SystemExit(f"基线不存在，请先运行 python -m benchmarks.micro run --save（{BASELINE_PATH}）")
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline(results: Dict[str, dict]):
+    baseline = {"results": {}}
+    if os.path.exists(BASELINE_PATH):
+        baseline = load_baseline()
+    baseline["python"] = platform.python_version()
+    baseline["machine"] = f"{platform.system()} {platform.machine()}"
+    baseline["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    # 只覆盖本次运行的用例，--filter 时其余基线保持不变
+    baseline["results"].update({name: round(report["us"], 4) for name, report in results.items()})
+    os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(baseline, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+    print(f"已写入基线 {BASELINE_PATH}")
+
+
+def compare(results: Dict[str, dict], baseline: dict, threshold: float) -> int:
+    print(f"\n与基线对比（Python {baseline.get('python')}，{baseline.get('machine')}，阈值 +{threshold:.0%}）")
+    regressions = 0
+    for name, report in results.items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:<36}{'无基线':>12}")
+            continue
+        ratio = report["us"] / base
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ← 变慢"
+            regressions += 1
+        elif ratio < 1 - threshold:
+            flag = "  ← 变快，可更新基线"
+        print(f"  {name:<36}{base:>10.2f} → {report['us']:>10.2f} µs{ratio:>8.2f}x{flag}")
+    if regressions:
+        print(f"\n{regressions} 项变慢超过 {threshold:.0%}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="热点路径微基准")
+    parser.add_argument("command", choices=["run", "compare", "list"])
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--save", action="store_true", help="run 时把结果写入基线")
+    parser.add_argument("--threshold", type=float, default=0.25, help="compare 时判定变慢的比例")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print("\n".join(CASES))
+        return
+    baseline = load_baseline() if args.command == "compare" else None
+    print(f"Python {platform.python_version()}，每个用例 {REPEATS} 轮，取每次调用耗时的最小值")
+    results = run_cases(args.filter)
+    if args.command == "run":
+        if args.save:
+            save_baseline(results)
+        return
+    sys.exit(compare(results, baseline, args.threshold))
+
+
+if __name__ == "__main__":
+    main()
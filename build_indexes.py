@@ -0,0 +1,83 @@
+"""
+索引构建脚本
+为已有的提示词离线批量构建 Redis 中的相似度索引与标题联想索引，并按 author_stats 重建作者排行榜
+"""
+import asyncio
+from sqlalchemy import select, and_
+from app.database import engine, async_session_maker
+from app.models import Prompt
+from app.redis_client import get_redis
+from app import similarity, suggest, authors
+from app.compression import load_content
+
+BATCH_SIZE = 500
+
+async def clear_keys(redis, pattern: str):
+    keys = [key async for key in redis.scan_iter(match=pattern, count=1000)]
+    for i in range(0, len(keys), 1000):
+        await redis.delete(*keys[i:i + 1000])
+
+async def build_similarity_index(redis):
+    print("正在构建相似度索引...")
+    await clear_keys(redis, "simhash:*")
+    last_id = 0
+    total = 0
+    async with async_session_maker() as session:
+        while True:
+            result = await session.execute(
+                select(Prompt.id, Prompt.content_text, Prompt.content_z)
+                .where(and_(Prompt.state == 1, Prompt.id > last_id))
+                .order_by(Prompt.id)
+                .limit(BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await similarity.index_batch(redis, [
+                (row.id, load_content(row.content_text, row.content_z)) for row in rows
+            ])
+            last_id = rows[-1][0]
+            total += len(rows)
+            print(f"  已处理 {total} 条")
+    print(f"✅ 相似度索引构建完成，共 {total} 条")
+
+async def build_suggest_index(redis):
+    print("正在构建标题联想索引...")
+    await clear_keys(redis, "suggest:*")
+    last_id = 0
+    total = 0
+    async with async_session_maker() as session:
+        while True:
+            result = await session.execute(
+                select(Prompt.id, Prompt.title, Prompt.view_count, Prompt.like_count, Prompt.favorite_count)
+                .where(and_(Prompt.state == 1, Prompt.id > last_id))
+                .order_by(Prompt.id)
+                .limit(BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            await suggest.index_batch(redis, [
+                (row.id, row.title, suggest.popularity_score(row.view_count, row.like_count, row.favorite_count))
+                for row in rows
+            ])
+            last_id = rows[-1][0]
+            total += len(rows)
+            print(f"  已处理 {total} 条")
+    print(f"✅ 标题联想索引构建完成，共 {total} 条")
+
+async def build_leaderboard():
+    print("正在重建作者排行榜...")
+    async with async_session_maker() as session:
+        total = await authors.rebuild_leaderboard(session)
+    print(f"✅ 作者排行榜重建完成，共 {total} 位作者")
+
+async def main():
+    redis = await get_redis()
+    await build_similarity_index(redis)
+    await build_suggest_index(redis)
+    await build_leaderboard()
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
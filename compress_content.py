@@ -0,0 +1,106 @@
+"""
+正文压缩迁移脚本
+分批把已有提示词的长正文压缩后存入 content_z，可在服务运行时后台执行；
+加 --decompress 参数则反向还原为原文存储
+"""
+import argparse
+import asyncio
+from sqlalchemy import select, update, and_, func
+from app.config import settings
+from app.database import engine, async_session_maker
+from app.models import Prompt
+from app import migrations
+from app import compression
+
+BATCH_SIZE = 200
+# 每批之间稍作停顿，避免迁移占满数据库
+PAUSE_SECONDS = 0.1
+
+async def compress_existing():
+    last_id = 0
+    total = 0
+    original_bytes = 0
+    compressed_bytes = 0
+    while True:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(Prompt.id, Prompt.content_text)
+                .where(and_(
+                    Prompt.id > last_id,
+                    Prompt.content_z.is_(None),
+                    func.length(Prompt.content_text) >= settings.CONTENT_COMPRESSION_MIN_LENGTH
+                ))
+                .order_by(Prompt.id)
+                .limit(BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            for row in rows:
+                data = compression.maybe_compress(row.content_text)
+                if data is None:
+                    continue
+                # 读取后正文若被修改则跳过，留给下次迁移
+                updated = await session.execute(
+                    update(Prompt)
+                    .where(and_(Prompt.id == row.id, Prompt.content_text == row.content_text))
+                    .values(content_text=None, content_z=data)
+                )
+                if updated.rowcount:
+                    total += 1
+                    original_bytes += len(row.content_text.encode())
+                    compressed_bytes += len(data)
+            await session.commit()
+            last_id = rows[-1].id
+        print(f"  已压缩 {total} 条")
+        await asyncio.sleep(PAUSE_SECONDS)
+    if total:
+        print(f"✅ 压缩完成：{total} 条，{original_bytes} B -> {compressed_bytes} B "
+              f"（{compressed_bytes / original_bytes:.1%}）")
+    else:
+        print("✅ 没有需要压缩的正文")
+
+async def decompress_existing():
+    last_id = 0
+    total = 0
+    while True:
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(Prompt.id, Prompt.content_z)
+                .where(and_(Prompt.id > last_id, Prompt.content_z.is_not(None)))
+                .order_by(Prompt.id)
+                .limit(BATCH_SIZE)
+            )
+            rows = result.all()
+            if not rows:
+                break
+            for row in rows:
+                await session.execute(
+                    update(Prompt)
+                    .where(and_(Prompt.id == row.id, Prompt.content_z == row.content_z))
+                    .values(content_text=compression.decompress(row.content_z), content_z=None)
+                )
+            await session.commit()
+            total += len(rows)
+            last_id = rows[-1].id
+        print(f"  已还原 {total} 条")
+        await asyncio.sleep(PAUSE_SECONDS)
+    print(f"✅ 还原完成，共 {total} 条")
+
+async def main():
+    parser = argparse.ArgumentParser(description="提示词正文压缩迁移")
+    parser.add_argument("--decompress", action="store_true", help="把已压缩的正文还原为原文")
+    args = parser.parse_args()
+    if not args.decompress and not settings.CONTENT_COMPRESSION:
+        # 压缩后的正文无法被关键词搜索匹配，必须先按配置切换为只搜索标题
+        parser.error("请先设置 CONTENT_COMPRESSION=true 与 KEYWORD_SEARCH_CONTENT=false")
+
+    await migrations.ensure_current(engine)
+    if args.decompress:
+        await decompress_existing()
+    else:
+        await compress_existing()
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,25 +1,26 @@
 """
 数据库初始化脚本
-创建数据库和表
+创建数据库表并执行所有未执行的结构迁移（app/migrations.py），重复执行是安全的
 """
 import asyncio
-from sqlalchemy.ext.asyncio import create_async_engine
-from app.models import Base
-from app.config import settings
+from app.database import create_engine
+from app import migrations
 
 async def init_database():
     print("正在初始化数据库...")
-    engine = create_async_engine(settings.DATABASE_URL, echo=True)
+    engine = create_engine()
     
-    async with engine.begin() as conn:
-        # 删除所有表（谨慎使用）
-        # await conn.run_sync(Base.metadata.drop_all)
-        
-        # 创建所有表
-        await conn.run_sync(Base.metadata.create_all)
+    print(f"当前结构版本: {await migrations.current_version(engine)}")
+    applied = await migrations.migrate(engine)
     
     await engine.dispose()
-    print("✅ 数据库初始化完成")
+    descriptions = {number: description for number, description, _ in migrations.MIGRATIONS}
+    for number in applied:
+        print(f"已执行迁移 {number}：{descriptions[number]}")
+    if applied:
+        print(f"✅ 数据库初始化完成，已升级到版本 {applied[-1]}")
+    else:
+        print(f"✅ 数据库已是最新版本 {migrations.LATEST}")
 
 if __name__ == "__main__":
     asyncio.run(init_database())
@@ -0,0 +1,110 @@
+"""
+浏览记录分区维护脚本
+创建未来月份的分区，把超过保留期的分区汇总进 prompt_view_stats 后删除。
+建议每天通过 cron 执行一次（重复执行是安全的）；
+加 --migrate 参数把旧版未分区的 prompt_views 表一次性迁移为分区表（会锁表，请在维护窗口执行）
+"""
+import argparse
+import asyncio
+from sqlalchemy import text
+from app.config import settings
+from app.database import engine
+from app.models import PromptView
+from app.schema import upgrade_schema
+from app import migrations
+from app import view_partitions
+from app.view_partitions import PARENT
+
+LEGACY = f"{PARENT}_legacy"
+
+async def migrate_legacy(conn):
+    if await view_partitions.is_partitioned(conn):
+        print("prompt_views 已经是分区表，无需迁移")
+        return
+    print("正在迁移未分区的 prompt_views...")
+    # 索引、主键与序列的名字全库唯一，先给旧表的改名 / 删除，新表才能按原名创建
+    await conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO {LEGACY}"))
+    await conn.execute(text(f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {PARENT}_pkey TO {LEGACY}_pkey"))
+    await conn.execute(text(f"ALTER SEQUENCE IF EXISTS {PARENT}_id_seq RENAME TO {LEGACY}_id_seq"))
+    for index in PromptView.__table__.indexes:
+        await conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    await conn.run_sync(lambda sync_conn: PromptView.__table__.create(sync_conn))
+
+    cutoff = view_partitions.retention_start()
+    first = (await conn.execute(text(f"SELECT min(created_at) FROM {LEGACY}"))).scalar()
+    month = max(view_partitions.month_start(first), cutoff.date()) if first else cutoff.date()
+    current = view_partitions.month_start()
+    while month <= current:
+        await view_partitions.create_partition(conn, month)
+        month = view_partitions.add_months(month, 1)
+    await view_partitions.ensure_partitions(conn)
+
+    # 保留期之前的记录直接汇总，不再写入分区
+    compacted = await conn.execute(text(
+        f"INSERT INTO prompt_view_stats (prompt_id, month, view_count, user_count) "
+        f"SELECT prompt_id, CAST(date_trunc('month', created_at AT TIME ZONE 'UTC') AS date), "
+        f"count(*), count(DISTINCT user_id) FROM {LEGACY} WHERE created_at < :cutoff "
+        f"GROUP BY 1, 2 "
+        f"ON CONFLICT (prompt_id, month) DO UPDATE SET "
+        f"view_count = prompt_view_stats.view_count + excluded.view_count, "
+        f"user_count = prompt_view_stats.user_count + excluded.user_count"
+    ), {"cutoff": cutoff})
+    copied = await conn.execute(text(
+        f"INSERT INTO {PARENT} (id, prompt_id, user_id, ip_address, created_at) "
+        f"SELECT id, prompt_id, user_id, ip_address, created_at FROM {LEGACY} WHERE created_at >= :cutoff"
+    ), {"cutoff": cutoff})
+    await conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), "
+        f"(SELECT coalesce(max(id), 0) + 1 FROM {LEGACY}), false)"
+    ))
+    await conn.execute(text(f"DROP TABLE {LEGACY}"))
+    print(f"✅ 迁移完成：复制 {copied.rowcount} 条，汇总 {compacted.rowcount} 个（提示词, 月份）")
+
+async def maintain(conn, dry_run: bool):
+    if not await view_partitions.is_partitioned(conn):
+        # 非零退出，让 cron 报警
+        raise SystemExit("⚠️  prompt_views 不是分区表，请先执行 python maintain_views.py --migrate")
+    expired = await view_partitions.expired_partitions(conn)
+    if dry_run:
+        existing = await view_partitions.list_partitions(conn)
+        stray = await view_partitions.default_partition_months(conn)
+        print(f"现有分区：{', '.join(view_partitions.partition_name(m) for m in existing) or '无'}")
+        if stray:
+            print(f"默认分区中有记录的月份（将建分区并移入）：{', '.join(m.strftime('%Y-%m') for m in stray)}")
+        print(f"将汇总并删除：{', '.join(view_partitions.partition_name(m) for m in expired) or '无'}")
+        return
+    created = await view_partitions.ensure_partitions(conn)
+    await conn.commit()
+    for month in created:
+        print(f"  已创建分区 {view_partitions.partition_name(month)}")
+    # 默认分区中的过期记录已随新建的分区移出，这里重新计算一次
+    expired = await view_partitions.expired_partitions(conn)
+    # 每个分区单独提交，中途失败时已清理的分区不会回滚，重新执行即可继续
+    for month in expired:
+        await view_partitions.compact_partition(conn, month)
+        await conn.commit()
+        print(f"  已汇总并删除分区 {view_partitions.partition_name(month)}")
+    print(f"✅ 分区维护完成：新建 {len(created)} 个，清理 {len(expired)} 个"
+          f"（保留 {settings.VIEW_RETENTION_MONTHS} 个月）")
+
+async def main():
+    parser = argparse.ArgumentParser(description="浏览记录分区维护")
+    parser.add_argument("--migrate", action="store_true", help="把未分区的旧表迁移为分区表")
+    parser.add_argument("--dry-run", action="store_true", help="只列出将要清理的分区")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        parser.error("浏览记录分区只支持 PostgreSQL")
+    await migrations.ensure_current(engine)
+    if args.migrate:
+        async with engine.begin() as conn:
+            await migrate_legacy(conn)
+            # 新分区表上重建模型中的索引
+            await upgrade_schema(conn)
+    else:
+        async with engine.connect() as conn:
+            await maintain(conn, args.dry_run)
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,10 @@
+#!/bin/bash
+
+echo "启动事件 worker..."
+echo ""
+echo "请确保 .env 中已设置 EVENT_PIPELINE_ENABLED=true，且 PostgreSQL 和 Redis 已启动"
+echo "可同时启动多个 worker 分摊负载，也可只运行部分消费组，例如：./run_worker.sh views"
+echo "查看积压：python -m app.worker --stats"
+echo ""
+
+python -m app.worker "$@"
@@ -0,0 +1,22 @@
+"""
+单元测试只依赖本地 SQLite 临时文件与进程内 Redis，不需要 PostgreSQL / Redis 服务：
+
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+# 总是使用临时库与进程内 Redis，不会写入 .env / 环境变量中配置的数据库
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["REDIS_URL"] = "memory://"
+
+# 导入 app.config 前必须有这些配置；已设置的环境变量不会被覆盖
+for _key, _value in {
+    "SECRET_KEY": "test-secret",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USER": "test",
+    "SMTP_PASSWORD": "test",
+    "SMTP_FROM": "test@localhost",
+}.items():
+    os.environ.setdefault(_key, _value)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from app import admission
+from app.admission import AdaptiveLimiter
+from app.config import settings
+
+
+def _fill(limiter: AdaptiveLimiter, inflight: int):
+    limiter.inflight = inflight
+
+
+def test_limit_grows_additively_under_load():
+    limiter = AdaptiveLimiter("test", 10, 2, 20, 10)
+    # 并发接近上限、延迟稳定时每个请求加 1 / limit，约 limit 个请求加 1
+    for _ in range(10):
+        _fill(limiter, int(limiter.limit))
+        limiter.release(10.0)
+    assert 10.9 < limiter.limit <= 11
+
+
+def test_limit_does_not_grow_when_idle():
+    limiter = AdaptiveLimiter("test", 10, 2, 20, 10)
+    for _ in range(200):
+        _fill(limiter, 1)
+        limiter.release(10.0)
+    assert limiter.limit == 10
+
+
+def test_limit_is_capped():
+    limiter = AdaptiveLimiter("test", 10, 2, 12, 10)
+    for _ in range(2000):
+        _fill(limiter, int(limiter.limit))
+        limiter.release(10.0)
+    assert limiter.limit == 12
+
+
+def test_failure_backs_off_multiplicatively_once_per_latency_window():
+    limiter = AdaptiveLimiter("test", 10, 2, 20, 10)
+    _fill(limiter, 1)
+    limiter.release(10.0)
+    _fill(limiter, 5)
+    limiter.release(10.0, failed=True)
+    assert limiter.limit == pytest.approx(10 * admission.BACKOFF)
+    # 同一个延迟周期（约 10 毫秒）内的其他失败不再降低
+    _fill(limiter, 5)
+    limiter.release(10.0, failed=True)
+    assert limiter.limit == pytest.approx(10 * admission.BACKOFF)
+
+
+def test_latency_spike_backs_off_to_minimum():
+    limiter = AdaptiveLimiter("test", 10, 4, 20, 10)
+    for _ in range(50):
+        _fill(limiter, 1)
+        limiter.release(1.0)
+    assert limiter.limit == 10
+    # 短期平均超过长期平均的 ADMISSION_LATENCY_TOLERANCE 倍后持续下降，直到最小上限
+    for _ in range(20):
+        limiter._last_decrease = 0.0
+        _fill(limiter, 1)
+        limiter.release(settings.ADMISSION_LATENCY_TOLERANCE * 20)
+    assert limiter.limit == 4
+
+
+def test_queue_sheds_when_full_and_admits_on_release():
+    async def run():
+        limiter = AdaptiveLimiter("test", 1, 1, 1, 1)
+        assert await limiter.acquire(1)
+        waiting = asyncio.create_task(limiter.acquire(1))
+        await asyncio.sleep(0)
+        # 等待队列已满，立即拒绝
+        assert not await limiter.acquire(1)
+        assert limiter.shed_queue_full == 1
+        limiter.release(1.0)
+        assert await waiting
+        assert limiter.inflight == 1
+        # 等待超时也会被拒绝
+        assert not await limiter.acquire(0.01)
+        assert limiter.shed_timeout == 1
+
+    asyncio.run(run())
+
+
+def test_route_classes():
+    assert admission.route_class("POST", "/auth/login", b"") == "auth"
+    assert admission.route_class("GET", "/auth/me", b"") == "read"
+    assert admission.route_class("POST", "/prompts", b"") == "write"
+    assert admission.route_class("GET", "/api/prompts/suggest", b"q=a") == "search"
+    assert admission.route_class("GET", "/prompts/1/similar", b"") == "search"
+    assert admission.route_class("GET", "/prompts", b"keyword=%E4%BB%A3") == "search"
+    assert admission.route_class("GET", "/prompts", b"keyword=") == "read"
+    assert admission.route_class("GET", "/users/leaderboard", b"") == "read"
+    assert admission.route_class("GET", "/api/users/1/stats", b"") == "read"
+    assert admission.route_class("GET", "/prompts/stream", b"ids=1") is None
+    assert admission.route_class("GET", "/docs", b"") is None
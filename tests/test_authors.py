@@ -0,0 +1,109 @@
+import asyncio
+import random
+
+from app import authors, event_handlers, events, interactions, migrations, queries
+from app.database import async_session_maker, engine
+from app.models import Prompt, PromptFavorite, PromptLike, User
+from app.redis_client import get_redis
+from app.routers import prompts as prompt_routes
+from app.schemas import PromptCreate
+
+
+async def _users(count: int):
+    await migrations.migrate(engine)
+    async with async_session_maker() as db:
+        users = [User(username=f"author-{random.getrandbits(32)}", hashed_password="!") for _ in range(count)]
+        db.add_all(users)
+        await db.commit()
+        return users
+
+
+async def _create(owner: User, title: str) -> int:
+    async with async_session_maker() as db:
+        prompt_data = PromptCreate(title=title, content=f"{title} 的内容")
+        response = await prompt_routes.create_prompt(prompt_data, False, owner, db)
+        return response.data["id"]
+
+
+async def _delete(owner: User, prompt_id: int) -> int:
+    async with async_session_maker() as db:
+        response = await prompt_routes.delete_prompt(prompt_id, owner, db)
+        return response.code
+
+
+async def _interact(model, counter: str, prompt_id: int, user: User):
+    async with async_session_maker() as db:
+        assert await interactions.add(db, model, counter, prompt_id, user.id) is not None
+
+
+async def _stats(user: User):
+    async with async_session_maker() as db:
+        stats = await authors.get_stats(db, user.id)
+    return stats.prompt_count, stats.view_count, stats.like_count, stats.favorite_count
+
+
+async def _recounted(user: User):
+    async with async_session_maker() as db:
+        result = await db.execute(queries.author_totals().where(Prompt.user_id == user.id))
+        row = result.one_or_none()
+    return tuple(row[1:]) if row is not None else (0, 0, 0, 0)
+
+
+def test_author_stats_follow_prompt_changes():
+    async def run():
+        owner, reader, other_reader = await _users(3)
+        redis = await get_redis()
+        first = await _create(owner, "作者统计一")
+        second = await _create(owner, "作者统计二")
+        await _interact(PromptLike, "like_count", first, reader)
+        await _interact(PromptLike, "like_count", second, other_reader)
+        await _interact(PromptFavorite, "favorite_count", first, reader)
+        # 同一 IP 重复浏览只计一次
+        await event_handlers.handle_views([
+            {"type": events.PROMPT_VIEWED, "prompt_id": str(first), "ip": ip, "user_id": ""}
+            for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.1")
+        ])
+
+        assert await _stats(owner) == (2, 2, 2, 1) == await _recounted(owner)
+        assert await redis.zscore(authors.LEADERBOARD_KEY, owner.id) == 2 * 1 + 2 * 3 + 1 * 5
+
+        # 删除时扣除该提示词的全部计数，重复删除不再扣除
+        assert await _delete(owner, first) == 200
+        assert await _delete(owner, first) == 404
+        assert await _stats(owner) == (1, 0, 1, 0) == await _recounted(owner)
+        assert await redis.zscore(authors.LEADERBOARD_KEY, owner.id) == 3
+
+        # 没有正常提示词的作者移出排行榜
+        assert await _delete(owner, second) == 200
+        assert await _stats(owner) == (0, 0, 0, 0)
+        assert await redis.zscore(authors.LEADERBOARD_KEY, owner.id) is None
+
+    asyncio.run(run())
+
+
+def test_leaderboard_pages_by_score():
+    async def run():
+        top, middle, low = await _users(3)
+        for author, likes in ((top, 3), (middle, 2), (low, 1)):
+            await _create(author, f"排行榜 {author.username}")
+            async with async_session_maker() as db:
+                stats = await authors.adjust(db, author.id, like_count=likes)
+                await db.commit()
+            await authors.update_leaderboard([stats])
+
+        async with async_session_maker() as db:
+            rebuilt = await authors.rebuild_leaderboard(db, batch_size=2)
+            items, total = await authors.leaderboard(db, 0, rebuilt)
+        assert total == rebuilt
+        ranked = [item for item in items if item.user_id in (top.id, middle.id, low.id)]
+        assert [item.user_id for item in ranked] == [top.id, middle.id, low.id]
+        assert [item.score for item in ranked] == [9, 6, 3]
+        assert all(item.rank == items.index(item) + 1 for item in ranked)
+
+        async with async_session_maker() as db:
+            rank = next(item.rank for item in ranked if item.user_id == middle.id)
+            page, _ = await authors.leaderboard(db, rank - 1, 1)
+        assert [item.user_id for item in page] == [middle.id]
+        assert page[0].rank == rank
+
+    asyncio.run(run())
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import time
+
+from app.cache import TwoTierCache
+from app.redis_client import get_redis
+
+
+def _cache(**kwargs) -> TwoTierCache:
+    options = {"l1_max_items": 100, "l1_ttl": 5, "l2_ttl": 30, "stale_ttl": 30, "lock_ms": 200}
+    options.update(kwargs)
+    return TwoTierCache(**options)
+
+
+def test_reads_after_invalidate_do_not_join_the_old_load():
+    async def run():
+        cache = _cache()
+        data = {"v": "old"}
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def loader():
+            value = dict(data)
+            started.set()
+            await release.wait()
+            return value
+
+        first = asyncio.create_task(cache.get_or_load("t-invalidate", 1, loader))
+        await started.wait()
+        # 写入后失效：之后的读取必须看到新值，而不是加入修改前开始的加载
+        data["v"] = "new"
+        await cache.invalidate("t-invalidate", 1)
+        release.set()
+        assert await cache.get_or_load("t-invalidate", 1, loader) == {"v": "new"}
+        assert cache.counters["coalesced"] == 0
+        # 修改前开始的加载仍返回给原来的请求，但不会写入缓存
+        assert await first == {"v": "old"}
+        assert await cache.get("t-invalidate", 1) == {"v": "new"}
+
+    asyncio.run(run())
+
+
+def test_waiters_of_skipped_background_refresh_load_themselves():
+    async def run():
+        cache = _cache()
+        redis = await get_redis()
+        cache_key = cache._key("t-skip", 1)
+        # 已过期但仍可返回的旧值，且其他 worker 正持有刷新锁
+        await redis.set(cache_key, json.dumps({"value": {"v": "stale"}, "fresh_until": time.time() - 1}))
+        await redis.set(f"lock:{cache_key}", "other-worker", px=150)
+
+        async def loader():
+            return {"v": "fresh"}
+
+        assert await cache.get_or_load("t-skip", 1, loader) == {"v": "stale"}
+        # 旧值在后台刷新结束前被清除，新的请求加入了这次会放弃的刷新
+        cache.l1.clear()
+        await redis.delete(cache_key)
+        assert await cache.get_or_load("t-skip", 1, loader) == {"v": "fresh"}
+        assert cache.counters["coalesced"] == 1
+
+    asyncio.run(run())
+
+
+async def _settle():
+    # 让监听任务完成订阅 / 处理已发布的消息
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_l1_then_l2_hits():
+    async def run():
+        writer, reader = _cache(), _cache()
+        await writer.set("t-tiers", 1, {"v": 1})
+        assert await writer.get("t-tiers", 1) == {"v": 1}
+        assert writer.counters["l1_hits"] == 1
+        # 另一个 worker 第一次从 L2 读到，之后命中自己的 L1
+        assert await reader.get("t-tiers", 1) == {"v": 1}
+        assert await reader.get("t-tiers", 1) == {"v": 1}
+        assert (reader.counters["l2_hits"], reader.counters["l1_hits"]) == (1, 1)
+        assert await reader.get("t-tiers", 2) is None
+        assert reader.counters["misses"] == 1
+
+    asyncio.run(run())
+
+
+def test_lru_evicts_least_recently_used():
+    async def run():
+        cache = _cache(l1_max_items=2)
+        for key in (1, 2):
+            await cache.set("t-lru", key, key)
+        assert await cache.get("t-lru", 1) == 1
+        await cache.set("t-lru", 3, 3)
+        assert cache.l1.get(cache._key("t-lru", 2)) is None
+        assert cache.l1.get(cache._key("t-lru", 1)) is not None
+        assert cache.l1.evictions == 1
+
+    asyncio.run(run())
+
+
+def test_invalidate_is_broadcast_to_other_workers():
+    async def run():
+        writer, reader = _cache(), _cache()
+        reader.start_listener()
+        writer.start_listener()
+        await _settle()
+        await writer.set("t-broadcast", 1, {"v": "old"})
+        assert await reader.get("t-broadcast", 1) == {"v": "old"}
+
+        await writer.invalidate("t-broadcast", 1)
+        await _settle()
+        assert reader.l1.get(reader._key("t-broadcast", 1)) is None
+        assert await reader.get("t-broadcast", 1) is None
+        # 自己发出的消息被忽略，失效只计一次
+        assert writer.counters["invalidations"] == 1
+        await reader.stop_listener()
+        await writer.stop_listener()
+
+    asyncio.run(run())
+
+
+def test_namespace_invalidate_drops_every_key():
+    async def run():
+        writer, reader = _cache(), _cache()
+        reader.start_listener()
+        await _settle()
+        for key in (1, 2):
+            await writer.set("t-namespace", key, key)
+            assert await reader.get("t-namespace", key) == key
+        await writer.set("t-other", 1, 1)
+
+        await writer.invalidate("t-namespace")
+        await _settle()
+        for cache in (writer, reader):
+            assert await cache.get("t-namespace", 1) is None
+            assert await cache.get("t-namespace", 2) is None
+        assert await reader.get("t-other", 1) == 1
+        await reader.stop_listener()
+
+    asyncio.run(run())
+
+
+def test_concurrent_misses_share_one_load():
+    async def run():
+        cache = _cache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"v": calls}
+
+        results = await asyncio.gather(*[cache.get_or_load("t-flight", 1, loader) for _ in range(10)])
+        assert results == [{"v": 1}] * 10
+        assert (calls, cache.counters["coalesced"]) == (1, 9)
+        assert await cache.get("t-flight", 1) == {"v": 1}
+
+    asyncio.run(run())
@@ -0,0 +1,68 @@
+import random
+import zlib
+
+import pytest
+from pydantic import ValidationError
+
+from app import compression
+from app.config import Settings, settings
+
+PHRASES = ["你是一名经验丰富的", "请使用 Markdown 格式输出。", "Think step by step. ", "## 约束\n", "输入：", "Output: "]
+
+
+def _prompt(rng: random.Random, length: int) -> str:
+    parts = []
+    while sum(len(part) for part in parts) < length:
+        parts.append(rng.choice(PHRASES) if rng.random() < 0.5 else "".join(rng.choice("提示词内容abcxyz ，。") for _ in range(8)))
+    return "".join(parts)[:length]
+
+
+def test_round_trip():
+    rng = random.Random(1)
+    texts = ["", "a", "中文", "\x00控制字符\n\t", "😀 emoji 表情", _prompt(rng, 30000)]
+    texts += [_prompt(rng, rng.randint(1, 5000)) for _ in range(50)]
+    for text in texts:
+        data = compression.compress(text)
+        assert data[0] == compression.FORMAT_ZLIB_V1
+        assert compression.decompress(data) == text
+
+
+def test_preset_dictionary_is_required_and_helps():
+    text = "你是一名经验丰富的翻译。请使用 Markdown 格式输出。Think step by step. 请用中文回答。"
+    data = compression.compress(text)
+    assert len(data) - 1 < len(zlib.compress(text.encode(), 6))
+    # 没有预置字典无法解压
+    with pytest.raises(zlib.error):
+        zlib.decompress(data[1:])
+
+
+def test_decompress_accepts_memoryview():
+    data = compression.compress("数据库驱动可能返回 memoryview")
+    assert compression.decompress(memoryview(data)) == "数据库驱动可能返回 memoryview"
+
+
+def test_unknown_format_is_rejected():
+    data = compression.compress("text")
+    with pytest.raises(ValueError):
+        compression.decompress(bytes([99]) + data[1:])
+
+
+def test_maybe_compress_threshold():
+    rng = random.Random(2)
+    short = _prompt(rng, settings.CONTENT_COMPRESSION_MIN_LENGTH - 1)
+    assert compression.maybe_compress(short) is None
+    long = _prompt(rng, settings.CONTENT_COMPRESSION_MIN_LENGTH * 4)
+    data = compression.maybe_compress(long)
+    assert data is not None and len(data) < len(long.encode())
+    assert compression.decompress(data) == long
+
+
+def test_load_content_prefers_compressed_column():
+    assert compression.load_content("原文", None) == "原文"
+    assert compression.load_content(None, compression.compress("压缩")) == "压缩"
+
+
+def test_compression_requires_title_only_keyword_search():
+    with pytest.raises(ValidationError):
+        Settings(CONTENT_COMPRESSION=True, KEYWORD_SEARCH_CONTENT=True)
+    assert Settings(CONTENT_COMPRESSION=True, KEYWORD_SEARCH_CONTENT=False).CONTENT_COMPRESSION
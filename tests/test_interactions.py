@@ -0,0 +1,101 @@
+import asyncio
+import random
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from app import authors, interactions, migrations, queries
+from app.database import async_session_maker, engine
+from app.models import Prompt, PromptFavorite, PromptLike, User
+
+
+async def _setup():
+    """返回 (作者 id, 读者 id, 提示词 id)"""
+    await migrations.migrate(engine)
+    async with async_session_maker() as db:
+        owner = User(username=f"owner-{random.getrandbits(32)}", hashed_password="!")
+        reader = User(username=f"reader-{random.getrandbits(32)}", hashed_password="!")
+        db.add_all([owner, reader])
+        await db.flush()
+        prompt = Prompt(user_id=owner.id, title="点赞测试", content="内容")
+        db.add(prompt)
+        await authors.add_prompt(db, owner.id)
+        await db.commit()
+        return owner.id, reader.id, prompt.id
+
+
+async def _count(model, prompt_id: int) -> int:
+    async with async_session_maker() as db:
+        result = await db.execute(select(func.count()).select_from(model).where(model.prompt_id == prompt_id))
+        return result.scalar()
+
+
+async def _call(action, model, counter: str, prompt_id: int, user_id: int):
+    async with async_session_maker() as db:
+        return await action(db, model, counter, prompt_id, user_id)
+
+
+def test_repeated_add_and_remove_change_the_count_once():
+    async def run():
+        _, reader_id, prompt_id = await _setup()
+        assert await _call(interactions.add, PromptLike, "like_count", prompt_id, reader_id) == 1
+        assert await _call(interactions.add, PromptLike, "like_count", prompt_id, reader_id) is None
+        assert await _count(PromptLike, prompt_id) == 1
+
+        assert await _call(interactions.remove, PromptLike, "like_count", prompt_id, reader_id) == 0
+        assert await _call(interactions.remove, PromptLike, "like_count", prompt_id, reader_id) is None
+        assert await _count(PromptLike, prompt_id) == 0
+
+        # 收藏计数独立
+        assert await _call(interactions.add, PromptFavorite, "favorite_count", prompt_id, reader_id) == 1
+        async with async_session_maker() as db:
+            prompt = await db.get(Prompt, prompt_id)
+            assert (prompt.like_count, prompt.favorite_count) == (0, 1)
+
+    asyncio.run(run())
+
+
+def test_concurrent_adds_insert_one_row():
+    async def run():
+        _, reader_id, prompt_id = await _setup()
+        results = await asyncio.gather(*[
+            _call(interactions.add, PromptLike, "like_count", prompt_id, reader_id) for _ in range(5)
+        ])
+        assert sorted(results, key=lambda r: r is None) == [1, None, None, None, None]
+        async with async_session_maker() as db:
+            prompt = await db.get(Prompt, prompt_id)
+            assert prompt.like_count == await _count(PromptLike, prompt_id) == 1
+
+    asyncio.run(run())
+
+
+def test_own_and_deleted_prompts_are_not_changed():
+    async def run():
+        owner_id, reader_id, prompt_id = await _setup()
+        assert await _call(interactions.add, PromptLike, "like_count", prompt_id, owner_id) is None
+        async with async_session_maker() as db:
+            assert await interactions.explain_noop(db, prompt_id, owner_id) == interactions.OWN_PROMPT
+            assert await interactions.explain_noop(db, prompt_id, reader_id) == interactions.UNCHANGED
+
+        assert await _call(interactions.add, PromptLike, "like_count", prompt_id, reader_id) == 1
+        async with async_session_maker() as db:
+            await db.execute(queries.soft_delete_prompt(prompt_id))
+            await db.commit()
+        # 已删除的提示词既不能点赞也不能取消，计数保持删除时的值
+        assert await _call(interactions.remove, PromptLike, "like_count", prompt_id, reader_id) is None
+        assert await _count(PromptLike, prompt_id) == 1
+        async with async_session_maker() as db:
+            assert await interactions.explain_noop(db, prompt_id, reader_id) == interactions.NOT_FOUND
+
+    asyncio.run(run())
+
+
+def test_postgres_statements_are_single_cte_writes():
+    add = str(interactions.add_statement(PromptLike, "like_count", 1, 2).compile(dialect=postgresql.dialect()))
+    assert add.startswith("WITH inserted AS")
+    assert "ON CONFLICT (prompt_id, user_id) DO NOTHING RETURNING" in add
+    assert "RETURNING prompts.like_count, prompts.user_id" in add
+
+    remove = str(interactions.remove_statement(PromptLike, "like_count", 1, 2).compile(dialect=postgresql.dialect()))
+    assert remove.startswith("WITH deleted AS")
+    assert "DELETE FROM prompt_likes" in remove
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+
+from app import live, migrations
+from app.config import settings
+from app.database import async_session_maker, engine
+from app.live import CounterHub
+from app.models import Prompt, User
+from app.redis_client import get_redis
+
+
+def test_changes_published_right_after_subscribe_are_delivered():
+    async def run():
+        hub = CounterHub()
+        subscriber = await hub.subscribe({1})
+        redis = await get_redis()
+        await redis.publish(live.CHANNEL, json.dumps([{"id": 1, "viewCount": 5, "likeCount": 0, "favoriteCount": 0}]))
+        await asyncio.wait_for(subscriber.changed.wait(), 1)
+        assert [counter["viewCount"] for counter in subscriber.take()] == [5]
+        hub.unsubscribe(subscriber)
+        await hub.stop_listener()
+
+    asyncio.run(run())
+
+
+async def _create_prompt() -> int:
+    await migrations.migrate(engine)
+    async with async_session_maker() as db:
+        user = User(username=f"live-{random.getrandbits(32)}", hashed_password="!")
+        db.add(user)
+        await db.flush()
+        prompt = Prompt(user_id=user.id, title="计数推送", content="内容", view_count=3, like_count=1)
+        db.add(prompt)
+        await db.commit()
+        return prompt.id
+
+
+async def _set_views(prompt_id: int, view_count: int):
+    async with async_session_maker() as db:
+        prompt = await db.get(Prompt, prompt_id)
+        prompt.view_count = view_count
+        await db.commit()
+
+
+def test_only_watched_prompts_are_published(monkeypatch):
+    async def run():
+        hub = CounterHub()
+        monkeypatch.setattr(live, "hub", hub)
+        prompt_id = await _create_prompt()
+        redis = await get_redis()
+        pubsub = redis.pubsub()
+        await pubsub.subscribe(live.CHANNEL)
+        messages = pubsub.listen()
+        assert (await messages.__anext__())["type"] == "subscribe"
+
+        await live.publish_counters([prompt_id])
+        assert pubsub._queue.empty()
+
+        subscriber = await hub.subscribe({prompt_id})
+        assert await live.watched([prompt_id, prompt_id + 1]) == [prompt_id]
+        await live.publish_counters([prompt_id, prompt_id + 1])
+        published = json.loads((await messages.__anext__())["data"])
+        assert published == [{"id": prompt_id, "viewCount": 3, "likeCount": 1, "favoriteCount": 0}]
+
+        hub.unsubscribe(subscriber)
+        assert await live.watched([prompt_id]) == []
+        assert hub.stats()["connections"] == 0
+        await pubsub.close()
+        await hub.stop_listener()
+
+    asyncio.run(run())
+
+
+def test_watcher_counts_are_shared_through_redis(monkeypatch):
+    async def run():
+        hub = CounterHub()
+        monkeypatch.setattr(live, "IN_PROCESS", False)
+        redis = await get_redis()
+        await redis.delete(live.WATCHERS_KEY)
+        first = await hub.subscribe({1, 2})
+        second = await hub.subscribe({2})
+        assert await redis.hmget(live.WATCHERS_KEY, [1, 2]) == ["1", "2"]
+        assert await live.watched([1, 2, 3]) == [1, 2]
+
+        hub.unsubscribe(first)
+        hub.unsubscribe(second)
+        await asyncio.gather(*hub._pending_unwatch)
+        assert await live.watched([1, 2]) == []
+        await hub.stop_listener()
+
+    asyncio.run(run())
+
+
+def test_stream_sends_current_counters_then_merged_changes(monkeypatch):
+    async def run():
+        hub = CounterHub()
+        monkeypatch.setattr(live, "hub", hub)
+        monkeypatch.setattr(settings, "SSE_MIN_INTERVAL_MS", 300)
+        monkeypatch.setattr(settings, "SSE_HEARTBEAT_SECONDS", 0.5)
+        prompt_id = await _create_prompt()
+        events = live.stream({prompt_id})
+        first = await events.__anext__()
+        assert first.startswith("event: counters\n")
+        assert json.loads(first.split("data: ", 1)[1])[0]["viewCount"] == 3
+
+        # 最小间隔内的多次变化合并为一次推送，只带最新值
+        next_event = asyncio.ensure_future(events.__anext__())
+        for view_count in (4, 5, 6):
+            await _set_views(prompt_id, view_count)
+            await live.publish_counters([prompt_id])
+        pushed = await asyncio.wait_for(next_event, 1)
+        assert [counter["viewCount"] for counter in json.loads(pushed.split("data: ", 1)[1])] == [6]
+
+        # 没有变化时发送心跳注释
+        assert await asyncio.wait_for(events.__anext__(), 1) == ": ping\n\n"
+        await events.aclose()
+        assert hub.stats()["connections"] == 0
+        await hub.stop_listener()
+
+    asyncio.run(run())
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueListener
+
+from app import logs
+from app.config import settings
+
+
+class Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _logger(handler: logging.Handler) -> logging.Logger:
+    logger = logging.getLogger(f"test.logs.{id(handler)}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logs.NonBlockingQueueHandler(queue.Queue(2))
+    logger = _logger(handler)
+    for i in range(5):
+        logger.info("message %d", i)
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_records_are_formatted_in_the_listener_thread():
+    handler = logs.NonBlockingQueueHandler(queue.Queue(10))
+    output = Collect()
+    output.setFormatter(logs.JsonFormatter())
+    listener = QueueListener(handler.queue, output)
+    listener.start()
+    try:
+        token = logs._request.set(logs.RequestLog("req-1", False))
+        try:
+            _logger(handler).info("hello %s", "世界", extra={"fields": {"status": 200}})
+        finally:
+            logs._request.reset(token)
+    finally:
+        listener.stop()
+
+    record, = output.records
+    # 入队时不格式化，参数原样交给后台线程
+    assert record.args == ("世界",)
+    data = json.loads(output.format(record))
+    assert (data["msg"], data["request_id"], data["status"], data["level"]) == ("hello 世界", "req-1", 200, "INFO")
+
+
+def test_exceptions_are_included_in_json():
+    formatter = logs.JsonFormatter()
+    try:
+        raise ValueError("坏数据")
+    except ValueError:
+        record = logging.getLogger("test").makeRecord("test", logging.ERROR, __file__, 1, "失败", (), sys.exc_info())
+    data = json.loads(formatter.format(record))
+    assert "ValueError: 坏数据" in data["exc"]
+    assert "request_id" not in data
+
+
+def _app(status: int):
+    async def app(scope, receive, send):
+        logging.getLogger("app.test").warning("inside")
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+
+async def _call(middleware, headers=()):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/prompts", "headers": list(headers)}
+    await middleware(scope, receive, send)
+    return dict(sent[0]["headers"])
+
+
+def test_access_log_sampling_and_request_id(monkeypatch):
+    async def run():
+        collected = Collect()
+        handler = logs.NonBlockingQueueHandler(queue.Queue(100))
+        for name in ("app.access", "app.test"):
+            logger = logging.getLogger(name)
+            monkeypatch.setattr(logger, "handlers", [handler])
+            monkeypatch.setattr(logger, "propagate", False)
+            logger.setLevel(logging.INFO)
+
+        headers = await _call(logs.AccessLogMiddleware(_app(200)), [(b"x-request-id", b"abc")])
+        assert headers[b"x-request-id"] == b"abc"
+        headers = await _call(logs.AccessLogMiddleware(_app(503)))
+        generated = headers[b"x-request-id"].decode()
+
+        while not handler.queue.empty():
+            collected.handle(handler.queue.get_nowait())
+        messages = [(r.name, r.request_id, getattr(r, "fields", {}).get("status")) for r in collected.records]
+        # 抽样率为 0 时成功请求不写访问日志，5xx 总是记录；请求内的日志都带 request id
+        assert messages == [
+            ("app.test", "abc", None),
+            ("app.test", generated, None),
+            ("app.access", generated, 503),
+        ]
+
+    monkeypatch.setattr(settings, "LOG_ACCESS_SAMPLE_RATE", 0.0)
+    monkeypatch.setattr(settings, "LOG_SLOW_MS", 10_000)
+    monkeypatch.setattr(settings, "LOG_SQL", False)
+    asyncio.run(run())
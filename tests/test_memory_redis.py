@@ -0,0 +1,196 @@
+import asyncio
+import random
+
+import pytest
+
+from app import memory_redis
+from app.memory_redis import MemoryRedis
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(memory_redis.time, "monotonic", clock)
+    return clock
+
+
+def test_sorted_set_orders_by_score_then_member_bytes():
+    async def run():
+        redis = MemoryRedis()
+        assert await redis.zadd("z", {"b": 1, "a": 1, "中": 1, "Z": 1, "c": 0}) == 5
+        assert await redis.zrange("z", 0, -1) == ["c", "Z", "a", "b", "中"]
+        assert await redis.zrevrange("z", 0, 1, withscores=True) == [("中", 1.0), ("b", 1.0)]
+        assert await redis.zrange("z", -2, -1) == ["b", "中"]
+        assert await redis.zrange("z", 3, 100) == ["b", "中"]
+        assert await redis.zrange("z", 4, 2) == []
+
+    asyncio.run(run())
+
+
+def test_zadd_flags_and_updates():
+    async def run():
+        redis = MemoryRedis()
+        assert await redis.zadd("z", {"a": 1}) == 1
+        # 只更新分数不算新增
+        assert await redis.zadd("z", {"a": 5}) == 0
+        assert await redis.zadd("z", {"a": 9, "b": 2}, nx=True) == 1
+        assert await redis.zadd("z", {"a": 7, "c": 3}, xx=True) == 0
+        assert await redis.zmscore("z", ["a", "b", "c"]) == [7.0, 2.0, None]
+        assert await redis.zincrby("z", 2.5, "b") == 4.5
+        assert await redis.zincrby("z", 1, "new") == 1.0
+        assert await redis.zrange("z", 0, -1) == ["new", "b", "a"]
+        assert await redis.zrem("z", "a", "missing") == 1
+        assert await redis.zcard("z") == 2
+
+    asyncio.run(run())
+
+
+def test_range_by_score_bounds_and_limit():
+    async def run():
+        redis = MemoryRedis()
+        await redis.zadd("z", {str(i): i for i in range(10)})
+        assert await redis.zrangebyscore("z", 3, 5) == ["3", "4", "5"]
+        assert await redis.zrangebyscore("z", "(3", "(5") == ["4"]
+        assert await redis.zrangebyscore("z", "-inf", "+inf", start=8, num=5) == ["8", "9"]
+        # 只给出 start 时与 Redis 一样忽略
+        assert await redis.zrangebyscore("z", 7, "inf", start=1) == ["7", "8", "9"]
+        assert await redis.zremrangebyscore("z", "-inf", "(2") == 2
+        # 保留分数最高的 3 个，与 suggest 裁剪前缀集合的方式相同
+        assert await redis.zremrangebyrank("z", 0, -4) == 5
+        assert await redis.zrange("z", 0, -1) == ["7", "8", "9"]
+
+    asyncio.run(run())
+
+
+def test_range_by_lex_uses_byte_order():
+    async def run():
+        redis = MemoryRedis()
+        await redis.zadd("z", {member: 0 for member in ["apple", "app", "b", "中文", "apply", "Apple"]})
+        assert await redis.zrangebylex("z", "-", "+") == ["Apple", "app", "apple", "apply", "b", "中文"]
+        assert await redis.zrangebylex("z", "[app", "(b") == ["app", "apple", "apply"]
+        assert await redis.zrangebylex("z", "(app", "[apply", start=1, num=1) == ["apply"]
+        assert await redis.zrangebylex("z", "[中", "+") == ["中文"]
+        assert await redis.zrangebylex("z", "+", "-") == []
+        with pytest.raises(ValueError):
+            await redis.zrangebylex("z", "app", "+")
+
+    asyncio.run(run())
+
+
+def test_sorted_set_matches_reference_under_random_operations():
+    async def run():
+        rng = random.Random(1)
+        redis = MemoryRedis()
+        reference = {}
+        members = [f"m{i}" for i in range(30)]
+        for _ in range(2000):
+            member = rng.choice(members)
+            action = rng.random()
+            if action < 0.5:
+                score = rng.randint(0, 10)
+                await redis.zadd("z", {member: score})
+                reference[member] = float(score)
+            elif action < 0.8:
+                amount = rng.randint(-3, 3)
+                await redis.zincrby("z", amount, member)
+                reference[member] = reference.get(member, 0.0) + amount
+            else:
+                await redis.zrem("z", member)
+                reference.pop(member, None)
+        expected = sorted(reference.items(), key=lambda item: (item[1], item[0].encode()))
+        assert await redis.zrange("z", 0, -1, withscores=True) == expected
+        low, high = 2, 6
+        assert await redis.zrangebyscore("z", low, high) == [m for m, s in expected if low <= s <= high]
+
+    asyncio.run(run())
+
+
+def test_keys_expire(clock):
+    async def run():
+        redis = MemoryRedis()
+        await redis.set("a", 1, ex=10)
+        await redis.set("b", "x", px=500)
+        await redis.sadd("s", "x")
+        await redis.expire("s", 5)
+        assert (await redis.ttl("a"), await redis.ttl("s"), await redis.ttl("missing")) == (10, 5, -2)
+
+        clock.now += 1
+        assert await redis.get("b") is None
+        assert await redis.set("b", "y", nx=True)
+        assert await redis.ttl("b") == -1
+        clock.now += 5
+        assert await redis.smembers("s") == set()
+        assert await redis.exists("a", "s") == 1
+        # 覆盖写入清除过期时间，keepttl 保留
+        await redis.set("a", 2, keepttl=True)
+        assert await redis.ttl("a") == 4
+        await redis.set("a", 3)
+        assert await redis.ttl("a") == -1
+
+    asyncio.run(run())
+
+
+def test_lock_helpers(clock):
+    async def run():
+        redis = MemoryRedis()
+        assert await redis.set("lock", "t1", nx=True, px=100)
+        assert await redis.set("lock", "t2", nx=True, px=100) is None
+        assert await redis.delete_if_equals("lock", "t2") == 0
+        clock.now += 0.2
+        assert await redis.set("lock", "t2", nx=True, px=100)
+        assert await redis.delete_if_equals("lock", "t2") == 1
+
+    asyncio.run(run())
+
+
+def test_emptied_collections_are_removed():
+    async def run():
+        redis = MemoryRedis()
+        await redis.zadd("z", {"a": 1})
+        await redis.expire("z", 100)
+        await redis.zrem("z", "a")
+        assert await redis.exists("z") == 0
+        await redis.zadd("z", {"a": 1})
+        assert await redis.ttl("z") == -1
+        await redis.hset("h", "f", 1)
+        await redis.hdel("h", "f")
+        assert await redis.exists("h") == 0
+
+    asyncio.run(run())
+
+
+def test_wrong_type_and_counters():
+    async def run():
+        redis = MemoryRedis()
+        await redis.set("s", "text")
+        with pytest.raises(TypeError):
+            await redis.zadd("s", {"a": 1})
+        with pytest.raises(ValueError):
+            await redis.incr("s")
+        assert await redis.incrby("n", 5) == 5
+        assert await redis.hincrby("h", "f", -2) == -2
+        assert await redis.hmget("h", ["f", "g"]) == ["-2", None]
+        assert await redis.get("n") == "5"
+
+    asyncio.run(run())
+
+
+def test_pipeline_runs_commands_in_order():
+    async def run():
+        redis = MemoryRedis()
+        pipe = redis.pipeline(transaction=False)
+        pipe.zadd("z", {"a": 1}).zincrby("z", 2, "a").zscore("z", "a")
+        assert await pipe.execute() == [1, 3.0, 3.0]
+        assert await pipe.execute() == []
+        with pytest.raises(AttributeError):
+            pipe.xadd
+
+    asyncio.run(run())
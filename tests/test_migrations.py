@@ -0,0 +1,51 @@
+import asyncio
+import tempfile
+
+from sqlalchemy import text
+
+from app import migrations
+from app.database import create_engine
+from app.models import Base
+
+
+def _engine():
+    return create_engine(f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/migrations.db")
+
+
+async def _schema(engine) -> dict:
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type IN ('table', 'index') AND name != 'schema_version'"
+        ))
+        return dict(result.all())
+
+
+def test_baseline_does_not_create_later_tables():
+    async def run():
+        engine = _engine()
+        async with engine.begin() as conn:
+            await migrations.MIGRATIONS[0][2](conn)
+        schema = await _schema(engine)
+        assert "prompts" in schema
+        assert "author_stats" not in schema
+        await engine.dispose()
+
+    asyncio.run(run())
+
+
+def test_migrations_build_the_current_model_schema():
+    async def run():
+        engine = _engine()
+        assert await migrations.migrate(engine) == [number for number, _, _ in migrations.MIGRATIONS]
+        assert await migrations.current_version(engine) == migrations.LATEST
+        assert await migrations.migrate(engine) == []
+
+        # 修改模型时必须同时追加迁移，否则这里的结构会不一致
+        reference = _engine()
+        async with reference.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        assert await _schema(engine) == await _schema(reference)
+        await engine.dispose()
+        await reference.dispose()
+
+    asyncio.run(run())
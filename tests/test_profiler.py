@@ -0,0 +1,83 @@
+import asyncio
+import inspect
+
+import redis.asyncio
+
+from app import profiler
+from app.memory_redis import MemoryRedis
+
+
+class FakeRedis(redis.asyncio.Redis):
+    """redis-py 客户端，只把 execute_command 换成不连网络的实现"""
+    def __init__(self):
+        super().__init__()
+        self.data = {}
+
+    async def execute_command(self, *args, **options):
+        await asyncio.sleep(0)
+        command, *rest = args
+        if command == "SET":
+            self.data[rest[0]] = rest[1]
+            return True
+        if command == "GET":
+            return self.data.get(rest[0])
+        return None
+
+
+async def _profiled(client, calls):
+    profile = profiler.Profile("GET", "/prompts/1", "test")
+    profiler._active[asyncio.current_task()] = profile
+    try:
+        result = await calls(client)
+    finally:
+        del profiler._active[asyncio.current_task()]
+    return profile, result
+
+
+def test_redis_py_commands_are_timed():
+    async def run():
+        client = FakeRedis()
+        # redis-py 的命令方法不是协程函数，必须按调用结果判断
+        assert not inspect.iscoroutinefunction(client.get)
+        timed = profiler.TimedRedis(client)
+
+        async def calls(client):
+            await client.set("k", "v")
+            return await client.get("k")
+
+        profile, value = await _profiled(timed, calls)
+        assert value == "v"
+        assert [call["command"] for call in profile.redis] == ["set", "get"]
+        assert profile.redis_count == 2
+
+    asyncio.run(run())
+
+
+def test_unprofiled_requests_pass_through():
+    async def run():
+        timed = profiler.TimedRedis(FakeRedis())
+        await timed.set("k", "v")
+        assert await timed.get("k") == "v"
+        # 非命令属性与同步方法原样返回
+        assert timed.connection_pool is timed._client.connection_pool
+        assert isinstance(timed.pubsub(), redis.asyncio.client.PubSub)
+
+    asyncio.run(run())
+
+
+def test_memory_redis_commands_and_pipelines_are_timed():
+    async def run():
+        timed = profiler.TimedRedis(MemoryRedis())
+
+        async def calls(client):
+            await client.hset("h", "a", 1)
+            pipe = client.pipeline(transaction=False)
+            pipe.hget("h", "a")
+            pipe.hget("h", "b")
+            return await pipe.execute()
+
+        profile, values = await _profiled(timed, calls)
+        assert values == ["1", None]
+        assert [call["command"] for call in profile.redis] == ["hset", "pipeline[hget,hget]"]
+
+    asyncio.run(run())
@@ -0,0 +1,129 @@
+import asyncio
+import random
+
+from sqlalchemy import select
+
+from app import migrations, revisions
+from app.database import async_session_maker, engine
+from app.models import Prompt, PromptRevision, User
+
+SENTENCES = ["请用中文回答。", "Keep it concise. ", "输出格式如下：\n", "不要输出任何解释。", "Think step by step. ", "示例：a -> b。"]
+
+
+def _random_edit(rng: random.Random, text: str) -> str:
+    position = rng.randint(0, len(text))
+    action = rng.choice(["insert", "delete", "replace"])
+    if action == "insert":
+        return text[:position] + rng.choice(SENTENCES) + text[position:]
+    end = min(len(text), position + rng.randint(1, 30))
+    if action == "delete":
+        return text[:position] + text[end:]
+    return text[:position] + rng.choice(SENTENCES) + text[end:]
+
+
+def test_delta_round_trip_for_random_edits():
+    rng = random.Random(1)
+    text = "".join(rng.choice(SENTENCES) for _ in range(50))
+    for _ in range(300):
+        new = _random_edit(rng, text)
+        ops = revisions.decode_delta(revisions.encode_delta(revisions.make_delta(text, new)))
+        assert revisions.apply_delta(text, ops) == new
+        text = new
+
+
+def test_delta_round_trip_edge_cases():
+    cases = [
+        ("", ""),
+        ("", "新内容"),
+        ("旧内容", ""),
+        ("same", "same"),
+        ("abc", "abcabc"),
+        ("aaaa", "aa"),
+        ("第一句。第二句。", "第二句。第一句。"),
+        ("x" * 5000, "y" * 5000),
+    ]
+    for old, new in cases:
+        assert revisions.apply_delta(old, revisions.make_delta(old, new)) == new
+
+
+def test_unchanged_text_is_a_single_copy():
+    text = "你是一名经验丰富的翻译。" * 10
+    assert revisions.make_delta(text, text) == [[0, len(text)]]
+
+
+def test_snapshot_boundaries():
+    interval = revisions.SNAPSHOT_INTERVAL
+    assert revisions.is_snapshot_version(1)
+    assert not revisions.is_snapshot_version(2)
+    assert not revisions.is_snapshot_version(interval)
+    assert revisions.is_snapshot_version(interval + 1)
+    assert revisions.is_snapshot_version(2 * interval + 1)
+
+    delta = revisions.build_revision(1, 1, interval, "t", "new", "old")
+    snapshot = revisions.build_revision(1, 1, interval + 1, "t", "new", "old")
+    first = revisions.build_revision(1, 1, 5, "t", "new", None)
+    assert (delta.is_snapshot, snapshot.is_snapshot, first.is_snapshot) == (0, 1, 1)
+    assert snapshot.data == first.data == "new"
+
+
+async def _create_prompt(content: str) -> int:
+    await migrations.migrate(engine)
+    async with async_session_maker() as db:
+        user = User(username=f"editor-{random.getrandbits(32)}", hashed_password="!")
+        db.add(user)
+        await db.flush()
+        prompt = Prompt(user_id=user.id, title="修订测试", content=content)
+        db.add(prompt)
+        await db.commit()
+        return prompt.id
+
+
+async def _edit(prompt_id: int, content: str):
+    async with async_session_maker() as db:
+        prompt = await db.get(Prompt, prompt_id)
+        prompt = await revisions.load_for_edit(db, prompt_id, prompt.user_id)
+        await revisions.record_revision(db, prompt, prompt.title, content, prompt.user_id)
+        prompt.content = content
+        await db.commit()
+
+
+def test_every_version_reconstructs_across_snapshots():
+    async def run():
+        rng = random.Random(2)
+        contents = ["".join(rng.choice(SENTENCES) for _ in range(40))]
+        prompt_id = await _create_prompt(contents[0])
+        for _ in range(revisions.SNAPSHOT_INTERVAL * 2 + 3):
+            contents.append(_random_edit(rng, contents[-1]))
+            await _edit(prompt_id, contents[-1])
+
+        async with async_session_maker() as db:
+            result = await db.execute(
+                select(PromptRevision.version, PromptRevision.is_snapshot).where(PromptRevision.prompt_id == prompt_id)
+            )
+            snapshots = sorted(version for version, is_snapshot in result.all() if is_snapshot)
+            assert snapshots == [1, revisions.SNAPSHOT_INTERVAL + 1, revisions.SNAPSHOT_INTERVAL * 2 + 1]
+            for version, content in enumerate(contents, start=1):
+                loaded = await revisions.load_version(db, prompt_id, version)
+                assert loaded["content"] == content
+            assert await revisions.load_version(db, prompt_id, len(contents) + 1) is None
+
+    asyncio.run(run())
+
+
+def test_concurrent_edits_get_distinct_versions():
+    async def run():
+        prompt_id = await _create_prompt("原始内容。")
+        edits = [f"第 {i} 次并发修改。" for i in range(5)]
+        await asyncio.gather(*[_edit(prompt_id, content) for content in edits])
+
+        async with async_session_maker() as db:
+            assert await revisions.latest_version(db, prompt_id) == len(edits) + 1
+            loaded = [(await revisions.load_version(db, prompt_id, version))["content"]
+                      for version in range(1, len(edits) + 2)]
+            prompt = await db.get(Prompt, prompt_id)
+        # 每次修改都基于上一次提交后的正文，最后一个版本就是当前正文
+        assert loaded[0] == "原始内容。"
+        assert sorted(loaded[1:]) == sorted(edits)
+        assert loaded[-1] == prompt.content
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+import asyncio
+import time
+import uuid
+
+from app.revocation import BloomFilter, RevocationList
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(5000, 0.001)
+    members = [f"jti:{uuid.uuid4().hex}" for _ in range(5000)]
+    for member in members:
+        bloom.add(member)
+    assert all(member in bloom for member in members)
+    assert bloom.count == len(members)
+
+
+def test_bloom_filter_false_positive_rate_near_target():
+    bloom = BloomFilter(5000, 0.01)
+    for i in range(5000):
+        bloom.add(f"jti:member-{i}")
+    false_positives = sum(f"jti:other-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.03
+
+
+def test_bloom_filter_sizing():
+    bloom = BloomFilter(10000, 0.001)
+    # m = -n ln p / (ln 2)^2 约 14.4 位 / 元素，k = m / n ln 2 约 10
+    assert 140000 <= bloom.size <= 150000
+    assert bloom.hashes == 10
+    assert BloomFilter(0, 0.001).size >= 8
+
+
+def _payload(user_id: int, jti: str = None, issued_at: float = None) -> dict:
+    now = time.time()
+    payload = {"sub": str(user_id), "iat": issued_at if issued_at is not None else now, "exp": now + 3600}
+    if jti is not None:
+        payload["jti"] = jti
+    return payload
+
+
+def test_revoked_tokens_are_always_reported():
+    async def run():
+        revocations = RevocationList(sync_seconds=60, error_rate=0.001, min_capacity=100)
+        other_worker = RevocationList(sync_seconds=60, error_rate=0.001, min_capacity=100)
+        await revocations.sync()
+        await other_worker.sync()
+
+        revoked = [_payload(1, uuid.uuid4().hex) for _ in range(200)]
+        for payload in revoked:
+            await revocations.revoke_token(payload)
+        kept = _payload(1, uuid.uuid4().hex)
+
+        # 吊销的 worker 立即可见；其他 worker 同步后可见
+        await other_worker.sync()
+        for worker in (revocations, other_worker):
+            for payload in revoked:
+                assert await worker.is_revoked(payload)
+            assert not await worker.is_revoked(kept)
+
+    asyncio.run(run())
+
+
+def test_revoke_user_covers_tokens_issued_before():
+    async def run():
+        revocations = RevocationList(sync_seconds=60, error_rate=0.001)
+        await revocations.sync()
+        old = _payload(2, uuid.uuid4().hex, issued_at=time.time() - 10)
+        legacy = _payload(2)
+        await revocations.revoke_user(2)
+        new = _payload(2, uuid.uuid4().hex, issued_at=time.time() + 1)
+        assert await revocations.is_revoked(old)
+        assert await revocations.is_revoked(legacy)
+        assert not await revocations.is_revoked(new)
+        assert not await revocations.is_revoked(_payload(3, uuid.uuid4().hex))
+
+    asyncio.run(run())
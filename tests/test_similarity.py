@@ -0,0 +1,88 @@
+import asyncio
+import random
+
+import numpy as np
+
+from app import similarity
+from app.memory_redis import MemoryRedis
+
+BASE_TEXT = "你是一名经验丰富的代码评审助手。请逐行阅读提交的 Python 代码，指出潜在的缺陷、性能问题和可读性问题，并给出修改建议。" * 8
+
+
+def _flip_bits(signature: int, positions) -> int:
+    for position in positions:
+        signature ^= 1 << position
+    return signature
+
+
+def test_hamming_distances_count_differing_bits():
+    rng = random.Random(1)
+    signature = rng.getrandbits(64)
+    candidates = [signature, signature ^ 1, signature ^ (1 << 63), ~signature & (2 ** 64 - 1)]
+    candidates += [rng.getrandbits(64) for _ in range(20)]
+    distances = similarity.hamming_distances(signature, np.array(candidates, dtype=np.uint64))
+    assert list(distances) == [bin(signature ^ c).count("1") for c in candidates]
+
+
+def test_identical_text_has_identical_signature():
+    assert similarity.compute_signature(BASE_TEXT) == similarity.compute_signature(BASE_TEXT)
+    # 大小写与空白归一化后相同
+    assert similarity.compute_signature("Hello   World") == similarity.compute_signature("hello world")
+
+
+def test_batch_signatures_match_single_signatures():
+    texts = [BASE_TEXT, "短", "", "Translate the following text into English."]
+    batch = similarity.compute_signatures(texts)
+    assert [int(s) for s in batch] == [similarity.compute_signature(t) for t in texts]
+
+
+def test_small_edit_is_closer_than_unrelated_text():
+    signature = similarity.compute_signature(BASE_TEXT)
+    edited = similarity.compute_signature(BASE_TEXT.replace("性能问题", "安全问题", 1))
+    unrelated = similarity.compute_signature("Write a short poem about autumn leaves and the first frost. " * 8)
+    near, far = similarity.hamming_distances(signature, np.array([edited, unrelated], dtype=np.uint64))
+    assert near <= similarity.SIMILAR_MAX_DISTANCE
+    assert near < far
+
+
+def test_banding_guarantees_collision_within_duplicate_distance():
+    # 每个波段 16 位，距离不超过 BANDS - 1 时至少有一个波段完全相同
+    assert similarity.DUPLICATE_MAX_DISTANCE < similarity.BANDS
+    rng = random.Random(2)
+    for _ in range(500):
+        signature = rng.getrandbits(64)
+        distance = rng.randint(0, similarity.DUPLICATE_MAX_DISTANCE)
+        other = _flip_bits(signature, rng.sample(range(64), distance))
+        assert set(similarity.band_keys(signature)) & set(similarity.band_keys(other))
+
+
+def test_one_flipped_bit_per_band_shares_no_bucket():
+    signature = random.Random(3).getrandbits(64)
+    other = _flip_bits(signature, [band * similarity.BAND_BITS for band in range(similarity.BANDS)])
+    assert not set(similarity.band_keys(signature)) & set(similarity.band_keys(other))
+
+
+def test_find_similar_returns_indexed_near_duplicates():
+    async def run():
+        redis = MemoryRedis()
+        await similarity.index_batch(redis, [
+            (1, BASE_TEXT),
+            (2, BASE_TEXT.replace("修改建议", "改进建议", 1)),
+            (3, "Summarize the meeting notes below into five bullet points. " * 8),
+        ])
+        signature = await similarity.get_signature(redis, 1)
+        found = await similarity.find_similar(redis, signature, exclude_id=1)
+        assert [prompt_id for prompt_id, _ in found] == [2]
+
+        await similarity.remove_prompt(redis, 2)
+        assert await similarity.find_similar(redis, signature, exclude_id=1) == []
+
+    asyncio.run(run())
+
+
+def test_similar_limit_is_bounded():
+    from app.main import app
+
+    parameters = app.openapi()["paths"]["/api/prompts/{promptId}/similar"]["get"]["parameters"]
+    limit = next(p for p in parameters if p["name"] == "limit")["schema"]
+    assert (limit["default"], limit["minimum"], limit["maximum"]) == (10, 1, 50)
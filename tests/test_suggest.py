@@ -0,0 +1,66 @@
+import asyncio
+
+from app import suggest
+from app.memory_redis import MemoryRedis
+
+
+async def _ids(redis, q: str):
+    return [item["id"] for item in await suggest.suggest(redis, q)]
+
+
+def test_suggest_orders_by_popularity():
+    async def run():
+        redis = MemoryRedis()
+        await suggest.index_batch(redis, [(1, "Python 代码评审", 10), (2, "Python 单元测试", 20), (3, "翻译助手", 30)])
+        assert await _ids(redis, "py") == [2, 1]
+        assert await _ids(redis, "单元") == [2]
+        # 拼音与拼音首字母
+        assert await _ids(redis, "fanyi") == [3]
+        assert await _ids(redis, "fy") == [3]
+
+    asyncio.run(run())
+
+
+def test_bumps_are_coalesced_until_flush():
+    async def run():
+        redis = MemoryRedis()
+        await suggest.index_batch(redis, [(1, "Python 代码评审", 10), (2, "Python 单元测试", 20)])
+        for _ in range(5):
+            await suggest.bump_popularity(redis, 1, 3)
+        # 总热度立即累加，前缀集合中的分数等到批量改写
+        assert await redis.zscore(suggest.POPULARITY_KEY, 1) == 25
+        assert await _ids(redis, "py") == [2, 1]
+        assert suggest._pending == {1}
+
+        await suggest.flush_popularity(redis)
+        assert await _ids(redis, "py") == [1, 2]
+        assert await redis.zscore(suggest.PREFIX_KEY + "python", 1) == 25
+        assert not suggest._pending
+        suggest._flush_task.cancel()
+
+    asyncio.run(run())
+
+
+def test_flush_runs_in_background(monkeypatch):
+    async def run():
+        redis = MemoryRedis()
+        await suggest.index_batch(redis, [(1, "Python 代码评审", 10), (2, "Python 单元测试", 20)])
+        await suggest.bump_popularity(redis, 1, 15)
+        await suggest._flush_task
+        assert await _ids(redis, "py") == [1, 2]
+
+    monkeypatch.setattr(suggest, "POPULARITY_FLUSH_SECONDS", 0)
+    asyncio.run(run())
+
+
+def test_removed_title_is_not_reindexed_by_flush():
+    async def run():
+        redis = MemoryRedis()
+        await suggest.index_batch(redis, [(1, "Python 代码评审", 10)])
+        await suggest.bump_popularity(redis, 1, 5)
+        await suggest.remove_title(redis, 1)
+        await suggest.flush_popularity(redis)
+        assert await _ids(redis, "py") == []
+        suggest._flush_task.cancel()
+
+    asyncio.run(run())
@@ -0,0 +1,91 @@
+import asyncio
+import random
+
+from sqlalchemy import select
+
+from app import migrations, queries, tags
+from app.database import async_session_maker, engine
+from app.models import Prompt, Tag, User
+
+
+def test_normalize_tags():
+    assert tags.normalize_tags(["  Python ", "python", "机器  学习", "", "x" * 60]) == ["python", "机器 学习", "x" * 50]
+    assert len(tags.normalize_tags([str(i) for i in range(20)])) == tags.MAX_TAGS
+    assert tags.parse_filter("A, b,,a") == ["a", "b"]
+    assert tags.parse_filter(None) == []
+
+
+async def _create_prompts(count: int):
+    await migrations.migrate(engine)
+    async with async_session_maker() as db:
+        user = User(username=f"tagger-{random.getrandbits(32)}", hashed_password="!")
+        db.add(user)
+        await db.flush()
+        prompts = [Prompt(user_id=user.id, title=f"标签测试 {i}", content="内容") for i in range(count)]
+        db.add_all(prompts)
+        await db.commit()
+        return [prompt.id for prompt in prompts]
+
+
+async def _set(prompt_id: int, names):
+    async with async_session_maker() as db:
+        prompt = await db.get(Prompt, prompt_id)
+        changed = await tags.set_prompt_tags(db, prompt, names)
+        await db.commit()
+        return changed
+
+
+async def _counts(names) -> dict:
+    async with async_session_maker() as db:
+        result = await db.execute(select(Tag.name, Tag.prompt_count).where(Tag.name.in_(names)))
+        return dict(result.all())
+
+
+def test_prompt_counts_follow_tag_changes():
+    async def run():
+        suffix = random.getrandbits(32)
+        a, b, c = f"a-{suffix}", f"b-{suffix}", f"c-{suffix}"
+        first, second = await _create_prompts(2)
+
+        assert await _set(first, [a, b])
+        assert await _set(second, [a.upper()])
+        assert await _counts([a, b, c]) == {a: 2, b: 1}
+
+        # 替换标签：移除的减一，新增的加一，保留的不变
+        assert await _set(first, [a, c])
+        assert await _counts([a, b, c]) == {a: 2, b: 0, c: 1}
+        assert not await _set(first, [c, a])
+
+        async with async_session_maker() as db:
+            assert (await tags.load_tags(db, [first, second]))[first] == [a, c]
+            assert await tags.clear_prompt_tags(db, first)
+            assert not await tags.clear_prompt_tags(db, first)
+            await db.commit()
+        assert await _counts([a, b, c]) == {a: 1, b: 0, c: 0}
+
+    asyncio.run(run())
+
+
+def test_filter_and_top_tags_use_counts():
+    async def run():
+        suffix = random.getrandbits(32)
+        common, rare, unused = f"common-{suffix}", f"rare-{suffix}", f"unused-{suffix}"
+        prompt_ids = await _create_prompts(3)
+        for prompt_id in prompt_ids:
+            await _set(prompt_id, [common])
+        await _set(prompt_ids[0], [common, rare, unused])
+        await _set(prompt_ids[0], [common, rare])
+
+        async with async_session_maker() as db:
+            # 使用最少的标签排在前面，驱动筛选查询
+            resolved = await tags.resolve_filter(db, [common, rare])
+            assert [tag.name for tag in resolved] == [rare, common]
+            assert await tags.resolve_filter(db, [common, unused]) is None
+            assert await tags.resolve_filter(db, [common, f"missing-{suffix}"]) is None
+
+            result = await db.execute(queries.top_tags(200))
+            ranked = [row.name for row in result.all()]
+        assert ranked.index(common) < ranked.index(rare)
+        assert unused not in ranked
+
+    asyncio.run(run())
@@ -0,0 +1,184 @@
+import asyncio
+
+from redis.exceptions import ResponseError
+
+from app.config import settings
+from app.events import DEAD_LETTER_STREAM, STREAM
+from app.worker import Consumer, ensure_group
+
+
+class FakeStreams:
+    """单个消费组的 Redis Stream 命令，只实现 worker 用到的部分；pending 事件总是视为已空闲"""
+    def __init__(self):
+        self.streams = {}
+        self.groups = set()
+        self.last_delivered = (0, 0)
+        # entry_id -> {"consumer", "times_delivered"}
+        self.pending = {}
+        self._seq = 0
+
+    @staticmethod
+    def _key(entry_id: str):
+        ms, _, seq = entry_id.partition("-")
+        return int(ms), int(seq or 0)
+
+    async def xadd(self, stream, fields):
+        self._seq += 1
+        entry_id = f"{self._seq}-0"
+        self.streams.setdefault(stream, []).append((entry_id, dict(fields)))
+        return entry_id
+
+    async def xgroup_create(self, stream, group, id="$", mkstream=False):
+        if group in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.groups.add(group)
+        self.streams.setdefault(stream, [])
+
+    async def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        (stream, last_id), = streams.items()
+        if last_id == ">":
+            entries = [(i, f) for i, f in self.streams[stream] if self._key(i) > self.last_delivered][:count]
+            for entry_id, _ in entries:
+                self.pending[entry_id] = {"consumer": consumer, "times_delivered": 1}
+                self.last_delivered = self._key(entry_id)
+            if not entries:
+                await asyncio.sleep(0.01)
+                return []
+        else:
+            entries = [
+                (i, f) for i, f in self.streams[stream]
+                if self.pending.get(i, {}).get("consumer") == consumer and self._key(i) > self._key(last_id)
+            ][:count]
+        return [[stream, entries]]
+
+    async def xack(self, stream, group, *entry_ids):
+        return sum(self.pending.pop(entry_id, None) is not None for entry_id in entry_ids)
+
+    async def xpending_range(self, stream, group, min, max, count, idle=None):
+        return [
+            {"message_id": entry_id, "consumer": item["consumer"], "times_delivered": item["times_delivered"]}
+            for entry_id, item in sorted(self.pending.items(), key=lambda kv: self._key(kv[0]))
+        ][:count]
+
+    async def xrange(self, stream, min="-", max="+"):
+        return [(i, f) for i, f in self.streams.get(stream, []) if i == min]
+
+    async def xautoclaim(self, stream, group, consumer, min_idle_time, start_id="0-0", count=None):
+        claimed = []
+        for entry_id, fields in self.streams[stream]:
+            item = self.pending.get(entry_id)
+            if item is not None and self._key(entry_id) >= self._key(start_id):
+                item["consumer"] = consumer
+                item["times_delivered"] += 1
+                claimed.append((entry_id, fields))
+        return ["0-0", claimed[:count], []]
+
+
+def _event(prompt_id: int) -> dict:
+    return {"type": "prompt_viewed", "prompt_id": str(prompt_id)}
+
+
+def test_successful_batches_are_acked():
+    async def run():
+        redis = FakeStreams()
+        handled = []
+
+        async def handler(batch):
+            handled.extend(batch)
+
+        consumer = Consumer("views", handler, name="c1")
+        await ensure_group(redis, "views")
+        await ensure_group(redis, "views")
+        for prompt_id in (1, 2):
+            await redis.xadd(STREAM, _event(prompt_id))
+        result = await redis.xreadgroup("views", "c1", {STREAM: ">"}, count=10)
+        assert await consumer._process(redis, result[0][1])
+        assert [event["prompt_id"] for event in handled] == ["1", "2"]
+        assert (consumer.processed, redis.pending) == (2, {})
+
+    asyncio.run(run())
+
+
+def test_failed_batch_stays_pending_and_is_retried(monkeypatch):
+    async def run():
+        redis = FakeStreams()
+        calls = 0
+
+        async def flaky(batch):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("数据库暂时不可用")
+
+        consumer = Consumer("views", flaky, name="c1")
+        await ensure_group(redis, "views")
+        entry_id = await redis.xadd(STREAM, _event(1))
+        result = await redis.xreadgroup("views", "c1", {STREAM: ">"}, count=10)
+        assert not await consumer._process(redis, result[0][1])
+        assert consumer.failed == 1
+        assert entry_id in redis.pending
+
+        # 其他 worker 接管空闲过久的事件后重试成功
+        other = Consumer("views", flaky, name="c2")
+        await other._reclaim(redis)
+        assert (calls, other.processed, redis.pending) == (2, 1, {})
+
+    monkeypatch.setattr(settings, "EVENT_CLAIM_IDLE_MS", 0)
+    asyncio.run(run())
+
+
+def test_poison_event_moves_to_dead_letter_stream(monkeypatch):
+    async def run():
+        redis = FakeStreams()
+
+        async def broken(batch):
+            raise ValueError("无法处理")
+
+        consumer = Consumer("views", broken, name="c1")
+        await ensure_group(redis, "views")
+        entry_id = await redis.xadd(STREAM, _event(1))
+        result = await redis.xreadgroup("views", "c1", {STREAM: ">"}, count=10)
+        await consumer._process(redis, result[0][1])
+        for _ in range(settings.EVENT_MAX_DELIVERIES - 1):
+            await consumer._reclaim(redis)
+            assert entry_id in redis.pending
+        assert redis.pending[entry_id]["times_delivered"] == settings.EVENT_MAX_DELIVERIES
+
+        await consumer._reclaim(redis)
+        assert redis.pending == {}
+        assert redis.streams[DEAD_LETTER_STREAM] == [("2-0", {**_event(1), "group": "views", "id": entry_id})]
+        assert consumer.failed == settings.EVENT_MAX_DELIVERIES
+
+    monkeypatch.setattr(settings, "EVENT_CLAIM_IDLE_MS", 0)
+    asyncio.run(run())
+
+
+def test_restart_processes_own_pending_events_first(monkeypatch):
+    redis = FakeStreams()
+
+    async def get_redis():
+        return redis
+
+    async def run():
+        handled = []
+
+        async def handler(batch):
+            handled.extend(event["prompt_id"] for event in batch)
+
+        await ensure_group(redis, "views")
+        for prompt_id in (1, 2, 3):
+            await redis.xadd(STREAM, _event(prompt_id))
+        # 上次运行读到前两条后崩溃，没有确认
+        await redis.xreadgroup("views", "c1", {STREAM: ">"}, count=2)
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(Consumer("views", handler, name="c1").run(stop))
+        while len(handled) < 3:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+        assert handled == ["1", "2", "3"]
+        assert redis.pending == {}
+
+    monkeypatch.setattr("app.worker.get_redis", get_redis)
+    asyncio.run(run())